@@ -3,19 +3,37 @@ PerfectPrint AI - Processing Server
 FastAPI server for image processing pipeline
 """
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import uvicorn
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import os
+import sys
 import time
-from typing import Optional
-import io
-from PIL import Image
+import json
+from typing import List, Optional
+import asyncio
+import base64
+import functools
 
 from utils.logger import logger
-from utils.image_utils import encode_image_to_base64, decode_base64_to_image
+from utils.image_utils import bytes_to_data_url, decode_base64_to_image
+from utils.multipart import multipart_response
+from utils.svg_optimizer import gzip_chunks, iter_text
+from utils.http_ranges import RangeNotSatisfiable, http_date, is_not_modified, parse_range
+from utils.request_limits import RequestSizeLimitMiddleware
+from utils.metrics import CONTENT_TYPE_LATEST, render_metrics, option_labels
 from services.background import BackgroundRemovalService
 from services.upscaler import UpscalerService
+from services.pipeline import ProcessingPipeline
+from services.job_queue import JobQueue, QueueFullError
+from services.batch import BatchError, BatchProcessor, build_zip, read_file
+from services.readiness import ReadinessTracker
+from services.artifacts import ArtifactStore, artifact_headers
+from services.webhooks import WebhookDispatcher
+from services.downloader import ImageDownloader, filename_from_url
+from services.ingest import IngestError, IngestLimits
+from utils.config import env_float, env_int, env_str, set_worker_share
+from utils.executors import stage_executor, run_in_stage
 
 # VTracer is optional
 try:
@@ -42,21 +60,114 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Byte and pixel limits every input image is checked against
+ingest_limits = IngestLimits()
+
+# Cut off oversized request bodies while they stream in (one image plus
+# form fields; batches get their own, larger cap)
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    max_bytes=ingest_limits.max_bytes + 1024 * 1024,
+    path_limits={"/process-batch": env_int('BATCH_MAX_REQUEST_MB', 1024) * 1024 * 1024}
+)
+
 # Initialize services (loaded once at startup)
 background_service = BackgroundRemovalService()
 vectorizer_service = VectorizerService() if VECTORIZER_AVAILABLE else None
 upscaler_service = UpscalerService()
+pipeline = ProcessingPipeline(background_service, upscaler_service, vectorizer_service)
+
+# Bounded worker pool behind /process-async (started with the server)
+job_queue = JobQueue(name="process-async")
+
+# Background webhook delivery for /process-async, and the store behind
+# artifact handles (reference webhooks, response_format=handles)
+webhook_dispatcher = WebhookDispatcher()
+artifact_store = ArtifactStore()
+
+# Pooled, size-capped fetches for /process-url
+image_downloader = ImageDownloader(ingest_limits)
+
+# Multi-design orders (/process-batch)
+batch_processor = BatchProcessor(pipeline, limits=ingest_limits)
+
+# Per-model load/warmup state behind /health/ready
+readiness = ReadinessTracker(mode=env_str('MODEL_PRELOAD', 'background'))
+readiness.register('background_removal', background_service.warmup)
+readiness.register('upscaling', upscaler_service.warmup)
+if vectorizer_service:
+    readiness.register('vectorization', vectorizer_service.warmup)
+else:
+    readiness.mark_unavailable('vectorization', "VTracer not installed")
 
 @app.on_event("startup")
 async def startup_event():
     """Load models on startup"""
     logger.info("🚀 Starting PerfectPrint AI Processor")
-    logger.info("📦 Loading models...")
+    logger.info(f"📦 Loading models (MODEL_PRELOAD={readiness.mode})...")
+    
+    # background: warm up on a thread, /health/ready passes when done
+    # blocking: warm up before accepting traffic
+    # lazy: load on first use
+    await asyncio.get_running_loop().run_in_executor(None, readiness.start)
+    
+    job_queue.start()
     
-    # Models are lazy-loaded on first use
-    # This keeps startup fast
+    logger.info("✅ Server started!")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Drain queued jobs before exiting"""
+    logger.info("🛑 Shutting down PerfectPrint AI Processor")
+    drain_timeout = env_float('JOB_DRAIN_TIMEOUT', 120.0)
+    await asyncio.get_running_loop().run_in_executor(
+        None, lambda: job_queue.shutdown(drain=True, timeout=drain_timeout)
+    )
+    await asyncio.get_running_loop().run_in_executor(
+        None, lambda: webhook_dispatcher.shutdown(timeout=drain_timeout)
+    )
+    await image_downloader.close()
+    stage_executor.shutdown(wait=False)
+    if vectorizer_service and vectorizer_service.pool:
+        vectorizer_service.pool.shutdown()
+
+def prepare_fork():
+    """
+    Load every model and stop pool threads before forking server workers (see serve.py)
     
-    logger.info("✅ Server ready!")
+    Workers inherit the loaded weights; the pools start again in each one.
+    """
+    readiness.warm_all()
+    upscaler_service.preload()
+    upscaler_service.shutdown()
+    if vectorizer_service and vectorizer_service.pool:
+        vectorizer_service.pool.shutdown()
+
+def init_worker(workers: int, threads: int):
+    """
+    Give a forked server worker its share of the node (see serve.py)
+    
+    Everything sized from the node's cores or memory when main was
+    imported (stage executors, job queue, tile threads, VTracer pool) is
+    sized again from this worker's share, so the workers together use
+    the node once rather than once each.
+    
+    Args:
+        workers: Number of server workers on the node
+        threads: Cores this worker may use
+    """
+    set_worker_share(workers, threads)
+    stage_executor.configure()
+    job_queue.configure()
+    upscaler_service.after_fork(threads)
+    background_service.after_fork(threads)
+    
+    # The memory budget is node-wide: split it between the workers
+    if pipeline.admission.enabled:
+        pipeline.admission.budget_bytes //= workers
+    
+    if vectorizer_service and vectorizer_service.pool:
+        vectorizer_service.pool.workers = max(1, env_int('VECTORIZE_WORKERS', threads))
 
 @app.get("/")
 async def root():
@@ -67,24 +178,69 @@ async def root():
         "status": "running",
         "endpoints": {
             "health": "/health",
+            "liveness": "/health/live",
+            "readiness": "/health/ready",
             "process": "/process",
+            "process_async": "/process-async",
+            "process_batch": "/process-batch",
+            "queue": "/queue",
+            "metrics": "/metrics",
+            "cache": "/cache",
+            "artifacts": "/artifacts/{artifact_id}",
             "docs": "/docs"
         }
     }
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (always 200; see /health/ready for traffic gating)"""
     return {
-        "status": "healthy",
+        "status": "healthy" if readiness.is_ready() else "starting",
         "timestamp": time.time(),
-        "services": {
-            "background_removal": "ready",
-            "vectorization": "ready",
-            "upscaling": "ready"
-        }
+        "pid": os.getpid(),
+        "services": readiness.get_stats(),
+        "queue": job_queue.get_stats(),
+        "stages": stage_executor.get_stats(),
+        "cache": pipeline.cache.get_stats(),
+        "admission": pipeline.admission.get_stats(),
+        "model_pools": {**background_service.get_pool_stats(), **upscaler_service.get_pool_stats()},
+        "webhooks": webhook_dispatcher.get_stats(),
+        "artifacts": artifact_store.get_stats()
     }
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and the event loop is responsive"""
+    return {"status": "alive", "timestamp": time.time()}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 200 once requests will not wait on model loading, else 503"""
+    ready = readiness.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "mode": readiness.mode,
+            "models": readiness.get_stats()
+        }
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/queue")
+async def queue_stats():
+    """Job queue depth, worker usage and wait times"""
+    return job_queue.get_stats()
+
+@app.get("/cache")
+async def cache_stats():
+    """Result cache hit/miss counts and memory usage"""
+    return pipeline.cache.get_stats()
+
 @app.post("/process-async")
 async def process_image_async(
     file: UploadFile = File(...),
@@ -92,7 +248,8 @@ async def process_image_async(
     webhook_url: str = Form(...),
     upscale: bool = Form(False),
     remove_background: bool = Form(True),
-    vectorize: bool = Form(True)
+    vectorize: bool = Form(True),
+    webhook_payload: Optional[str] = Form(None)
 ):
     """
     Process an image asynchronously and call webhook when done
@@ -104,260 +261,531 @@ async def process_image_async(
         upscale: Whether to upscale the image
         remove_background: Whether to remove background
         vectorize: Whether to vectorize the image
+        webhook_payload: "inline" (base64 PNG and SVG text in the callback) or
+            "reference" (URLs of stored artifacts); default WEBHOOK_PAYLOAD
         
     Returns:
         Immediate response, then calls webhook when done
     """
-    import asyncio
-    import requests
-    import threading
-    
-    # Read file contents immediately (before async)
-    file_contents = await file.read()
-    
-    # Process in background thread (not async task, to avoid blocking)
-    def process_and_callback():
-        try:
-            # Recreate image from bytes
-            image = Image.open(io.BytesIO(file_contents))
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            logger.info(f"📥 Processing image (async): {file.filename}")
-            logger.info(f"   Options: upscale={upscale}, remove_bg={remove_background}, vectorize={vectorize}")
-            
-            # Process synchronously in thread
-            start_time = time.time()
-            metrics = {}
-            
-            processed_image = image
-            
-            # Step 1: Upscaling
-            if upscale:
-                step_start = time.time()
-                logger.info("⬆️  Step 1: Upscaling...")
-                # Call sync version
-                import asyncio
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                processed_image = loop.run_until_complete(upscaler_service.upscale(processed_image))
-                metrics['upscale_time'] = round(time.time() - step_start, 2)
-                logger.info(f"   ✅ Upscaled to {processed_image.size} in {metrics['upscale_time']}s")
-            
-            # Step 2: Background Removal
-            if remove_background:
-                step_start = time.time()
-                logger.info("🎨 Step 2: Removing background...")
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                processed_image = loop.run_until_complete(background_service.remove_background(processed_image))
-                metrics['background_removal_time'] = round(time.time() - step_start, 2)
-                logger.info(f"   ✅ Background removed in {metrics['background_removal_time']}s")
-            
-            # Convert to base64
-            processed_png_base64 = encode_image_to_base64(processed_image)
-            
-            # Step 3: Vectorization
-            svg_content = None
-            if vectorize and VECTORIZER_AVAILABLE and vectorizer_service:
-                step_start = time.time()
-                logger.info("🎯 Step 3: Vectorizing...")
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                svg_content = loop.run_until_complete(vectorizer_service.vectorize(processed_image))
-                metrics['vectorization_time'] = round(time.time() - step_start, 2)
-                logger.info(f"   ✅ Vectorized in {metrics['vectorization_time']}s")
-            
-            total_time = round(time.time() - start_time, 2)
-            metrics['total_time'] = total_time
-            logger.info(f"✅ Processing complete in {total_time}s")
-            
-            # Call webhook with results
-            logger.info(f"🔔 Calling webhook: {webhook_url}")
-            webhook_response = requests.post(webhook_url, json={
-                "jobId": job_id,
-                "success": True,
-                "results": {
-                    "processed_png": processed_png_base64,
-                    "processed_svg": svg_content,
-                    "original_size": list(image.size),
-                    "processed_size": list(processed_image.size)
-                },
-                "metrics": metrics
-            }, timeout=30)
-            
-            if webhook_response.ok:
-                logger.info(f"✅ Webhook called successfully")
-            else:
-                logger.error(f"❌ Webhook failed: {webhook_response.status_code}")
-                
-        except Exception as e:
-            logger.error(f"❌ Processing failed: {str(e)}")
-            # Call webhook with error
-            try:
-                requests.post(webhook_url, json={
-                    "jobId": job_id,
-                    "success": False,
-                    "error": str(e)
-                }, timeout=30)
-            except:
-                pass
-    
-    # Start background thread
-    thread = threading.Thread(target=process_and_callback)
-    thread.start()
+    webhook_payload = _webhook_payload(webhook_payload)
+    
+    # Check and read the upload now (it is closed once we return), so
+    # oversized images are refused here rather than reported by webhook
+    file_contents, _ = await _read_upload(file)
+    
+    return _queue_job(
+        job_id, webhook_url, file.filename, file_contents,
+        upscale, remove_background, vectorize, webhook_payload
+    )
+
+def _webhook_payload(webhook_payload: Optional[str]) -> str:
+    """Resolve and check the webhook payload style"""
+    webhook_payload = webhook_payload or env_str('WEBHOOK_PAYLOAD', 'inline')
+    if webhook_payload not in ("inline", "reference"):
+        raise HTTPException(status_code=400, detail="webhook_payload must be 'inline' or 'reference'")
+    return webhook_payload
+
+def _queue_job(
+    job_id: str,
+    webhook_url: str,
+    filename: Optional[str],
+    contents: bytes,
+    upscale: bool,
+    remove_background: bool,
+    vectorize: bool,
+    webhook_payload: str
+) -> JSONResponse:
+    """
+    Queue a job for the worker pool and acknowledge it
+    
+    Returns:
+        Immediate response with the queue depth
+    """
+    # Reject rather than overload the node
+    try:
+        queue_depth = job_queue.submit(
+            job_id,
+            _run_async_job,
+            job_id,
+            webhook_url,
+            filename,
+            contents,
+            upscale,
+            remove_background,
+            vectorize,
+            webhook_payload
+        )
+    except QueueFullError as e:
+        logger.warning(f"⚠️  Rejected job {job_id}: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
     
     # Return immediately
     return JSONResponse({
         "success": True,
-        "message": "Processing started",
-        "jobId": job_id
+        "message": "Processing queued",
+        "jobId": job_id,
+        "queueDepth": queue_depth
     })
 
+async def _run_async_job(
+    job_id: str,
+    webhook_url: str,
+    filename: Optional[str],
+    contents: bytes,
+    upscale: bool,
+    remove_background: bool,
+    vectorize: bool,
+    webhook_payload: str = "inline"
+):
+    """
+    Run a queued /process-async job and hand the result to the webhook dispatcher
+    
+    Executed on a job queue worker thread; delivery (and its retries)
+    happens in the background, so the worker is free for the next job.
+    """
+    labels = option_labels(upscale, remove_background, vectorize)
+    try:
+        output = await pipeline.process(
+            contents,
+            upscale=upscale,
+            remove_background=remove_background,
+            vectorize=vectorize,
+            filename=filename
+        )
+        
+        if webhook_payload == "reference":
+            results = await run_in_stage('encode', _store_results, output["results"])
+        else:
+            results = await _json_results(output["results"])
+        payload = {
+            "jobId": job_id,
+            "success": True,
+            "results": results,
+            "metrics": output["metrics"]
+        }
+    except Exception as e:
+        logger.error(f"❌ Processing failed: {str(e)}")
+        payload = {
+            "jobId": job_id,
+            "success": False,
+            "error": str(e)
+        }
+    
+    logger.info(f"🔔 Queueing webhook: {webhook_url}")
+    webhook_dispatcher.submit(webhook_url, payload, job_id, labels)
+
+def _store_results(results: dict, svg_format: str = "svg") -> dict:
+    """
+    Write pipeline results to the artifact store (blocking)
+    
+    Args:
+        results: Pipeline results with raw PNG bytes and SVG text
+        svg_format: "svg", or "svgz" to store the SVG gzip-compressed
+            (handle in processed_svgz)
+        
+    Returns:
+        JSON results with artifact handles in place of file contents
+    """
+    stored = dict(results)
+    stored["processed_png"] = artifact_store.put(results["processed_png"], 'png')
+    if results["processed_svg"] is not None:
+        if svg_format == "svgz":
+            svgz = b''.join(gzip_chunks(iter_text(results["processed_svg"])))
+            stored["processed_svgz"] = artifact_store.put(svgz, 'svgz')
+            stored["processed_svg"] = None
+        else:
+            stored["processed_svg"] = artifact_store.put(results["processed_svg"].encode('utf-8'), 'svg')
+    return stored
+
+async def _json_results(results: dict, svg_format: str = "svg") -> dict:
+    """
+    Convert pipeline results to the JSON wire format (PNG as a base64 data URL)
+    
+    Args:
+        results: Pipeline results with raw PNG bytes
+        svg_format: "svg" (SVG text) or "svgz" (base64 gzip in processed_svgz)
+        
+    Returns:
+        JSON-serializable results
+    """
+    json_results = dict(results)
+    json_results["processed_png"] = await run_in_stage(
+        'encode', bytes_to_data_url, results["processed_png"]
+    )
+    if svg_format == "svgz" and results["processed_svg"] is not None:
+        json_results["processed_svgz"] = await run_in_stage('encode', _svgz_base64, results["processed_svg"])
+        json_results["processed_svg"] = None
+    return json_results
+
+def _svgz_base64(svg_content: str) -> str:
+    """Gzip an SVG and base64-encode it (blocking)"""
+    return base64.b64encode(b''.join(gzip_chunks(iter_text(svg_content)))).decode('ascii')
+
+@app.post("/process")
+async def process_image(
+    file: UploadFile = File(...),
+    upscale: bool = Form(False),
+    remove_background: bool = Form(True),
+    vectorize: bool = Form(True),
+    response_format: str = Form("json"),
+    svg_format: str = Form("svg")
+):
+    """
+    Process an image and return the results in the response
+    
+    Args:
+        file: Image file (PNG, JPG, etc.)
+        upscale: Whether to upscale the image
+        remove_background: Whether to remove background
+        vectorize: Whether to vectorize the image
+        response_format: "json" (base64 data URLs), "multipart" (raw binary
+            parts) or "handles" (URLs of stored artifacts)
+        svg_format: "svg" or "svgz" (gzip-compressed SVG)
+        
+    Returns:
+        JSON with processed images and metrics, or a multipart/mixed stream
+    """
+    return await _process_image(file, upscale, remove_background, vectorize, response_format, svg_format)
+
 async def _process_image(
     file: UploadFile,
     upscale: bool = False,
     remove_background: bool = True,
-    vectorize: bool = True
+    vectorize: bool = True,
+    response_format: str = "json",
+    svg_format: str = "svg"
 ):
     """
     Process an image through the PerfectPrint AI pipeline
     
+    The "multipart" format streams metadata.json, processed.png and
+    processed.svg as raw parts of a multipart/mixed body, avoiding the
+    base64 copies and 33% size overhead of the JSON format. With
+    svg_format="svgz" the SVG part is gzip-compressed as it streams.
+    The "handles" format stores the outputs in the artifact store and
+    returns small {url, sha256, size, content_type} handles instead.
+    
     Args:
         file: Image file (PNG, JPG, etc.)
         upscale: Whether to upscale the image
         remove_background: Whether to remove background
         vectorize: Whether to vectorize the image
+        response_format: "json", "multipart" or "handles"
+        svg_format: "svg" or "svgz"
         
     Returns:
-        JSON with processed images and metrics
+        JSON with processed images and metrics, or a multipart/mixed stream
     """
+    _check_formats(response_format, svg_format)
+    
+    contents, _ = await _read_upload(file)
+    
+    return await _process_contents(
+        contents, file.filename, upscale, remove_background, vectorize, response_format, svg_format
+    )
+
+async def _read_upload(file: UploadFile) -> tuple:
+    """Check an upload against the ingest limits and read it (400/413/415 if refused)"""
     try:
-        start_time = time.time()
-        metrics = {}
-        
-        logger.info(f"📥 Processing image: {file.filename}")
-        logger.info(f"   Options: upscale={upscale}, remove_bg={remove_background}, vectorize={vectorize}")
-        
-        # Read uploaded file
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        
-        # Convert to RGB if needed
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        logger.info(f"   Original size: {image.size}")
-        
-        # Don't store original - API already has it
-        # original_base64 = encode_image_to_base64(image)
-        
-        processed_image = image
-        
-        # Step 1: Upscaling (if requested)
-        if upscale:
-            step_start = time.time()
-            logger.info("⬆️  Step 1: Upscaling...")
-            processed_image = await upscaler_service.upscale(processed_image)
-            metrics['upscale_time'] = round(time.time() - step_start, 2)
-            logger.info(f"   ✅ Upscaled to {processed_image.size} in {metrics['upscale_time']}s")
-        
-        # Step 2: Background Removal (if requested)
-        if remove_background:
-            step_start = time.time()
-            logger.info("🎨 Step 2: Removing background...")
-            processed_image = await background_service.remove_background(processed_image)
-            metrics['background_removal_time'] = round(time.time() - step_start, 2)
-            logger.info(f"   ✅ Background removed in {metrics['background_removal_time']}s")
-        
-        # Convert processed image to base64
-        processed_png_base64 = encode_image_to_base64(processed_image)
+        return await ingest_limits.read_upload(file)
+    except IngestError as e:
+        logger.warning(f"⚠️  Upload refused: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+def _check_formats(response_format: str, svg_format: str):
+    """Reject unknown /process output formats before any work is done"""
+    if response_format not in ("json", "multipart", "handles"):
+        raise HTTPException(status_code=400, detail=f"Unknown response_format: {response_format}")
+    if svg_format not in ("svg", "svgz"):
+        raise HTTPException(status_code=400, detail=f"Unknown svg_format: {svg_format}")
+
+async def _process_contents(
+    contents: bytes,
+    filename: Optional[str],
+    upscale: bool,
+    remove_background: bool,
+    vectorize: bool,
+    response_format: str,
+    svg_format: str
+):
+    """
+    Run encoded image bytes through the pipeline and build the response
+    
+    Shared by uploads (/process) and downloads (/process-url).
+    
+    Returns:
+        JSON with processed images and metrics, or a multipart/mixed stream
+    """
+    try:
+        output = await pipeline.process(
+            contents,
+            upscale=upscale,
+            remove_background=remove_background,
+            vectorize=vectorize,
+            filename=filename
+        )
         
-        # Step 3: Vectorization (if requested)
-        svg_content = None
-        if vectorize and VECTORIZER_AVAILABLE and vectorizer_service:
-            step_start = time.time()
-            logger.info("🎯 Step 3: Vectorizing...")
-            svg_content = await vectorizer_service.vectorize(processed_image)
-            metrics['vectorization_time'] = round(time.time() - step_start, 2)
-            logger.info(f"   ✅ Vectorized in {metrics['vectorization_time']}s")
-        elif vectorize and not VECTORIZER_AVAILABLE:
-            logger.warning("⚠️  Vectorization requested but VTracer not available")
+        steps_completed = {
+            "upscale": upscale,
+            "remove_background": remove_background,
+            "vectorize": vectorize
+        }
+        results = output["results"]
         
-        # Calculate total time
-        total_time = round(time.time() - start_time, 2)
-        metrics['total_time'] = total_time
+        if response_format == "multipart":
+            svg_part = ("processed.svg", "image/svg+xml", results["processed_svg"])
+            if svg_format == "svgz" and results["processed_svg"] is not None:
+                svg_part = ("processed.svgz", "image/svg+xml", gzip_chunks(iter_text(results["processed_svg"])))
+            
+            return multipart_response(
+                [
+                    ("processed.png", "image/png", results["processed_png"]),
+                    svg_part
+                ],
+                metadata={
+                    "success": True,
+                    "results": {
+                        "original_size": results["original_size"],
+                        "processed_size": results["processed_size"]
+                    },
+                    "metrics": output["metrics"],
+                    "steps_completed": steps_completed
+                }
+            )
         
-        logger.info(f"✅ Processing complete in {total_time}s")
+        if response_format == "handles":
+            json_results = await run_in_stage('encode', _store_results, results, svg_format)
+        else:
+            json_results = await _json_results(results, svg_format)
         
         # Return results (without original to reduce response size)
         return {
             "success": True,
-            "results": {
-                "processed_png": processed_png_base64,
-                "processed_svg": svg_content,
-                "original_size": list(image.size),
-                "processed_size": list(processed_image.size)
-            },
-            "metrics": metrics,
-            "steps_completed": {
-                "upscale": upscale,
-                "remove_background": remove_background,
-                "vectorize": vectorize
-            }
+            "results": json_results,
+            "metrics": output["metrics"],
+            "steps_completed": steps_completed
         }
         
+    except IngestError as e:
+        # Refused admission: too large for this node (413) or no memory in time (503)
+        logger.warning(f"⚠️  Job refused: {str(e)}")
+        headers = {"Retry-After": "30"} if e.status_code == 503 else None
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=headers)
     except Exception as e:
         logger.error(f"❌ Error processing image: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/process-batch")
+async def process_batch(
+    files: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    upscale: bool = Form(False),
+    remove_background: bool = Form(True),
+    vectorize: bool = Form(True),
+    options: Optional[str] = Form(None),
+    response_format: str = Form("ndjson"),
+    svg_format: str = Form("svg")
+):
+    """
+    Process every design of an order in one request
+    
+    Designs run concurrently, so they share the stage executors and BRIA
+    batching. With "ndjson" each design's result is streamed as one JSON
+    line as soon as it finishes (in completion order, with its index),
+    followed by a summary line; "handles" streams the same lines with
+    artifact handles in place of file contents; "zip" returns one archive
+    with every PNG/SVG and a manifest.json.
+    
+    Args:
+        files: Image files (PNG, JPG, etc.)
+        archive: Zip archive of image files (instead of, or as well as, files)
+        upscale: Whether to upscale (shared default)
+        remove_background: Whether to remove background (shared default)
+        vectorize: Whether to vectorize (shared default)
+        options: Optional per-file overrides as JSON: a list by position, or
+            an object keyed by filename (upscale, remove_background,
+            vectorize, vectorizer_config)
+        response_format: "ndjson", "handles" or "zip"
+        svg_format: "svg" or "svgz" (ndjson and handles only)
+        
+    Returns:
+        Streamed NDJSON results, or a zip archive
+    """
+    if response_format not in ("ndjson", "handles", "zip"):
+        raise HTTPException(status_code=400, detail=f"Unknown response_format: {response_format}")
+    if svg_format not in ("svg", "svgz"):
+        raise HTTPException(status_code=400, detail=f"Unknown svg_format: {svg_format}")
+    
+    try:
+        uploads = []
+        for upload in files or []:
+            # Header checks happen per design, so one bad file fails only its own item
+            if upload.size is not None:
+                ingest_limits.check_size(upload.size, upload.filename)
+            # Left spooled; each design is read when its turn comes
+            uploads.append((upload.filename, functools.partial(read_file, upload.file)))
+        if archive is not None:
+            # Entries are inflated one by one from the spooled upload, as they run
+            uploads.extend(await run_in_stage('decode', batch_processor.expand_archive, archive.file))
+        
+        items = batch_processor.build_items(
+            uploads,
+            {"upscale": upscale, "remove_background": remove_background, "vectorize": vectorize},
+            options
+        )
+    except BatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IngestError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    start_time = time.time()
+    
+    if response_format == "zip":
+        results = [result async for result in batch_processor.run(items)]
+        archive_bytes = await run_in_stage('encode', build_zip, results)
+        failed = sum(1 for result in results if not result["success"])
+        logger.info(f"📦 Batch done: {len(items) - failed}/{len(items)} in {time.time() - start_time:.2f}s")
+        return Response(
+            content=archive_bytes,
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="results.zip"'}
+        )
+    
+    async def stream_results():
+        failed = 0
+        async for result in batch_processor.run(items):
+            line = {"index": result["index"], "filename": result["filename"], "success": result["success"]}
+            if result["success"]:
+                if response_format == "handles":
+                    line["results"] = await run_in_stage(
+                        'encode', _store_results, result["output"]["results"], svg_format
+                    )
+                else:
+                    line["results"] = await _json_results(result["output"]["results"], svg_format)
+                line["metrics"] = result["output"]["metrics"]
+            else:
+                failed += 1
+                line["error"] = result["error"]
+            yield json.dumps(line) + "\n"
+        
+        total_time = round(time.time() - start_time, 2)
+        logger.info(f"📦 Batch done: {len(items) - failed}/{len(items)} in {total_time}s")
+        yield json.dumps({"summary": {"total": len(items), "failed": failed, "total_time": total_time}}) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.api_route("/artifacts/{artifact_id}", methods=["GET", "HEAD"])
+async def get_artifact(artifact_id: str, request: Request):
+    """
+    Serve a stored output by its handle ID
+    
+    Supports single-range requests (206, with If-Range) and conditional
+    GETs (304 on If-None-Match / If-Modified-Since).
+    """
+    info = await run_in_stage('encode', artifact_store.stat, artifact_id)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    
+    # Content-addressed: the hash is a strong ETag and the bytes never change
+    etag = f'"{artifact_id.split(".")[0]}"'
+    headers = artifact_headers(artifact_id)
+    headers.update({
+        "ETag": etag,
+        "Last-Modified": http_date(info.modified),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=31536000, immutable"
+    })
+    
+    if is_not_modified(request.headers, etag, info.modified):
+        headers.pop("Content-Type")
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        byte_range = parse_range(request.headers, info.size, etag, info.modified)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{info.size}"})
+    
+    status_code = 200
+    start, end = 0, info.size
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{info.size}"
+    headers["Content-Length"] = str(end - start)
+    
+    media_type = headers.pop("Content-Type")
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(
+        artifact_store.read(artifact_id, start, end),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type
+    )
+
 @app.post("/process-url")
 async def process_image_url(
     url: str = Form(...),
     upscale: bool = Form(False),
     remove_background: bool = Form(True),
-    vectorize: bool = Form(True)
+    vectorize: bool = Form(True),
+    response_format: str = Form("json"),
+    svg_format: str = Form("svg"),
+    job_id: Optional[str] = Form(None),
+    webhook_url: Optional[str] = Form(None),
+    webhook_payload: Optional[str] = Form(None)
 ):
     """
     Process an image from a URL
     
+    The download streams over pooled connections on the event loop into a
+    size-capped spooled buffer, and the image header is checked before any
+    decode. The image then goes through the same pipeline as an upload:
+    inline like /process, or queued like /process-async when job_id and
+    webhook_url are given.
+    
     Args:
         url: URL to the image
         upscale: Whether to upscale the image
         remove_background: Whether to remove background
         vectorize: Whether to vectorize the image
+        response_format: "json", "multipart" or "handles" (see /process)
+        svg_format: "svg" or "svgz"
+        job_id: Job ID, to queue the job and report to webhook_url
+        webhook_url: URL to call when processing is complete
+        webhook_payload: "inline" or "reference" (see /process-async)
         
     Returns:
-        JSON with processed images and metrics
+        Processed results as for /process, or the /process-async acknowledgement
     """
+    if bool(job_id) != bool(webhook_url):
+        raise HTTPException(status_code=400, detail="job_id and webhook_url must be sent together")
+    if webhook_url:
+        webhook_payload = _webhook_payload(webhook_payload)
+    else:
+        _check_formats(response_format, svg_format)
+    
+    logger.info(f"📥 Downloading image from URL: {url}")
     try:
-        import requests
-        
-        logger.info(f"📥 Downloading image from URL: {url}")
-        
-        # Download image
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        # Convert to PIL Image
-        image = Image.open(io.BytesIO(response.content))
-        
-        # Process using the same logic as file upload
-        # (This would call the same processing functions)
-        
-        return {"success": True, "message": "URL processing not yet implemented"}
-        
-    except Exception as e:
-        logger.error(f"❌ Error processing URL: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        contents, _ = await image_downloader.fetch(url)
+    except IngestError as e:
+        logger.warning(f"⚠️  Download refused: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    filename = filename_from_url(url)
+    if webhook_url:
+        return _queue_job(
+            job_id, webhook_url, filename, contents,
+            upscale, remove_background, vectorize, webhook_payload
+        )
+    return await _process_contents(
+        contents, filename, upscale, remove_background, vectorize, response_format, svg_format
+    )
 
 if __name__ == "__main__":
-    # Run the server
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,  # Auto-reload on code changes (dev only)
-        log_level="info"
-    )
+    # Production launcher (SERVER_WORKERS forked workers sharing the
+    # models); use run_server.py for auto-reload during development
+    from serve import run
+    run(sys.modules[__name__])
 
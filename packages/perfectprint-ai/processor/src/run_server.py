@@ -1,7 +1,9 @@
 """
-Run the PerfectPrint AI processing server
+Run the PerfectPrint AI processing server (development)
 
-Simple script to start the FastAPI server
+Single process with auto-reload on code changes; every reload loads the
+models again. For production use serve.py, which loads the models once
+and forks workers that share them.
 """
 
 import uvicorn
@@ -12,16 +14,17 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 if __name__ == "__main__":
-    print("🚀 Starting PerfectPrint AI Processor")
-    print("📍 Server will run on: http://localhost:8000")
-    print("📖 API docs available at: http://localhost:8000/docs")
+    port = int(os.environ.get('PORT', 8000))
+    
+    print("🚀 Starting PerfectPrint AI Processor (development, auto-reload)")
+    print(f"📍 Server will run on: http://localhost:{port}")
+    print(f"📖 API docs available at: http://localhost:{port}/docs")
     print("")
     
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
-        port=8000,
+        port=port,
         reload=True,  # Auto-reload on code changes
         log_level="info"
     )
-
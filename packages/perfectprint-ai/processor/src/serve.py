@@ -0,0 +1,212 @@
+"""
+Production server launcher
+
+Loads every model once in a parent process, then forks SERVER_WORKERS
+uvicorn workers (default: 1, so /metrics covers the whole server) that
+share the weights copy-on-write:
+- Weights are tensor storage the workers only read, so their pages stay
+  shared; gc.freeze() keeps the collector from touching the parent's objects
+- Thread and process pools started while warming up are stopped before
+  forking (threads do not survive fork) and start again in each worker
+- Each worker gets its share of the cores for PyTorch's intra-op pool
+  (TORCH_INTRA_OP_THREADS) and of the memory admission budget
+- Workers accept on one shared socket; a worker that dies is replaced
+- SIGTERM/SIGINT are passed on to the workers, which drain and exit
+
+Models are loaded with one PyTorch thread, so the parent never starts an
+OpenMP pool the workers would inherit half-initialized. On a GPU node the
+weights live in device memory, which fork cannot share, so the server
+runs as a single process.
+
+Usage: python src/serve.py
+"""
+
+import gc
+import os
+import signal
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import uvicorn
+
+from utils.logger import logger
+from utils.config import env_int, env_str, get_cpu_count
+
+
+def set_torch_threads(intra_op: int, inter_op: int = 0):
+    """
+    Size PyTorch's thread pools for this process
+
+    Args:
+        intra_op: Threads per operator (convolutions, matmuls)
+        inter_op: Threads running independent operators (0 leaves the default;
+            it can only be set before the pool first starts)
+    """
+    try:
+        import torch
+    except ImportError:
+        return
+
+    torch.set_num_threads(intra_op)
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as e:
+            logger.warning(f"⚠️  Inter-op threads already set: {str(e)}")
+
+
+def plan_workers() -> tuple:
+    """
+    Work out the worker count and each worker's thread counts
+
+    Returns:
+        (workers, intra-op threads, inter-op threads)
+    """
+    cores = get_cpu_count()
+    # Opt-in: with several workers, metrics and stats are per worker
+    workers = max(1, env_int('SERVER_WORKERS', 1))
+    intra_op = max(1, env_int('TORCH_INTRA_OP_THREADS', cores // workers))
+    inter_op = max(1, env_int('TORCH_INTER_OP_THREADS', 1))
+    return workers, intra_op, inter_op
+
+
+def _cuda_available() -> bool:
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+class Supervisor:
+    """
+    Forks server workers from the loaded parent and keeps them running
+    """
+
+    def __init__(self, app_module, config: uvicorn.Config, workers: int, intra_op: int, inter_op: int):
+        """
+        Args:
+            app_module: The loaded main module (app, prepare_fork, init_worker)
+            config: uvicorn config shared by every worker
+            workers: Number of workers
+            intra_op: PyTorch intra-op threads per worker
+            inter_op: PyTorch inter-op threads per worker
+        """
+        self.app_module = app_module
+        self.config = config
+        self.workers = workers
+        self.intra_op = intra_op
+        self.inter_op = inter_op
+        self.children = {}
+        self.stopping = False
+        self.socket = None
+
+    def spawn(self, index: int):
+        """Fork worker number index"""
+        pid = os.fork()
+        if pid:
+            self.children[pid] = index
+            return
+
+        # Worker process: never returns into the supervisor
+        code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            set_torch_threads(self.intra_op, self.inter_op)
+            self.app_module.init_worker(self.workers, self.intra_op)
+            logger.info(f"👷 Worker {index} (pid {os.getpid()}): {self.intra_op} intra-op / {self.inter_op} inter-op threads")
+            uvicorn.Server(self.config).run(sockets=[self.socket])
+        except BaseException as e:
+            logger.error(f"❌ Worker {index} failed: {str(e)}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _signal(self, signum, frame):
+        """Pass shutdown on to the workers (a second signal kills them)"""
+        sig = signal.SIGKILL if self.stopping else signal.SIGTERM
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        """Fork the workers and wait for them, replacing any that die"""
+        self.socket = self.config.bind_socket()
+
+        # Objects created so far are never freed; keep the collector off their pages
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._signal)
+        signal.signal(signal.SIGINT, self._signal)
+
+        for index in range(self.workers):
+            self.spawn(index)
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+
+            index = self.children.pop(pid, None)
+            if index is None or self.stopping:
+                continue
+
+            logger.warning(
+                f"⚠️  Worker {index} (pid {pid}) exited with code "
+                f"{os.waitstatus_to_exitcode(status)}, restarting"
+            )
+            time.sleep(1)
+            if not self.stopping:
+                self.spawn(index)
+
+        logger.info("🛑 All workers stopped")
+
+
+def run(app_module=None):
+    """
+    Start the server: forked workers on CPU nodes, one process on GPU nodes
+
+    Args:
+        app_module: The main module, if already imported (python main.py)
+    """
+    workers, intra_op, inter_op = plan_workers()
+    if workers > 1 and _cuda_available():
+        logger.warning("⚠️  CUDA weights cannot be shared across fork, running a single worker")
+        workers = 1
+        intra_op = max(1, env_int('TORCH_INTRA_OP_THREADS', get_cpu_count()))
+
+    # One thread while loading: no OpenMP pool for the workers to inherit
+    set_torch_threads(1 if workers > 1 else intra_op, 0 if workers > 1 else inter_op)
+
+    if app_module is None:
+        import main as app_module
+
+    config = uvicorn.Config(
+        app_module.app,
+        host=env_str('HOST', '0.0.0.0'),
+        port=env_int('PORT', 8000),
+        log_level="info"
+    )
+
+    if workers == 1:
+        logger.info(f"🚀 Single worker, {intra_op} intra-op / {inter_op} inter-op threads")
+        uvicorn.Server(config).run()
+        return
+
+    logger.info(f"🚀 Loading models once for {workers} workers...")
+    start_time = time.time()
+    app_module.prepare_fork()
+    logger.info(f"   Models loaded in {time.time() - start_time:.1f}s, forking workers")
+
+    Supervisor(app_module, config, workers, intra_op, inter_op).run()
+
+
+if __name__ == "__main__":
+    run()
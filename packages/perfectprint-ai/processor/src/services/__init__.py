@@ -1,14 +1,40 @@
 """
 PerfectPrint AI Services
+
+Services are imported on first use, so importing one light module (e.g.
+services.admission) does not pull in torch through the model services.
 """
 
-from .background import BackgroundRemovalService
-from .upscaler import UpscalerService
+import importlib
+
+# Exported name -> module that defines it
+_EXPORTS = {
+    'BackgroundRemovalService': 'background',
+    'VectorizerService': 'vectorizer',
+    'UpscalerService': 'upscaler',
+    'ProcessingPipeline': 'pipeline',
+    'JobQueue': 'job_queue',
+    'QueueFullError': 'job_queue',
+    'ResultCache': 'result_cache',
+    'BatchProcessor': 'batch',
+    'BatchError': 'batch',
+    'WebhookDispatcher': 'webhooks',
+    'ArtifactStore': 'artifacts',
+    'ImageDownloader': 'downloader',
+    'DownloadError': 'downloader',
+    'IngestLimits': 'ingest',
+    'IngestError': 'ingest',
+    'MemoryAdmission': 'admission',
+    'AdmissionError': 'admission',
+}
+
+__all__ = list(_EXPORTS)
 
-# VTracer is optional (requires Rust to compile)
-try:
-    from .vectorizer import VectorizerService
-    __all__ = ['BackgroundRemovalService', 'VectorizerService', 'UpscalerService']
-except ImportError:
-    __all__ = ['BackgroundRemovalService', 'UpscalerService']
 
+def __getattr__(name):
+    # VTracer is optional (requires Rust to compile): VectorizerService
+    # raises ImportError here when it is missing
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f'.{module}', __name__), name)
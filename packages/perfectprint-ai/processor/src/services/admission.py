@@ -0,0 +1,244 @@
+"""
+Memory-aware admission for pipeline jobs
+
+A job's peak memory depends on its input size and options far more than
+on how many jobs are running: a 300 DPI upscale to 4096px with background
+removal and vectorization holds several full-resolution copies at once.
+Before a job starts, its peak is estimated from the image header and its
+options (estimate_job_memory), and the job reserves that much of a
+node-wide budget (MemoryAdmission):
+- Jobs that fit start at once
+- Jobs that do not fit yet wait, in arrival order, for running jobs to
+  release memory (up to ADMISSION_MAX_WAIT seconds, then 503)
+- Jobs that could never fit the budget are refused up front (413)
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Optional, Tuple
+
+from utils.logger import logger
+from utils.config import env_float, env_int, get_total_memory_bytes
+from utils.metrics import ADMISSION_RESERVED, ADMISSION_WAITING, ADMISSION_WAIT_SECONDS, ADMISSION_REJECTED
+from services.ingest import IngestError
+
+MB = 1024 * 1024
+
+# Buffers each step allocates, per pixel it works on (see the services
+# for where they come from). The estimate is a sum of these, scaled by
+# MEMORY_ESTIMATE_FACTOR to cover allocator overhead and fragmentation.
+DECODE_BYTES_PER_PIXEL = 4       # source pixels before the RGB conversion
+SEGMENT_BYTES = 64 * MB          # 1024x1024 input tensor, mask and its resize
+UPSCALE_BAND_BYTES_PER_PIXEL = 24  # float32 RGB band plus its carry-over copy
+UPSCALE_TILE_ROWS = 1024 + 2 * 16  # largest tile plus overlap, in input rows
+MASK_BYTES_PER_PIXEL = 8         # RGB input, RGBA result and the resized mask
+VECTORIZE_BYTES_PER_PIXEL = 32   # RGB flatten, array, BMP and VTracer's own buffers
+JOB_OVERHEAD_BYTES = 16 * MB
+
+
+def estimate_job_memory(
+    width: int,
+    height: int,
+    output_size: Tuple[int, int],
+    remove_background: bool,
+    vectorize: bool,
+    encoded_bytes: int = 0,
+    factor: Optional[float] = None
+) -> int:
+    """
+    Predict a job's peak memory from its header and options
+
+    The encoded input and the decoded original are held for the whole
+    job; on top of that, the peak is the largest step's working set.
+
+    Args:
+        width: Input width
+        height: Input height
+        output_size: (width, height) after upscaling (the input size if not upscaled)
+        remove_background: Whether the background is removed
+        vectorize: Whether the result is vectorized
+        encoded_bytes: Size of the encoded input
+        factor: Safety factor (default: MEMORY_ESTIMATE_FACTOR or 1.25)
+
+    Returns:
+        Estimated peak memory in bytes
+    """
+    factor = factor or env_float('MEMORY_ESTIMATE_FACTOR', 1.25)
+    in_pixels = width * height
+    out_width, out_height = output_size
+    out_pixels = out_width * out_height
+    channels = 4 if remove_background else 3
+
+    held = JOB_OVERHEAD_BYTES + encoded_bytes + in_pixels * 3
+    steps = [in_pixels * DECODE_BYTES_PER_PIXEL]
+
+    if remove_background:
+        steps.append(SEGMENT_BYTES)
+
+    if out_pixels > in_pixels:
+        # Output image, plus one band of tile rows at output resolution
+        band_rows = min(out_height, UPSCALE_TILE_ROWS * out_height / max(1, height))
+        steps.append(out_pixels * 3 + int(band_rows * out_width * UPSCALE_BAND_BYTES_PER_PIXEL))
+
+    if remove_background:
+        steps.append(out_pixels * MASK_BYTES_PER_PIXEL)
+
+    # Encode: the processed image plus the PNG (at worst uncompressed)
+    processed = out_pixels * channels
+    steps.append(processed * 2)
+
+    if vectorize:
+        # The processed image and its PNG stay alive while tracing
+        steps.append(processed * 2 + out_pixels * VECTORIZE_BYTES_PER_PIXEL)
+
+    return int((held + max(steps)) * factor)
+
+
+class AdmissionError(IngestError):
+    """Raised when a job cannot be admitted (413 never fits, 503 timed out)"""
+
+
+class MemoryAdmission:
+    """
+    Node-wide memory budget that pipeline jobs reserve against
+
+    Usable from any event loop (job queue workers each run their own, as
+    for StageGate). Waiters are admitted strictly in arrival order, so a
+    large job is not starved by a stream of small ones.
+    """
+
+    def __init__(self, budget_bytes: Optional[int] = None, max_wait: Optional[float] = None):
+        """
+        Initialize the budget
+
+        Args:
+            budget_bytes: Memory jobs may reserve in total (default:
+                ADMISSION_MEMORY_MB, else ADMISSION_MEMORY_FRACTION (0.6) of
+                the node's memory, leaving the rest to models and the server)
+            max_wait: Seconds a job may wait for memory (default:
+                ADMISSION_MAX_WAIT or 120)
+        """
+        if budget_bytes is None:
+            budget_mb = env_int('ADMISSION_MEMORY_MB', 0)
+            if budget_mb:
+                budget_bytes = budget_mb * MB
+            else:
+                total_memory = get_total_memory_bytes()
+                if total_memory:
+                    budget_bytes = int(total_memory * env_float('ADMISSION_MEMORY_FRACTION', 0.6))
+
+        # None disables admission control (memory size unknown)
+        self.budget_bytes = budget_bytes
+        self.max_wait = max_wait if max_wait is not None else env_float('ADMISSION_MAX_WAIT', 120.0)
+        self._reserved = 0
+        self._admitted = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+        ADMISSION_RESERVED.set_function(lambda: self._reserved)
+        ADMISSION_WAITING.set_function(lambda: len(self._waiters))
+
+        if self.budget_bytes:
+            logger.info(f"🧮 Admission budget: {self.budget_bytes // MB} MB")
+        else:
+            logger.warning("⚠️  Node memory unknown, memory admission disabled")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.budget_bytes)
+
+    async def acquire(self, nbytes: int, name: Optional[str] = None):
+        """
+        Reserve memory for a job, waiting until it fits
+
+        Args:
+            nbytes: Estimated peak memory of the job
+            name: Filename (for logs and errors)
+
+        Raises:
+            AdmissionError: 413 if the job exceeds the whole budget, 503 if
+                it waited longer than max_wait
+        """
+        if not self.enabled:
+            return
+        if nbytes > self.budget_bytes:
+            ADMISSION_REJECTED.labels('too_large').inc()
+            raise AdmissionError(
+                f"{name or 'Image'} needs about {nbytes // MB} MB to process, "
+                f"more than this node's {self.budget_bytes // MB} MB budget",
+                status_code=413
+            )
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self._reserved + nbytes <= self.budget_bytes:
+                self._reserved += nbytes
+                self._admitted += 1
+                ADMISSION_WAIT_SECONDS.observe(0)
+                return
+            waiter = (loop, loop.create_future(), nbytes)
+            self._waiters.append(waiter)
+
+        logger.info(f"⏳ Waiting for {nbytes // MB} MB ({self._reserved // MB}/{self.budget_bytes // MB} MB reserved)")
+        start = time.time()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[1]), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    granted = False
+                else:
+                    granted = True
+            if granted:
+                # Admitted as we gave up: hand the memory back
+                self.release(nbytes)
+            else:
+                # Our place at the head may have been holding others back
+                self._admit_waiters()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            ADMISSION_REJECTED.labels('timeout').inc()
+            raise AdmissionError(
+                f"Timed out after {self.max_wait:.0f}s waiting for {nbytes // MB} MB of memory",
+                status_code=503
+            )
+        ADMISSION_WAIT_SECONDS.observe(time.time() - start)
+
+    def release(self, nbytes: int):
+        """Give a job's reservation back and admit waiters that now fit"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._reserved -= nbytes
+        self._admit_waiters()
+
+    def _admit_waiters(self):
+        """Admit waiters from the head of the queue while they fit"""
+        with self._lock:
+            while self._waiters and self._reserved + self._waiters[0][2] <= self.budget_bytes:
+                loop, future, nbytes = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self._hand_over, future)
+                except RuntimeError:
+                    # Waiter's loop is closed; nothing to admit
+                    continue
+                self._reserved += nbytes
+                self._admitted += 1
+
+    def _hand_over(self, future: asyncio.Future):
+        """Runs on the waiter's loop (the waiter may have timed out meanwhile)"""
+        if not future.done():
+            future.set_result(None)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "budget_mb": (self.budget_bytes or 0) // MB,
+                "reserved_mb": self._reserved // MB,
+                "waiting": len(self._waiters),
+                "admitted": self._admitted
+            }
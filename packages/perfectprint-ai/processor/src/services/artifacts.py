@@ -0,0 +1,383 @@
+"""
+Artifact Store for processed outputs
+
+Processed PNGs and SVGs are written once, named by the SHA-256 of their
+bytes, and handed out as small handles ({url, sha256, size, ...}) instead
+of inline file contents. Files are served back from /artifacts/{id} with
+Range and conditional-GET support, and expire after ARTIFACT_TTL.
+- "local" backend: files under ARTIFACT_DIR
+- "s3" backend: any S3-compatible bucket (AWS, MinIO, LocalStack), selected
+  with ARTIFACT_BACKEND=s3
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+from utils.logger import logger
+from utils.config import env_int, env_str
+
+# boto3 is optional (only needed for ARTIFACT_BACKEND=s3)
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+    BOTO3_AVAILABLE = True
+except ImportError:
+    boto3 = None
+    ClientError = Exception
+    BOTO3_AVAILABLE = False
+
+# Storage backends selectable with ARTIFACT_BACKEND
+ARTIFACT_BACKENDS = ('local', 's3')
+
+# Artifact kinds (file extension) -> (content type, content encoding)
+ARTIFACT_TYPES = {
+    'png': ('image/png', None),
+    'svg': ('image/svg+xml', None),
+    'svgz': ('image/svg+xml', 'gzip')
+}
+
+READ_CHUNK_BYTES = 256 * 1024
+
+_ARTIFACT_ID = re.compile(r'^([0-9a-f]{64})\.([a-z]+)$')
+
+
+class ArtifactInfo(NamedTuple):
+    """Size and write time of a stored artifact"""
+    size: int
+    modified: float
+
+
+class LocalBackend:
+    """
+    Artifacts as files on local disk
+    """
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: Directory holding the files
+        """
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def stat(self, key: str) -> Optional[ArtifactInfo]:
+        try:
+            st = os.stat(self._path(key))
+        except OSError:
+            return None
+        return ArtifactInfo(st.st_size, st.st_mtime)
+
+    def write(self, key: str, data: bytes, content_type: str):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def touch(self, key: str):
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def read(self, key: str, start: int, end: int) -> Iterator[bytes]:
+        with open(self._path(key), 'rb') as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def list(self) -> Iterator[Tuple[str, ArtifactInfo]]:
+        for root, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                yield name, ArtifactInfo(st.st_size, st.st_mtime)
+
+
+class S3Backend:
+    """
+    Artifacts as objects in an S3-compatible bucket
+    """
+
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: Optional[str] = None):
+        """
+        Args:
+            bucket: Bucket name (must exist)
+            prefix: Key prefix inside the bucket
+            endpoint_url: S3 endpoint (e.g. http://minio:9000); None for AWS
+        """
+        if not BOTO3_AVAILABLE:
+            raise RuntimeError("ARTIFACT_BACKEND=s3 requires boto3")
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.client = boto3.client('s3', endpoint_url=endpoint_url or None)
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    def stat(self, key: str) -> Optional[ArtifactInfo]:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError:
+            return None
+        return ArtifactInfo(head['ContentLength'], head['LastModified'].timestamp())
+
+    def write(self, key: str, data: bytes, content_type: str):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data, ContentType=content_type)
+
+    def touch(self, key: str):
+        # Copying an object onto itself resets LastModified (what the TTL reads)
+        try:
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=self._key(key),
+                CopySource={'Bucket': self.bucket, 'Key': self._key(key)},
+                MetadataDirective='REPLACE'
+            )
+        except ClientError:
+            pass
+
+    def read(self, key: str, start: int, end: int) -> Iterator[bytes]:
+        if end <= start:
+            return
+        response = self.client.get_object(
+            Bucket=self.bucket, Key=self._key(key), Range=f"bytes={start}-{end - 1}"
+        )
+        body = response['Body']
+        try:
+            yield from body.iter_chunks(READ_CHUNK_BYTES)
+        finally:
+            body.close()
+
+    def delete(self, key: str):
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError:
+            pass
+
+    def list(self) -> Iterator[Tuple[str, ArtifactInfo]]:
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get('Contents', []):
+                name = item['Key'][len(self.prefix):]
+                yield name, ArtifactInfo(item['Size'], item['LastModified'].timestamp())
+
+
+def _backend_from_env():
+    """Build the backend chosen by ARTIFACT_BACKEND"""
+    name = env_str('ARTIFACT_BACKEND', 'local').lower()
+    if name not in ARTIFACT_BACKENDS:
+        logger.warning(f"⚠️  Unknown ARTIFACT_BACKEND '{name}', using local")
+        name = 'local'
+
+    if name == 's3':
+        bucket = env_str('ARTIFACT_S3_BUCKET', '')
+        if bucket and BOTO3_AVAILABLE:
+            return S3Backend(
+                bucket,
+                prefix=env_str('ARTIFACT_S3_PREFIX', ''),
+                endpoint_url=env_str('ARTIFACT_S3_ENDPOINT', '')
+            )
+        logger.warning("⚠️  ARTIFACT_BACKEND=s3 needs boto3 and ARTIFACT_S3_BUCKET, using local")
+
+    return LocalBackend(env_str('ARTIFACT_DIR', '/tmp/perfectprint-artifacts'))
+
+
+class ArtifactStore:
+    """
+    Content-addressed, write-once artifact storage with TTL expiry
+    """
+
+    def __init__(self, backend=None, base_url: Optional[str] = None, ttl_seconds: Optional[int] = None):
+        """
+        Initialize the store
+
+        Args:
+            backend: LocalBackend, S3Backend or anything with the same methods
+                (default: chosen by ARTIFACT_BACKEND)
+            base_url: Public URL of this service, prefixed to artifact URLs
+                (default: PUBLIC_BASE_URL; unset gives relative URLs)
+            ttl_seconds: Artifact lifetime since last written (default:
+                ARTIFACT_TTL or 7 days)
+        """
+        self.backend = backend if backend is not None else _backend_from_env()
+        self.base_url = (base_url if base_url is not None else env_str('PUBLIC_BASE_URL', '')).rstrip('/')
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else env_int('ARTIFACT_TTL', 7 * 86400)
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+
+        # Stats
+        self._writes = 0
+        self._dedup_hits = 0
+        self._expired = 0
+
+        logger.info(f"🗃️  Artifact store: {type(self.backend).__name__} (TTL {self.ttl_seconds}s)")
+
+    def _expired_at(self, info: ArtifactInfo, now: Optional[float] = None) -> bool:
+        return (now or time.time()) - info.modified > self.ttl_seconds
+
+    def put(self, data: bytes, kind: str) -> dict:
+        """
+        Store bytes (blocking)
+
+        The same bytes are only written once; storing them again just
+        restarts their TTL.
+
+        Args:
+            data: File contents
+            kind: Artifact type (a key of ARTIFACT_TYPES: png, svg, svgz)
+
+        Returns:
+            Handle with id, url, sha256, size and content_type
+        """
+        if kind not in ARTIFACT_TYPES:
+            raise ValueError(f"Unsupported artifact type: {kind}")
+
+        digest = hashlib.sha256(data).hexdigest()
+        artifact_id = f"{digest}.{kind}"
+        content_type, _ = ARTIFACT_TYPES[kind]
+
+        info = self.backend.stat(artifact_id)
+        if info is not None and info.size == len(data):
+            self.backend.touch(artifact_id)
+            with self._lock:
+                self._dedup_hits += 1
+        else:
+            self.backend.write(artifact_id, data, content_type)
+            with self._lock:
+                self._writes += 1
+            logger.info(f"🗃️  Stored artifact {artifact_id} ({len(data)} bytes)")
+            self._maybe_sweep()
+
+        return {
+            "id": artifact_id,
+            "url": self.url(artifact_id),
+            "sha256": digest,
+            "size": len(data),
+            "content_type": content_type
+        }
+
+    def stat(self, artifact_id: str) -> Optional[ArtifactInfo]:
+        """
+        Look up a live artifact (blocking)
+
+        Args:
+            artifact_id: Artifact ID from put()
+
+        Returns:
+            ArtifactInfo, or None if the ID is malformed, unknown or expired
+        """
+        match = _ARTIFACT_ID.match(artifact_id)
+        if not match or match.group(2) not in ARTIFACT_TYPES:
+            return None
+
+        info = self.backend.stat(artifact_id)
+        if info is None:
+            return None
+        if self._expired_at(info):
+            self.backend.delete(artifact_id)
+            with self._lock:
+                self._expired += 1
+            return None
+        return info
+
+    def read(self, artifact_id: str, start: int, end: int) -> Iterator[bytes]:
+        """
+        Stream bytes [start, end) of an artifact (blocking iterator)
+
+        Args:
+            artifact_id: Artifact ID (checked with stat() first)
+            start: First byte offset
+            end: Offset after the last byte
+
+        Returns:
+            Iterator of byte chunks
+        """
+        return self.backend.read(artifact_id, start, end)
+
+    def url(self, artifact_id: str) -> str:
+        """URL an artifact is served from"""
+        return f"{self.base_url}/artifacts/{artifact_id}"
+
+    def _maybe_sweep(self):
+        """Delete expired artifacts, at most every few minutes"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < min(self.ttl_seconds, 600):
+                return
+            self._last_sweep = now
+
+        removed = 0
+        for artifact_id, info in list(self.backend.list()):
+            if self._expired_at(info, now):
+                self.backend.delete(artifact_id)
+                removed += 1
+
+        if removed:
+            with self._lock:
+                self._expired += removed
+            logger.info(f"🧹 Artifact store removed {removed} expired artifacts")
+
+    def get_stats(self) -> dict:
+        """
+        Get write/dedup counts
+
+        Returns:
+            Dictionary with store statistics
+        """
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__,
+                "ttl_seconds": self.ttl_seconds,
+                "writes": self._writes,
+                "dedup_hits": self._dedup_hits,
+                "expired": self._expired
+            }
+
+
+def artifact_headers(artifact_id: str) -> dict:
+    """
+    Content headers for serving an artifact
+
+    Args:
+        artifact_id: Artifact ID from ArtifactStore.put()
+
+    Returns:
+        Dictionary with Content-Type (and Content-Encoding for svgz)
+    """
+    kind = artifact_id.rsplit('.', 1)[-1]
+    content_type, encoding = ARTIFACT_TYPES.get(kind, ('application/octet-stream', None))
+    headers = {"Content-Type": content_type}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return headers
@@ -15,11 +15,32 @@ import numpy as np
 from PIL import Image
 from transformers import AutoModelForImageSegmentation
 from torchvision import transforms
-from typing import Optional
+from typing import List, Optional
 import time
 import os
+import threading
 
 from utils.logger import logger
+from utils.config import env_int, env_float, env_str, env_bool
+from utils.executors import run_in_stage
+from utils.image_decode import reduce_to
+from utils.model_pool import ModelPool
+from utils.fallbacks import record_fallback
+from services.batching import MicroBatcher
+from services.bria_onnx import (
+    ONNXRUNTIME_AVAILABLE,
+    OnnxMaskPredictor,
+    export_onnx,
+    quantize_onnx,
+    compare_masks,
+    calibration_tensors
+)
+
+# Inference backends selectable with BRIA_BACKEND
+BRIA_BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+# Model input resolution (BRIA works best at 1024x1024)
+BRIA_INPUT_SIZE = 1024
 
 
 class BackgroundRemovalService:
@@ -30,9 +51,33 @@ class BackgroundRemovalService:
     def __init__(self):
         """Initialize the background removal service"""
         self.model = None
+        self.model_pool = None
         self.device = None
         self.transform = None
         self.model_loaded = False
+        self._load_lock = threading.Lock()
+        
+        # Inference backend: eager PyTorch, or ONNX Runtime (fp32 / int8)
+        self.backend = env_str('BRIA_BACKEND', 'torch').lower()
+        if self.backend not in BRIA_BACKENDS:
+            logger.warning(f"⚠️  Unknown BRIA_BACKEND '{self.backend}', using torch")
+            self.backend = 'torch'
+        self.onnx_dir = env_str('BRIA_ONNX_DIR', os.path.expanduser('~/.cache/perfectprint/onnx'))
+        self.onnx_predictor = None
+        self.backend_check = None
+        
+        # Concurrent requests are stacked into one forward pass
+        # (every input is resized to 1024x1024, so they batch cleanly)
+        self.max_batch_size = env_int('BRIA_MAX_BATCH_SIZE', 4)
+        self.max_batch_wait_ms = env_float('BRIA_MAX_BATCH_WAIT_MS', 10.0)
+        self.batcher = None
+        if self.max_batch_size > 1:
+            self.batcher = MicroBatcher(
+                self._predict_masks,
+                max_batch_size=self.max_batch_size,
+                max_wait_ms=self.max_batch_wait_ms,
+                name="bria-batcher"
+            )
         
     def _load_model(self):
         """
@@ -41,7 +86,14 @@ class BackgroundRemovalService:
         """
         if self.model_loaded:
             return
-            
+        
+        # Warmup and a first request may race to load
+        with self._load_lock:
+            if not self.model_loaded:
+                self._load_model_locked()
+    
+    def _load_model_locked(self):
+        """Load BRIA (caller holds _load_lock)"""
         logger.info("📦 Loading BRIA-RMBG-2.0 model...")
         start_time = time.time()
         
@@ -63,84 +115,276 @@ class BackgroundRemovalService:
             self.model.to(self.device)
             self.model.eval()
             
+            # Inference checks a replica out; the micro-batcher feeds one
+            # batch at a time, so more replicas only help with batching off
+            self.model_pool = ModelPool('bria', self.model, env_int('BRIA_REPLICAS', 1))
+            
             # Define image transformation pipeline
             self.transform = transforms.Compose([
-                transforms.Resize((1024, 1024)),  # BRIA works best at 1024x1024
+                transforms.Resize((BRIA_INPUT_SIZE, BRIA_INPUT_SIZE)),
                 transforms.ToTensor(),
                 transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
             ])
             
+            if self.backend != 'torch':
+                self._load_onnx_backend()
+            
             self.model_loaded = True
             load_time = time.time() - start_time
-            logger.info(f"✅ BRIA-RMBG-2.0 loaded in {load_time:.2f}s")
+            logger.info(f"✅ BRIA-RMBG-2.0 loaded in {load_time:.2f}s (backend: {self.backend})")
             
         except Exception as e:
             logger.error(f"❌ Failed to load BRIA-RMBG-2.0: {str(e)}")
             raise
     
+    def warmup(self) -> dict:
+        """
+        Load the model and run one dummy inference (blocking)
+        
+        Returns:
+            Dictionary with state and load/warmup timings
+        """
+        start_time = time.time()
+        self._load_model()
+        load_time = time.time() - start_time
+        
+        start_time = time.time()
+        self._predict_masks([torch.zeros(3, 1024, 1024)])
+        warmup_time = time.time() - start_time
+        
+        return {
+            "state": "ready",
+            "load_time": round(load_time, 2),
+            "warmup_time": round(warmup_time, 2),
+            "device": str(self.device),
+            "backend": self.backend
+        }
+    
+    def after_fork(self, threads: int):
+        """
+        Re-create per-process state in a forked server worker
+        
+        PyTorch weights are inherited copy-on-write, but an ONNX Runtime
+        session's thread pool does not survive fork, so the session is
+        opened again from its file.
+        
+        Args:
+            threads: Cores this worker may use
+        """
+        if self.onnx_predictor is not None:
+            self.onnx_predictor = OnnxMaskPredictor(
+                self.onnx_predictor.path,
+                threads=env_int('BRIA_ONNX_THREADS', 0) or threads
+            )
+    
+    def _load_onnx_backend(self):
+        """
+        Switch inference to ONNX Runtime
+        
+        Exports (and for onnx-int8, quantizes) the model on first use and
+        reuses the files afterwards. Unless BRIA_ONNX_VERIFY=0, the new
+        backend's masks are checked against the eager model and rejected
+        if they drift past BRIA_ONNX_MIN_IOU / BRIA_ONNX_MAX_MAE. Any
+        failure leaves the service on the torch backend.
+        """
+        if not ONNXRUNTIME_AVAILABLE:
+            logger.warning("⚠️  onnxruntime not installed, using torch backend for BRIA")
+            self.backend = 'torch'
+            return
+        
+        try:
+            fp32_path = os.path.join(self.onnx_dir, 'rmbg-2.0.onnx')
+            if not os.path.exists(fp32_path):
+                try:
+                    export_onnx(self.model.to('cpu'), fp32_path)
+                finally:
+                    # Back on its device even if the export fails, since
+                    # the torch backend is the fallback
+                    self.model.to(self.device)
+            
+            path = fp32_path
+            if self.backend == 'onnx-int8':
+                path = os.path.join(self.onnx_dir, 'rmbg-2.0.int8.onnx')
+                if not os.path.exists(path):
+                    quantize_onnx(fp32_path, path)
+            
+            predictor = OnnxMaskPredictor(path, threads=env_int('BRIA_ONNX_THREADS', 0))
+            
+            if env_bool('BRIA_ONNX_VERIFY', True):
+                inputs = calibration_tensors(self.transform, env_str('BRIA_ONNX_VERIFY_DIR', ''))
+                reference = self._predict_masks(inputs)
+                self.backend_check = compare_masks(reference, predictor(inputs))
+                
+                min_iou = env_float('BRIA_ONNX_MIN_IOU', 0.98)
+                max_mae = env_float('BRIA_ONNX_MAX_MAE', 0.02)
+                passed = self.backend_check['iou'] >= min_iou and self.backend_check['mae'] <= max_mae
+                self.backend_check['passed'] = passed
+                logger.info(f"   {self.backend} vs eager masks: IoU {self.backend_check['iou']}, MAE {self.backend_check['mae']}")
+                
+                if not passed:
+                    logger.warning(f"⚠️  {self.backend} masks drift too far from eager model, using torch backend")
+                    self.backend = 'torch'
+                    return
+            
+            self.onnx_predictor = predictor
+            
+            # The eager model is no longer needed for inference (ONNX
+            # Runtime sessions are safe to run from several threads)
+            self.model = None
+            self.model_pool = None
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to load {self.backend} backend: {str(e)}")
+            logger.warning("   Using torch backend for BRIA")
+            self.backend = 'torch'
+    
+    def _predict_masks(self, input_tensors: List[torch.Tensor]) -> List[torch.Tensor]:
+        """
+        Run BRIA on a batch of preprocessed images
+        
+        Args:
+            input_tensors: Normalized 3x1024x1024 tensors
+            
+        Returns:
+            1024x1024 mask tensors (0-1), in the same order
+        """
+        if self.onnx_predictor is not None:
+            return self.onnx_predictor(input_tensors)
+        
+        batch = torch.stack(input_tensors).to(self.device)
+        
+        with self.model_pool.checkout() as model, torch.no_grad():
+            predictions = model(batch)[-1].sigmoid().cpu()
+        
+        return [predictions[i].squeeze() for i in range(len(input_tensors))]
+    
     async def remove_background(self, image: Image.Image) -> Image.Image:
         """
         Remove background from an image
         
+        Runs on the background_removal stage executor so the event loop
+        stays free while the model works.
+        
         Args:
             image: PIL Image object (RGB)
             
         Returns:
             PIL Image object with transparent background (RGBA)
         """
+        return await run_in_stage('background_removal', self._remove_background, image)
+    
+    def _remove_background(self, image: Image.Image) -> Image.Image:
+        """
+        Remove background from an image (blocking)
+        
+        Args:
+            image: PIL Image object (RGB)
+            
+        Returns:
+            PIL Image object with transparent background (RGBA)
+        """
+        start_time = time.time()
+        
+        result = self._apply_mask(image, self._predict_mask(image))
+        
+        process_time = time.time() - start_time
+        logger.info(f"   Background removed in {process_time:.2f}s")
+        
+        return result
+    
+    async def predict_mask(self, image: Image.Image) -> Optional[Image.Image]:
+        """
+        Segment the foreground without touching the full-size image
+        
+        Lets the pipeline segment the original image and apply the mask
+        after upscaling (see apply_mask).
+        
+        Args:
+            image: PIL Image object (RGB)
+            
+        Returns:
+            1024x1024 mask (mode L), or None if the model failed
+        """
+        return await run_in_stage('background_removal', self._predict_mask, image)
+    
+    async def apply_mask(self, image: Image.Image, mask: Optional[Image.Image]) -> Image.Image:
+        """
+        Resize a mask to an image and use it as the alpha channel
+        
+        Args:
+            image: PIL Image object (RGB), any size
+            mask: Mask from predict_mask (None falls back to white removal)
+            
+        Returns:
+            PIL Image object with transparent background (RGBA)
+        """
+        return await run_in_stage('background_removal', self._apply_mask, image, mask)
+    
+    def _predict_mask(self, image: Image.Image) -> Optional[Image.Image]:
+        """
+        Run BRIA on an image (blocking)
+        
+        Args:
+            image: PIL Image object (RGB)
+            
+        Returns:
+            1024x1024 mask (mode L), or None if the model failed
+        """
         # Load model if not already loaded
         if not self.model_loaded:
             self._load_model()
         
         try:
-            start_time = time.time()
-            
-            # Store original size
-            original_size = image.size
+            # Box-reduce large inputs first, so the resize to model
+            # resolution resamples a few megapixels, not the whole image
+            image = reduce_to(image, (BRIA_INPUT_SIZE, BRIA_INPUT_SIZE))
             
             # Convert to RGB if needed
             if image.mode != 'RGB':
                 image = image.convert('RGB')
             
             # Prepare image for model
-            input_tensor = self.transform(image).unsqueeze(0).to(self.device)
-            
-            # Run inference
-            with torch.no_grad():
-                predictions = self.model(input_tensor)[-1].sigmoid().cpu()
+            input_tensor = self.transform(image)
             
-            # Get the mask
-            mask = predictions[0].squeeze()
-            mask_pil = transforms.ToPILImage()(mask)
+            # Run inference (batched with any concurrent requests)
+            if self.batcher:
+                mask = self.batcher.run(input_tensor)
+            else:
+                mask = self._predict_masks([input_tensor])[0]
             
-            # Resize mask back to original size
-            mask_pil = mask_pil.resize(original_size, Image.Resampling.LANCZOS)
+            return transforms.ToPILImage()(mask)
             
-            # Convert mask to numpy array
-            mask_array = np.array(mask_pil)
-            
-            # Resize original image back if needed
-            if image.size != original_size:
-                image = image.resize(original_size, Image.Resampling.LANCZOS)
+        except Exception as e:
+            logger.error(f"❌ Background removal failed: {str(e)}")
+            return None
+    
+    def _apply_mask(self, image: Image.Image, mask: Optional[Image.Image]) -> Image.Image:
+        """
+        Apply a BRIA mask to an image (blocking)
+        
+        Args:
+            image: PIL Image object (RGB), any size
+            mask: Mask from _predict_mask, or None
             
-            # Convert image to RGBA
-            image_rgba = image.convert('RGBA')
-            image_array = np.array(image_rgba)
+        Returns:
+            PIL Image object with transparent background (RGBA)
+        """
+        if mask is None:
+            # Return original image with white background removed as fallback
+            return self._fallback_background_removal(image)
+        
+        try:
+            # Resize mask to the image (one resample from model resolution)
+            mask = mask.resize(image.size, Image.Resampling.LANCZOS)
             
             # Apply mask to alpha channel
-            image_array[:, :, 3] = mask_array
-            
-            # Create final image
-            result = Image.fromarray(image_array, 'RGBA')
-            
-            process_time = time.time() - start_time
-            logger.info(f"   Background removed in {process_time:.2f}s")
+            result = image.convert('RGBA')
+            result.putalpha(mask)
             
             return result
             
         except Exception as e:
             logger.error(f"❌ Background removal failed: {str(e)}")
-            # Return original image with white background removed as fallback
             return self._fallback_background_removal(image)
     
     def _fallback_background_removal(self, image: Image.Image) -> Image.Image:
@@ -155,6 +399,7 @@ class BackgroundRemovalService:
             PIL Image with white background removed
         """
         logger.warning("⚠️  Using fallback background removal (simple white removal)")
+        record_fallback('background_removal')
         
         try:
             # Convert to RGBA
@@ -179,6 +424,10 @@ class BackgroundRemovalService:
             # Last resort: return original
             return image.convert('RGBA')
     
+    def get_pool_stats(self) -> dict:
+        """Replica pool statistics (empty when ONNX Runtime serves inference)"""
+        return {"bria": self.model_pool.get_stats()} if self.model_pool else {}
+    
     def get_model_info(self) -> dict:
         """
         Get information about the loaded model
@@ -193,7 +442,10 @@ class BackgroundRemovalService:
             "source": "https://huggingface.co/briaai/RMBG-2.0",
             "license": "Creative ML Open RAIL-M",
             "accuracy": "98%",
-            "typical_speed": "2-3 seconds"
+            "typical_speed": "2-3 seconds",
+            "backend": self.backend,
+            "backend_check": self.backend_check,
+            "batching": self.batcher.get_stats() if self.batcher else None
         }
 
 
@@ -0,0 +1,267 @@
+"""
+Batch processing for multi-design orders
+
+Runs every design of an order through the pipeline from one request:
+- Designs arrive as many files or one zip archive
+- Options are shared, or set per file (by position or filename)
+- Designs run concurrently, so they share the stage executors and BRIA's
+  micro-batcher instead of queueing behind each other one request at a time
+- Each design is read from its spooled upload or archive entry only when
+  its turn comes, so at most BATCH_CONCURRENCY designs are in memory
+- Results are handed back one by one as each design finishes
+"""
+
+import asyncio
+import functools
+import io
+import json
+import os
+import zipfile
+from typing import AsyncIterator, BinaryIO, Callable, List, NamedTuple, Optional, Tuple, Union
+
+from utils.logger import logger
+from utils.config import env_int
+from utils.executors import run_in_stage
+from services.ingest import IngestLimits
+
+# Options a caller may set per file
+ITEM_OPTIONS = ('upscale', 'remove_background', 'vectorize', 'vectorizer_config')
+
+
+class BatchError(ValueError):
+    """Raised when a batch request is malformed or too large"""
+
+
+class BatchItem(NamedTuple):
+    """One design of a batch"""
+    index: int
+    filename: str
+    load: Callable[[], bytes]
+    options: dict
+
+
+def read_file(file: BinaryIO) -> bytes:
+    """
+    Read a seekable file from the start (blocking)
+
+    Args:
+        file: Spooled upload or other seekable file
+
+    Returns:
+        Its contents
+    """
+    file.seek(0)
+    return file.read()
+
+
+class BatchProcessor:
+    """
+    Expands batch requests into items and runs them through the pipeline
+    """
+
+    def __init__(
+        self,
+        pipeline,
+        max_items: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        limits: Optional[IngestLimits] = None
+    ):
+        """
+        Initialize the batch processor
+
+        Args:
+            pipeline: ProcessingPipeline every item runs through
+            max_items: Most designs accepted per batch (default: BATCH_MAX_ITEMS or 100)
+            concurrency: Designs in flight at once (default: BATCH_CONCURRENCY or 8)
+            limits: Per-design byte and pixel limits (default: IngestLimits from the environment)
+        """
+        self.pipeline = pipeline
+        self.limits = limits or IngestLimits()
+        self.max_items = max_items or env_int('BATCH_MAX_ITEMS', 100)
+        self.concurrency = max(1, concurrency or env_int('BATCH_CONCURRENCY', 8))
+        self.max_archive_bytes = env_int('BATCH_MAX_ARCHIVE_MB', 1024) * 1024 * 1024
+
+    def expand_archive(self, contents: Union[bytes, BinaryIO]) -> List[Tuple[str, Callable[[], bytes]]]:
+        """
+        List the designs in a zip archive
+
+        Directories, hidden files and macOS resource forks are skipped.
+        Nothing is inflated here; each design is read by its loader.
+
+        Args:
+            contents: Zip archive bytes, or a seekable file holding it
+                (which must stay open until the designs are loaded)
+
+        Returns:
+            (filename, loader) per design, in archive order; the loader
+            returns the design's bytes (blocking)
+
+        Raises:
+            BatchError: If the archive is invalid or too large
+            IngestError: If a design is over the byte limit
+        """
+        try:
+            archive = zipfile.ZipFile(io.BytesIO(contents) if isinstance(contents, bytes) else contents)
+        except zipfile.BadZipFile as e:
+            raise BatchError(f"Invalid zip archive: {str(e)}")
+
+        entries = [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and not os.path.basename(info.filename).startswith('.')
+            and not info.filename.startswith('__MACOSX/')
+        ]
+        if len(entries) > self.max_items:
+            raise BatchError(f"Archive holds {len(entries)} files, the limit is {self.max_items}")
+
+        # Check declared sizes before inflating anything
+        total = sum(info.file_size for info in entries)
+        if total > self.max_archive_bytes:
+            raise BatchError(f"Archive expands to {total} bytes, the limit is {self.max_archive_bytes}")
+        for info in entries:
+            self.limits.check_size(info.file_size, info.filename)
+
+        return [(info.filename, functools.partial(archive.read, info)) for info in entries]
+
+    def build_items(
+        self,
+        files: List[Tuple[str, Callable[[], bytes]]],
+        shared_options: dict,
+        per_file_options: Optional[str] = None
+    ) -> List[BatchItem]:
+        """
+        Combine designs with their options
+
+        Args:
+            files: (filename, loader) per design; the loader returns its bytes (blocking)
+            shared_options: Options applied to every design
+            per_file_options: Optional JSON: a list (by position) or an
+                object keyed by filename, each entry overriding shared options
+
+        Returns:
+            Batch items in input order
+
+        Raises:
+            BatchError: If there are no designs, too many, or the options are invalid
+        """
+        if not files:
+            raise BatchError("No files in batch")
+        if len(files) > self.max_items:
+            raise BatchError(f"Batch holds {len(files)} files, the limit is {self.max_items}")
+
+        overrides = [{} for _ in files]
+        if per_file_options:
+            try:
+                parsed = json.loads(per_file_options)
+            except json.JSONDecodeError as e:
+                raise BatchError(f"Invalid options JSON: {str(e)}")
+
+            if isinstance(parsed, list):
+                if len(parsed) > len(files):
+                    raise BatchError(f"{len(parsed)} option entries for {len(files)} files")
+                overrides[:len(parsed)] = parsed
+            elif isinstance(parsed, dict):
+                names = {filename for filename, _ in files}
+                unknown = set(parsed) - names
+                if unknown:
+                    raise BatchError(f"Options for unknown files: {', '.join(sorted(unknown))}")
+                overrides = [parsed.get(filename, {}) for filename, _ in files]
+            else:
+                raise BatchError("Options must be a list or an object keyed by filename")
+
+        items = []
+        for index, ((filename, load), override) in enumerate(zip(files, overrides)):
+            if not isinstance(override, dict) or set(override) - set(ITEM_OPTIONS):
+                raise BatchError(f"Invalid options for {filename}; allowed: {', '.join(ITEM_OPTIONS)}")
+            options = dict(shared_options)
+            options.update(override)
+            items.append(BatchItem(index, filename, load, options))
+        return items
+
+    async def run(self, items: List[BatchItem]) -> AsyncIterator[dict]:
+        """
+        Process items concurrently, yielding each result as it finishes
+
+        Args:
+            items: Batch items
+
+        Returns:
+            Async iterator of dictionaries with index, filename, success and
+            either the pipeline "output" or an "error"
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def process(item: BatchItem) -> dict:
+            async with semaphore:
+                try:
+                    # Read only now, inside the concurrency limit
+                    contents = await run_in_stage('decode', item.load)
+                    # Header-only check before the pipeline decodes anything
+                    await run_in_stage('decode', self.limits.preflight, contents, item.filename)
+                    output = await self.pipeline.process(
+                        contents,
+                        upscale=item.options.get('upscale', False),
+                        remove_background=item.options.get('remove_background', True),
+                        vectorize=item.options.get('vectorize', True),
+                        filename=item.filename,
+                        vectorizer_config=item.options.get('vectorizer_config')
+                    )
+                    return {"index": item.index, "filename": item.filename, "success": True, "output": output}
+                except Exception as e:
+                    logger.error(f"❌ Batch item {item.filename} failed: {str(e)}")
+                    return {"index": item.index, "filename": item.filename, "success": False, "error": str(e)}
+
+        logger.info(f"📦 Batch of {len(items)} designs ({self.concurrency} at a time)")
+
+        tasks = [asyncio.ensure_future(process(item)) for item in items]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Client went away mid-stream: stop whatever has not started
+            for task in tasks:
+                task.cancel()
+
+
+def build_zip(results: List[dict]) -> bytes:
+    """
+    Pack batch results into a zip archive (blocking)
+
+    Each design gets "<index>-<name>.png" and ".svg" entries; manifest.json
+    lists sizes, metrics and errors for every design.
+
+    Args:
+        results: Results from BatchProcessor.run()
+
+    Returns:
+        Zip archive bytes
+    """
+    buffer = io.BytesIO()
+    manifest = []
+
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for result in sorted(results, key=lambda result: result["index"]):
+            stem = os.path.splitext(os.path.basename(result["filename"] or ''))[0] or 'design'
+            prefix = f"{result['index']:03d}-{stem}"
+            entry = {"index": result["index"], "filename": result["filename"], "success": result["success"]}
+
+            if result["success"]:
+                output = result["output"]
+                results_out = output["results"]
+                # PNGs are already compressed; SVG text deflates well
+                archive.writestr(f"{prefix}.png", results_out["processed_png"], compress_type=zipfile.ZIP_STORED)
+                entry["png"] = f"{prefix}.png"
+                if results_out.get("processed_svg") is not None:
+                    archive.writestr(f"{prefix}.svg", results_out["processed_svg"], compress_type=zipfile.ZIP_DEFLATED)
+                    entry["svg"] = f"{prefix}.svg"
+                entry["original_size"] = results_out["original_size"]
+                entry["processed_size"] = results_out["processed_size"]
+                entry["metrics"] = output["metrics"]
+            else:
+                entry["error"] = result["error"]
+
+            manifest.append(entry)
+
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+
+    return buffer.getvalue()
@@ -0,0 +1,151 @@
+"""
+Micro-batching for model inference
+
+Collects requests that arrive within a short window and runs them as a
+single batch, so concurrent callers share one forward pass.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+from utils.logger import logger
+
+
+class MicroBatcher:
+    """
+    Groups concurrent single-item calls into batched calls
+
+    Callers block on run() (or wait on the Future from submit()) while a
+    dedicated thread gathers up to max_batch_size items, waiting at most
+    max_wait_ms after the first one arrives, and hands them to batch_fn.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 4,
+        max_wait_ms: float = 10.0,
+        name: str = "batcher"
+    ):
+        """
+        Initialize the batcher
+
+        Args:
+            batch_fn: Takes a list of items, returns a list of results in the same order
+            max_batch_size: Largest batch handed to batch_fn
+            max_wait_ms: How long to hold the first item while waiting for more
+            name: Name used for the batching thread and logs
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._running = False
+
+        # Stats
+        self._batches = 0
+        self._items = 0
+
+    def start(self):
+        """Start the batching thread (called automatically on first submit)"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._batch_loop, name=self.name, daemon=True)
+            self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        """
+        Queue an item for the next batch
+
+        Args:
+            item: Single input for batch_fn
+
+        Returns:
+            Future resolved with the item's result
+        """
+        if not self._running:
+            self.start()
+
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def run(self, item: Any) -> Any:
+        """
+        Queue an item and wait for its result
+
+        Args:
+            item: Single input for batch_fn
+
+        Returns:
+            The item's result
+        """
+        return self.submit(item).result()
+
+    def _batch_loop(self):
+        """Gather items into batches until stopped"""
+        while self._running:
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+
+            try:
+                results = self.batch_fn(items)
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"❌ Batch of {len(items)} failed in {self.name}: {str(e)}")
+                for future in futures:
+                    future.set_exception(e)
+
+            self._batches += 1
+            self._items += len(items)
+
+    def stop(self):
+        """Stop the batching thread once the current batch finishes"""
+        with self._lock:
+            self._running = False
+            thread = self._thread
+            self._thread = None
+        if thread:
+            thread.join(timeout=5)
+
+    def get_stats(self) -> dict:
+        """
+        Get batching statistics
+
+        Returns:
+            Dictionary with batch counts and average batch size
+        """
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0
+        }
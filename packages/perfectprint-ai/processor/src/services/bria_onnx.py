@@ -0,0 +1,187 @@
+"""
+ONNX Runtime backend for BRIA-RMBG-2.0
+
+Eager PyTorch fp32 is the slowest part of background removal on CPU-only
+nodes. This module exports the model once to ONNX, runs it under ONNX
+Runtime with full graph optimisation, optionally int8-quantizes it, and
+checks its masks against the eager model before it is trusted.
+"""
+
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+import torch
+
+from utils.logger import logger
+
+# ONNX Runtime is optional
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ort = None
+    ONNXRUNTIME_AVAILABLE = False
+
+
+class _MaskHead(torch.nn.Module):
+    """Wraps BRIA so the exported graph returns final mask probabilities"""
+
+    def __init__(self, model: torch.nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.model(x)[-1].sigmoid()
+
+
+def export_onnx(model: torch.nn.Module, path: str, size: int = 1024, opset: int = 17):
+    """
+    Export BRIA to ONNX with a dynamic batch dimension
+
+    Args:
+        model: Loaded BRIA model (eval mode, on CPU)
+        path: Output .onnx file
+        size: Input resolution
+        opset: ONNX opset version
+    """
+    logger.info(f"📦 Exporting BRIA-RMBG-2.0 to ONNX: {path}")
+    start_time = time.time()
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    dummy = torch.zeros(1, 3, size, size)
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _MaskHead(model).eval(),
+            dummy,
+            tmp_path,
+            input_names=['input'],
+            output_names=['mask'],
+            dynamic_axes={'input': {0: 'batch'}, 'mask': {0: 'batch'}},
+            opset_version=opset
+        )
+    os.replace(tmp_path, path)
+
+    logger.info(f"✅ ONNX export done in {time.time() - start_time:.2f}s")
+
+
+def quantize_onnx(src_path: str, dst_path: str):
+    """
+    Write an int8 dynamically-quantized copy of an ONNX model
+
+    Weights of MatMul/Gemm (the Swin backbone) become int8;
+    activations are quantized on the fly.
+
+    Args:
+        src_path: fp32 .onnx file
+        dst_path: Output .onnx file
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    logger.info(f"📦 Quantizing BRIA ONNX model to int8: {dst_path}")
+    start_time = time.time()
+
+    tmp_path = f"{dst_path}.tmp"
+    quantize_dynamic(src_path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, dst_path)
+
+    logger.info(f"✅ Quantization done in {time.time() - start_time:.2f}s")
+
+
+class OnnxMaskPredictor:
+    """
+    BRIA inference under ONNX Runtime
+
+    Callable like BackgroundRemovalService._predict_masks: takes a list of
+    normalized 3x1024x1024 tensors, returns a list of 1024x1024 masks.
+    """
+
+    def __init__(self, path: str, threads: int = 0):
+        """
+        Create the inference session
+
+        Args:
+            path: .onnx file
+            threads: Intra-op threads (0 lets ONNX Runtime decide)
+        """
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, input_tensors: List[torch.Tensor]) -> List[torch.Tensor]:
+        batch = torch.stack(input_tensors).cpu().numpy()
+        masks = self.session.run(None, {self.input_name: batch})[0]
+        return [torch.from_numpy(masks[i]).squeeze() for i in range(len(input_tensors))]
+
+
+def compare_masks(reference: List[torch.Tensor], candidate: List[torch.Tensor]) -> dict:
+    """
+    Measure how closely a backend's masks match the eager model's
+
+    Args:
+        reference: Masks from eager PyTorch (0-1)
+        candidate: Masks from the backend under test (0-1)
+
+    Returns:
+        Dictionary with mean absolute error and IoU of the thresholded masks
+        (worst case over the inputs)
+    """
+    worst_mae = 0.0
+    worst_iou = 1.0
+
+    for ref, cand in zip(reference, candidate):
+        ref = ref.float().numpy()
+        cand = cand.float().numpy()
+
+        worst_mae = max(worst_mae, float(np.abs(ref - cand).mean()))
+
+        ref_fg, cand_fg = ref > 0.5, cand > 0.5
+        union = np.logical_or(ref_fg, cand_fg).sum()
+        iou = np.logical_and(ref_fg, cand_fg).sum() / union if union else 1.0
+        worst_iou = min(worst_iou, float(iou))
+
+    return {"mae": round(worst_mae, 5), "iou": round(worst_iou, 5)}
+
+
+def calibration_tensors(transform, sample_dir: Optional[str] = None, count: int = 2) -> List[torch.Tensor]:
+    """
+    Inputs for the backend quality check
+
+    Uses images from sample_dir when given (real artwork is the better
+    test), otherwise synthetic logo-like shapes on a plain background.
+
+    Args:
+        transform: The service's preprocessing transform
+        sample_dir: Optional directory of sample images
+        count: Number of synthetic images
+
+    Returns:
+        Preprocessed input tensors
+    """
+    from PIL import Image, ImageDraw
+
+    images = []
+    if sample_dir and os.path.isdir(sample_dir):
+        for name in sorted(os.listdir(sample_dir)):
+            try:
+                images.append(Image.open(os.path.join(sample_dir, name)).convert('RGB'))
+            except OSError:
+                continue
+
+    if not images:
+        for i in range(count):
+            image = Image.new('RGB', (800, 600), color='white' if i % 2 == 0 else (40, 90, 160))
+            draw = ImageDraw.Draw(image)
+            draw.ellipse([200, 150, 600, 450], fill='red', outline='darkred', width=5)
+            draw.rectangle([350, 200 + 20 * i, 450, 400], fill='yellow')
+            images.append(image)
+
+    return [transform(image) for image in images]
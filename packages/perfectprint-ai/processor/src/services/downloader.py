@@ -0,0 +1,186 @@
+"""
+Image downloads for /process-url
+
+Fetches artwork from storefront CDNs without tying up a worker thread or
+holding an unbounded body in memory:
+- One pooled async HTTP client (keep-alive connections shared by every download)
+- Bodies stream into a spooled buffer (memory up to a threshold, then a
+  temp file), capped at the ingest byte limit
+- The image header is checked against the ingest limits before anything
+  is decoded (see services.ingest)
+- Redirects are followed here, a bounded number of hops, so every hop's
+  URL passes the same scheme and host checks as the first
+"""
+
+import asyncio
+import os
+import tempfile
+from typing import Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import httpx
+
+from utils.logger import logger
+from utils.config import env_float, env_int, env_str
+from utils.executors import run_in_stage
+from services.ingest import IngestError, IngestLimits
+
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+
+class DownloadError(IngestError):
+    """Raised when a URL is refused or cannot be fetched"""
+
+
+class ImageDownloader:
+    """
+    Streams images from URLs through a pooled async HTTP client
+    """
+
+    def __init__(self, limits: Optional[IngestLimits] = None, max_connections: Optional[int] = None):
+        """
+        Initialize the downloader
+
+        The HTTP client is created on first use, on the serving event loop.
+
+        Args:
+            limits: Byte and pixel limits (default: IngestLimits from the environment)
+            max_connections: Pooled connections (default: DOWNLOAD_MAX_CONNECTIONS or 32)
+        """
+        self.limits = limits or IngestLimits()
+        self.max_connections = max_connections or env_int('DOWNLOAD_MAX_CONNECTIONS', 32)
+        self.spool_bytes = env_int('DOWNLOAD_SPOOL_MB', 8) * 1024 * 1024
+        self.max_redirects = env_int('DOWNLOAD_MAX_REDIRECTS', 5)
+        self.timeout = httpx.Timeout(
+            env_float('DOWNLOAD_TIMEOUT', 30.0),
+            connect=env_float('DOWNLOAD_CONNECT_TIMEOUT', 5.0)
+        )
+
+        # Optional allowlist (e.g. the storefront CDN); empty allows any host
+        self.allowed_hosts = {
+            host.strip().lower()
+            for host in env_str('DOWNLOAD_ALLOWED_HOSTS', '').split(',')
+            if host.strip()
+        }
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_lock = asyncio.Lock()
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Create the shared client on first use"""
+        if self._client is None:
+            async with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.AsyncClient(
+                        timeout=self.timeout,
+                        limits=httpx.Limits(
+                            max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_connections
+                        ),
+                        # Followed in _open, so each hop is checked
+                        follow_redirects=False,
+                        headers={"User-Agent": "PerfectPrint-Processor/1.0"}
+                    )
+        return self._client
+
+    def _check_url(self, url: str):
+        """Reject non-HTTP URLs and hosts outside the allowlist"""
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+            raise DownloadError("URL must be http(s) with a host")
+        if self.allowed_hosts and parsed.hostname.lower() not in self.allowed_hosts:
+            raise DownloadError(f"Host not allowed: {parsed.hostname}", status_code=403)
+
+    async def _open(self, client: httpx.AsyncClient, url: str) -> httpx.Response:
+        """
+        Send a streaming GET, following redirects hop by hop
+
+        Args:
+            client: Shared HTTP client
+            url: http(s) URL of the image
+
+        Returns:
+            The final (non-redirect) response, body not yet read
+
+        Raises:
+            DownloadError: If any hop's URL is refused or there are too many hops
+        """
+        for _ in range(self.max_redirects + 1):
+            self._check_url(url)
+            response = await client.send(client.build_request('GET', url), stream=True)
+            if not response.is_redirect:
+                return response
+            await response.aclose()
+            url = urljoin(url, response.headers['location'])
+
+        raise DownloadError(f"More than {self.max_redirects} redirects", status_code=502)
+
+    async def fetch(self, url: str) -> Tuple[bytes, dict]:
+        """
+        Download an image and check its header
+
+        Args:
+            url: http(s) URL of the image
+
+        Returns:
+            (encoded image bytes, header info)
+
+        Raises:
+            DownloadError: If the URL is refused or the download fails
+            IngestError: If the body is too large or not an acceptable image
+        """
+        client = await self._get_client()
+
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+        try:
+            try:
+                response = await self._open(client, url)
+                try:
+                    if response.status_code >= 400:
+                        raise DownloadError(f"Download failed: HTTP {response.status_code}", status_code=502)
+
+                    declared = response.headers.get('content-length')
+                    if declared and declared.isdigit():
+                        self.limits.check_size(int(declared), url)
+
+                    received = 0
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+                        received += len(chunk)
+                        self.limits.check_size(received, url)
+                        spool.write(chunk)
+                finally:
+                    await response.aclose()
+            except httpx.TimeoutException:
+                raise DownloadError("Download timed out", status_code=504)
+            except httpx.HTTPError as e:
+                raise DownloadError(f"Download failed: {str(e)}", status_code=502)
+
+            spool.seek(0)
+            header = await run_in_stage('decode', self.limits.preflight, spool, url)
+
+            logger.info(
+                f"📥 Downloaded {received} bytes "
+                f"({header['format']} {header['width']}x{header['height']}) from {urlparse(url).hostname}"
+            )
+            return await run_in_stage('decode', spool.read), header
+        finally:
+            spool.close()
+
+    async def close(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def filename_from_url(url: str) -> Optional[str]:
+    """
+    Last path segment of a URL (for logs and results)
+
+    Args:
+        url: Image URL
+
+    Returns:
+        Filename, or None if the path has none
+    """
+    return os.path.basename(urlparse(url).path) or None
@@ -0,0 +1,136 @@
+"""
+Memory-bounded image ingest
+
+Every way an image enters the service (upload, URL, batch item) passes
+the same limits before any pixel is decoded:
+- Byte limit (INGEST_MAX_MB), checked on the spooled upload's size, so
+  oversized files are never read into memory
+- Pixel limit (INGEST_MAX_PIXELS), checked from the image header, so a
+  20000x20000 PNG is refused before it is decompressed
+Peak ingest memory is then bounded by the limits, not by what clients send.
+"""
+
+import os
+from typing import BinaryIO, Optional, Tuple, Union
+
+from fastapi import UploadFile
+
+from utils.logger import logger
+from utils.config import env_int
+from utils.executors import run_in_stage
+from utils.image_utils import read_image_header
+
+
+class IngestError(ValueError):
+    """Raised when an input image is refused"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        """
+        Args:
+            message: What went wrong
+            status_code: HTTP status to report to the caller
+        """
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class IngestLimits:
+    """
+    Byte and pixel limits for input images, with a header-only preflight
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, max_pixels: Optional[int] = None):
+        """
+        Initialize the limits
+
+        Args:
+            max_bytes: Largest encoded image accepted (default: INGEST_MAX_MB or 100 MB)
+            max_pixels: Largest image accepted (default: INGEST_MAX_PIXELS or 100 megapixels)
+        """
+        self.max_bytes = max_bytes or env_int('INGEST_MAX_MB', 100) * 1024 * 1024
+        self.max_pixels = max_pixels or env_int('INGEST_MAX_PIXELS', 100_000_000)
+
+    def check_size(self, size: int, name: Optional[str] = None):
+        """
+        Refuse an encoded image over the byte limit
+
+        Args:
+            size: Encoded size in bytes
+            name: Filename or URL (for the error message)
+
+        Raises:
+            IngestError: 413 if the image is too large
+        """
+        if size > self.max_bytes:
+            raise IngestError(
+                f"{name or 'Image'} is {size} bytes, the limit is {self.max_bytes}", status_code=413
+            )
+
+    def preflight(self, source: Union[bytes, BinaryIO], name: Optional[str] = None) -> dict:
+        """
+        Read an image's header and refuse it if too large (blocking)
+
+        Only the header is parsed; no pixels are decoded.
+
+        Args:
+            source: Encoded image bytes, or a seekable binary file
+            name: Filename or URL (for the error message)
+
+        Returns:
+            Header info (format, width, height, mode)
+
+        Raises:
+            IngestError: 415 if it is not an image, 413 if it has too many pixels
+        """
+        try:
+            header = read_image_header(source)
+        except ValueError as e:
+            raise IngestError(f"{name or 'Image'}: {str(e)}", status_code=415)
+
+        pixels = header["width"] * header["height"]
+        if pixels > self.max_pixels:
+            raise IngestError(
+                f"{name or 'Image'} is {header['width']}x{header['height']} "
+                f"({pixels} pixels), the limit is {self.max_pixels}",
+                status_code=413
+            )
+        return header
+
+    async def read_upload(self, upload: UploadFile) -> Tuple[bytes, dict]:
+        """
+        Check an upload and read it into memory
+
+        The multipart parser has already spooled the upload to a temp
+        file (memory up to 1 MB, then disk); its size and header are
+        checked there, and only accepted images are read.
+
+        Args:
+            upload: Uploaded file
+
+        Returns:
+            (encoded image bytes, header info)
+
+        Raises:
+            IngestError: If the upload is too large or not an acceptable image
+        """
+        size = upload.size
+        if size is None:
+            size = await run_in_stage('decode', _spooled_size, upload.file)
+        self.check_size(size, upload.filename)
+
+        header = await run_in_stage('decode', self.preflight, upload.file, upload.filename)
+        logger.info(
+            f"📥 Upload {upload.filename}: {size} bytes, "
+            f"{header['format']} {header['width']}x{header['height']} {header['mode']}"
+        )
+
+        await upload.seek(0)
+        return await upload.read(), header
+
+
+def _spooled_size(fp: BinaryIO) -> int:
+    """Size of a seekable file, leaving its position unchanged (blocking)"""
+    position = fp.tell()
+    size = fp.seek(0, os.SEEK_END)
+    fp.seek(position)
+    return size
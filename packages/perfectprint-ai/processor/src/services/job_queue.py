@@ -0,0 +1,280 @@
+"""
+Job Queue for asynchronous processing
+
+Bounded in-process queue with a fixed pool of worker threads.
+- Uploads beyond the queue capacity are rejected instead of piling up
+- Worker count is sized to the stage pipeline's depth and the node's memory
+- Reports queue depth and wait times
+- Drains cleanly on shutdown
+"""
+
+import asyncio
+import inspect
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from utils.logger import logger
+from utils.config import env_int, get_cpu_count, get_total_memory_bytes
+from utils.executors import stage_executor
+from utils.metrics import QUEUE_DEPTH, QUEUE_ACTIVE, QUEUE_WAIT_SECONDS, QUEUE_REJECTED
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted to a full (or stopped) queue"""
+
+
+class _Job:
+    """A queued unit of work"""
+
+    __slots__ = ('job_id', 'fn', 'args', 'kwargs', 'enqueued_at')
+
+    def __init__(self, job_id: str, fn: Callable, args: tuple, kwargs: dict):
+        self.job_id = job_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.enqueued_at = time.monotonic()
+
+
+# Sentinel telling a worker to exit
+_STOP = object()
+
+
+def default_worker_count(job_memory_mb: Optional[int] = None) -> int:
+    """
+    Work out how many jobs can safely run at once on this node
+
+    Enough workers to fill every pipeline step and its hand-off queue
+    (the stage executors cap CPU use themselves), limited by memory.
+
+    Args:
+        job_memory_mb: Expected peak memory of one job in MB
+
+    Returns:
+        Number of worker slots (at least 1)
+    """
+    job_memory_mb = job_memory_mb or env_int('JOB_MEMORY_MB', 2048)
+    workers = max(get_cpu_count(), stage_executor.pipeline_depth())
+
+    total_memory = get_total_memory_bytes()
+    if total_memory:
+        workers = min(workers, total_memory // (job_memory_mb * 1024 * 1024))
+
+    return max(1, int(workers))
+
+
+class JobQueue:
+    """
+    Bounded job queue served by a fixed pool of worker threads
+
+    Each worker owns its own event loop, so jobs may be plain callables
+    or coroutine functions.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queue_size: Optional[int] = None,
+        name: str = "jobs"
+    ):
+        """
+        Initialize the job queue
+
+        Args:
+            workers: Number of worker threads (default: JOB_WORKERS or sized to node)
+            max_queue_size: Jobs allowed to wait (default: JOB_QUEUE_SIZE or 4x workers)
+            name: Name used for worker threads and logs
+        """
+        self.name = name
+        self._threads = []
+        self._lock = threading.Lock()
+        self.configure(workers, max_queue_size)
+        self._accepting = False
+
+        # Stats
+        self._active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._wait_times = deque(maxlen=256)
+
+        QUEUE_DEPTH.labels(name).set_function(lambda: self._queue.qsize())
+        QUEUE_ACTIVE.labels(name).set_function(lambda: self._active)
+
+    def configure(self, workers: Optional[int] = None, max_queue_size: Optional[int] = None):
+        """
+        Size the pool and queue (before start(), e.g. in a forked server worker)
+
+        Args:
+            workers: Number of worker threads (default: JOB_WORKERS or sized to node)
+            max_queue_size: Jobs allowed to wait (default: JOB_QUEUE_SIZE or 4x workers)
+        """
+        if self._threads:
+            raise RuntimeError(f"Job queue {self.name} is already running")
+        self.workers = workers or env_int('JOB_WORKERS', 0) or default_worker_count()
+        self.max_queue_size = max_queue_size or env_int('JOB_QUEUE_SIZE', 0) or self.workers * 4
+        self._queue: queue.Queue = queue.Queue(maxsize=self.max_queue_size)
+
+    def start(self):
+        """Start the worker threads"""
+        with self._lock:
+            if self._threads:
+                return
+            self._accepting = True
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"{self.name}-worker-{i}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+        logger.info(f"🧵 Job queue '{self.name}' started: {self.workers} workers, capacity {self.max_queue_size}")
+
+    def submit(self, job_id: str, fn: Callable, *args, **kwargs) -> int:
+        """
+        Queue a job without blocking
+
+        Args:
+            job_id: Identifier used in logs
+            fn: Callable or coroutine function to run
+            *args, **kwargs: Passed to fn
+
+        Returns:
+            Queue depth after the job was added
+
+        Raises:
+            QueueFullError: If the queue is full or shutting down
+        """
+        if not self._accepting:
+            raise QueueFullError("Job queue is not accepting work (shutting down)")
+
+        try:
+            self._queue.put_nowait(_Job(job_id, fn, args, kwargs))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            QUEUE_REJECTED.labels(self.name).inc()
+            raise QueueFullError(f"Job queue is full ({self.max_queue_size} jobs waiting)")
+
+        with self._lock:
+            self._submitted += 1
+
+        return self._queue.qsize()
+
+    def _worker_loop(self):
+        """Take jobs off the queue until told to stop"""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        try:
+            while True:
+                job = self._queue.get()
+                if job is _STOP:
+                    self._queue.task_done()
+                    break
+
+                wait_time = time.monotonic() - job.enqueued_at
+                with self._lock:
+                    self._active += 1
+                    self._wait_times.append(wait_time)
+                QUEUE_WAIT_SECONDS.labels(self.name).observe(wait_time)
+
+                logger.info(f"🧵 Job {job.job_id} started after {wait_time:.2f}s in queue")
+
+                try:
+                    result = job.fn(*job.args, **job.kwargs)
+                    if inspect.isawaitable(result):
+                        loop.run_until_complete(result)
+                    with self._lock:
+                        self._completed += 1
+                except Exception as e:
+                    logger.error(f"❌ Job {job.job_id} failed: {str(e)}")
+                    with self._lock:
+                        self._failed += 1
+                finally:
+                    with self._lock:
+                        self._active -= 1
+                    self._queue.task_done()
+        finally:
+            loop.close()
+
+    def shutdown(self, drain: bool = True, timeout: Optional[float] = None):
+        """
+        Stop the workers
+
+        Args:
+            drain: Finish queued jobs first (otherwise they are dropped)
+            timeout: Maximum seconds to wait for the workers
+        """
+        with self._lock:
+            if not self._accepting and not self._threads:
+                return
+            self._accepting = False
+            threads = list(self._threads)
+            self._threads = []
+
+        if not drain:
+            dropped = 0
+            while True:
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                    dropped += 1
+                except queue.Empty:
+                    break
+            if dropped:
+                logger.warning(f"⚠️  Dropped {dropped} queued jobs on shutdown")
+
+        logger.info(f"🛑 Draining job queue '{self.name}' ({self._queue.qsize()} waiting, {self._active} active)")
+
+        # Workers exit once they reach the sentinels, after any queued jobs
+        for _ in threads:
+            self._queue.put(_STOP)
+
+        deadline = time.monotonic() + timeout if timeout else None
+        for thread in threads:
+            remaining = max(0.0, deadline - time.monotonic()) if deadline else None
+            thread.join(remaining)
+
+        if any(thread.is_alive() for thread in threads):
+            logger.warning(f"⚠️  Job queue '{self.name}' did not drain within {timeout}s")
+        else:
+            logger.info(f"✅ Job queue '{self.name}' drained")
+
+    def get_stats(self) -> dict:
+        """
+        Get queue depth, throughput and wait-time statistics
+
+        Returns:
+            Dictionary with queue statistics
+        """
+        with self._lock:
+            waits = sorted(self._wait_times)
+            stats = {
+                "workers": self.workers,
+                "capacity": self.max_queue_size,
+                "depth": self._queue.qsize(),
+                "active": self._active,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "accepting": self._accepting
+            }
+
+        if waits:
+            stats["wait_time"] = {
+                "avg": round(sum(waits) / len(waits), 3),
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3),
+                "max": round(waits[-1], 3)
+            }
+        else:
+            stats["wait_time"] = {"avg": 0.0, "p95": 0.0, "max": 0.0}
+
+        return stats
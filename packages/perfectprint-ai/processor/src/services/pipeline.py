@@ -0,0 +1,327 @@
+"""
+Processing Pipeline
+
+Runs an uploaded image through upscale → background removal → vectorize
+(segmenting before upscaling when both are requested, see plan_stages).
+Shared by the synchronous /process endpoint and the /process-async workers.
+
+Each request moves through the steps on a StageLane, so concurrent jobs
+form a pipeline: while one is vectorized the next is being upscaled, and
+a full step makes the steps before it wait rather than pile up images.
+Before its first step, a job reserves its estimated peak memory from the
+node-wide admission budget (see services.admission). Results a service
+produced with a fallback (see utils.fallbacks) are returned but not cached.
+"""
+
+import time
+from typing import List, Optional
+
+from utils.logger import logger
+from utils.image_utils import encode_image_to_bytes, read_image_header
+from utils.image_decode import decode_image
+from utils.executors import run_in_stage, stage_executor, StageLane
+from utils.fallbacks import track_fallbacks
+from utils.metrics import (
+    option_labels,
+    observe_stage,
+    PIPELINE_SECONDS,
+    INPUT_PIXELS,
+    OUTPUT_PIXELS,
+    JOB_MEMORY_ESTIMATE
+)
+from services.admission import MemoryAdmission, estimate_job_memory
+from services.result_cache import ResultCache, make_cache_key
+
+
+# Metric each image stage's time is reported under
+STAGE_METRICS = {
+    'upscale': 'upscale_time',
+    'segment': 'background_removal_time',
+    'apply_mask': 'background_removal_time'
+}
+
+
+# Executor stage behind each pipeline step. Jobs always enter steps in
+# this order (plan_stages never reorders them), which keeps the bounded
+# hand-offs between steps deadlock-free.
+STEP_STAGES = {
+    'decode': 'decode',
+    'segment': 'background_removal',
+    'upscale': 'upscale',
+    'apply_mask': 'background_removal',
+    'encode': 'encode',
+    'vectorize': 'vectorize'
+}
+
+
+def plan_stages(upscale: bool, remove_background: bool) -> List[str]:
+    """
+    Order the image stages for a request
+
+    When both upscaling and background removal are requested, BRIA runs
+    on the original image and only its mask is resized to the upscaled
+    size. BRIA sees a 1024x1024 resize either way, so the result is the
+    same as segmenting the upscaled image, without resizing and
+    converting the large image inside the segmentation stage.
+
+    Args:
+        upscale: Whether to upscale the image
+        remove_background: Whether to remove background
+
+    Returns:
+        Stage names in execution order ('segment', 'upscale', 'apply_mask')
+    """
+    if upscale and remove_background:
+        return ['segment', 'upscale', 'apply_mask']
+
+    stages = []
+    if upscale:
+        stages.append('upscale')
+    if remove_background:
+        stages.extend(['segment', 'apply_mask'])
+    return stages
+
+
+class ProcessingPipeline:
+    """
+    The PerfectPrint AI processing pipeline
+    """
+
+    def __init__(
+        self,
+        background_service,
+        upscaler_service,
+        vectorizer_service=None,
+        cache: Optional[ResultCache] = None,
+        admission: Optional[MemoryAdmission] = None
+    ):
+        """
+        Initialize the pipeline
+
+        Args:
+            background_service: BackgroundRemovalService instance
+            upscaler_service: UpscalerService instance
+            vectorizer_service: VectorizerService instance (None if VTracer is unavailable)
+            cache: ResultCache instance (default: configured from the environment)
+            admission: MemoryAdmission budget (default: configured from the environment)
+        """
+        self.background_service = background_service
+        self.upscaler_service = upscaler_service
+        self.vectorizer_service = vectorizer_service
+        self.cache = cache if cache is not None else ResultCache()
+        self.admission = admission if admission is not None else MemoryAdmission()
+
+    def _cache_key(
+        self,
+        contents: bytes,
+        upscale: bool,
+        remove_background: bool,
+        vectorize: bool,
+        vectorizer_config: Optional[dict]
+    ) -> str:
+        """Key covering the input and every option that changes the result"""
+        options = {
+            "upscale": upscale,
+            "remove_background": remove_background,
+            "vectorize": bool(vectorize and self.vectorizer_service)
+        }
+        # Settings that pick the model, so the disk tier never serves a
+        # result made under another configuration
+        if upscale:
+            options["upscale_models"] = self.upscaler_service.models
+            options["upscale_ai"] = self.upscaler_service.use_ai_upscaling
+            options["upscale_ai_min_factor"] = self.upscaler_service.ai_min_factor
+            options["target_dpi"] = self.upscaler_service.target_dpi
+        if remove_background:
+            options["bria_backend"] = self.background_service.backend
+        if options["vectorize"]:
+            config = dict(self.vectorizer_service.default_config)
+            config.update(vectorizer_config or {})
+            options["vectorizer_config"] = config
+            options["vectorizer_adaptive"] = self.vectorizer_service.adaptive
+            options["svg_optimize"] = self.vectorizer_service.optimize
+        return make_cache_key(contents, options)
+
+    def _cache_lookup(self, contents: bytes, *key_args) -> tuple:
+        """Hash the input and look it up in the cache (blocking)"""
+        key = self._cache_key(contents, *key_args)
+        return key, self.cache.get(key)
+
+    def estimate_memory(
+        self,
+        contents: bytes,
+        upscale: bool,
+        remove_background: bool,
+        vectorize: bool
+    ) -> int:
+        """
+        Estimate a job's peak memory from the image header (blocking)
+
+        Args:
+            contents: Encoded image
+            upscale: Whether to upscale the image
+            remove_background: Whether to remove background
+            vectorize: Whether to vectorize the image
+
+        Returns:
+            Estimated peak memory in bytes
+        """
+        header = read_image_header(contents)
+        width, height = header["width"], header["height"]
+        output_size = (width, height)
+        if upscale:
+            output_size = self.upscaler_service.output_size(width, height, header["dpi"])
+        return estimate_job_memory(
+            width, height, output_size,
+            remove_background,
+            bool(vectorize and self.vectorizer_service),
+            encoded_bytes=len(contents)
+        )
+
+    async def process(
+        self,
+        contents: bytes,
+        upscale: bool = False,
+        remove_background: bool = True,
+        vectorize: bool = True,
+        filename: Optional[str] = None,
+        vectorizer_config: Optional[dict] = None
+    ) -> dict:
+        """
+        Process raw image bytes
+
+        Identical inputs with identical options are served from the
+        result cache.
+
+        Args:
+            contents: Encoded image (PNG, JPG, etc.)
+            upscale: Whether to upscale the image
+            remove_background: Whether to remove background
+            vectorize: Whether to vectorize the image
+            filename: Original filename (for logs)
+            vectorizer_config: Optional VTracer settings (overrides defaults)
+
+        Returns:
+            Dictionary with "results" and "metrics"; results["processed_png"]
+            is raw PNG bytes and results["processed_svg"] is the SVG text
+        """
+        start_time = time.time()
+        metrics = {}
+        labels = option_labels(upscale, remove_background, vectorize)
+
+        logger.info(f"📥 Processing image: {filename}")
+        logger.info(f"   Options: upscale={upscale}, remove_bg={remove_background}, vectorize={vectorize}")
+
+        cache_key = None
+        if self.cache.enabled:
+            cache_key, cached = await run_in_stage(
+                'decode', self._cache_lookup,
+                contents, upscale, remove_background, vectorize, vectorizer_config
+            )
+            if cached is not None:
+                total_time = round(time.time() - start_time, 3)
+                logger.info(f"⚡ Cache hit, served in {total_time}s")
+                PIPELINE_SECONDS.labels('hit', *labels).observe(time.time() - start_time)
+                return {
+                    "results": cached["results"],
+                    "metrics": {"cache_hit": True, "total_time": total_time}
+                }
+
+        # Reserve the job's peak memory up front: jobs that do not fit
+        # wait here, holding nothing but their encoded bytes
+        memory_estimate = await run_in_stage(
+            'decode', self.estimate_memory, contents, upscale, remove_background, vectorize
+        )
+        JOB_MEMORY_ESTIMATE.labels(*labels).observe(memory_estimate)
+        await self.admission.acquire(memory_estimate, filename)
+        metrics['memory_estimate_mb'] = round(memory_estimate / (1024 * 1024))
+
+        # Every CPU-heavy step runs on its stage executor, never on the event
+        # loop. The lane holds this job's place between steps: it enters the
+        # next step before leaving the current one, waiting while it is full.
+        lane = StageLane(stage_executor)
+        with track_fallbacks() as fallbacks:
+            try:
+                await lane.enter('decode', STEP_STAGES['decode'])
+                step_start = time.time()
+                image = await run_in_stage('decode', decode_image, contents)
+                observe_stage('decode', time.time() - step_start, labels)
+                INPUT_PIXELS.labels(*labels).observe(image.size[0] * image.size[1])
+
+                logger.info(f"   Original size: {image.size}")
+
+                processed_image = image
+                mask = None
+
+                # Upscaling and background removal, in planned order
+                for stage in plan_stages(upscale, remove_background):
+                    await lane.enter(stage, STEP_STAGES[stage])
+                    step_start = time.time()
+
+                    if stage == 'segment':
+                        logger.info("🎨 Segmenting foreground...")
+                        mask = await self.background_service.predict_mask(processed_image)
+                    elif stage == 'upscale':
+                        logger.info("⬆️  Upscaling...")
+                        processed_image = await self.upscaler_service.upscale(processed_image)
+                        logger.info(f"   ✅ Upscaled to {processed_image.size}")
+                    elif stage == 'apply_mask':
+                        processed_image = await self.background_service.apply_mask(processed_image, mask)
+                        logger.info("   ✅ Background removed")
+
+                    metric = STAGE_METRICS[stage]
+                    metrics[metric] = metrics.get(metric, 0.0) + time.time() - step_start
+
+                for metric in set(STAGE_METRICS.values()) & set(metrics):
+                    observe_stage(metric[:-len('_time')], metrics[metric], labels)
+                    metrics[metric] = round(metrics[metric], 2)
+
+                # Encode the processed image as raw PNG bytes (callers choose the wire format)
+                await lane.enter('encode', STEP_STAGES['encode'])
+                step_start = time.time()
+                processed_png = await run_in_stage('encode', encode_image_to_bytes, processed_image)
+                observe_stage('encode', time.time() - step_start, labels)
+                OUTPUT_PIXELS.labels(*labels).observe(processed_image.size[0] * processed_image.size[1])
+
+                # Step 3: Vectorization (if requested)
+                svg_content = None
+                if vectorize and self.vectorizer_service:
+                    await lane.enter('vectorize', STEP_STAGES['vectorize'])
+                    step_start = time.time()
+                    logger.info("🎯 Vectorizing...")
+                    svg_content = await self.vectorizer_service.vectorize(processed_image, vectorizer_config)
+                    observe_stage('vectorize', time.time() - step_start, labels)
+                    metrics['vectorization_time'] = round(time.time() - step_start, 2)
+                    logger.info(f"   ✅ Vectorized in {metrics['vectorization_time']}s")
+                elif vectorize:
+                    logger.warning("⚠️  Vectorization requested but VTracer not available")
+            finally:
+                lane.leave()
+                self.admission.release(memory_estimate)
+
+        # Calculate total time
+        PIPELINE_SECONDS.labels('miss' if cache_key else 'disabled', *labels).observe(time.time() - start_time)
+        total_time = round(time.time() - start_time, 2)
+        metrics['total_time'] = total_time
+
+        if fallbacks:
+            metrics['fallbacks'] = sorted(set(fallbacks))
+        logger.info(f"✅ Processing complete in {total_time}s")
+
+        output = {
+            "results": {
+                "processed_png": processed_png,
+                "processed_svg": svg_content,
+                "original_size": list(image.size),
+                "processed_size": list(processed_image.size)
+            },
+            "metrics": metrics
+        }
+
+        if cache_key and fallbacks:
+            # A retry may well succeed; don't pin the degraded result
+            logger.warning(f"⚠️  Not caching result made with fallbacks: {', '.join(metrics['fallbacks'])}")
+        elif cache_key:
+            await run_in_stage('encode', self.cache.put, cache_key, output)
+
+        return output
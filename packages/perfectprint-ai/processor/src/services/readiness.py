@@ -0,0 +1,168 @@
+"""
+Model readiness tracking
+
+Loads and warms each model (in the background or before serving) and
+reports its real state and timings, so the readiness endpoint only
+passes once the first request will be fast.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from utils.logger import logger
+from utils.metrics import MODEL_LOAD_SECONDS, MODEL_READY
+
+# Model states
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+READY = "ready"
+DEGRADED = "degraded"        # Serving through a fallback (e.g. Lanczos instead of Real-ESRGAN)
+FAILED = "failed"
+UNAVAILABLE = "unavailable"  # Not installed; requests skip or fall back immediately
+
+# States in which a request will not wait on model loading
+SERVING_STATES = (READY, DEGRADED, UNAVAILABLE)
+
+# Startup modes (MODEL_PRELOAD)
+PRELOAD_MODES = ('lazy', 'background', 'blocking')
+
+
+class ReadinessTracker:
+    """
+    Per-model load/warmup state
+
+    Each model registers a warmup callable that loads it, runs a dummy
+    inference and returns a dictionary with at least "state" (READY or
+    DEGRADED) plus any detail worth reporting (load_time, warmup_time...).
+    """
+
+    def __init__(self, mode: str = 'background'):
+        """
+        Initialize the tracker
+
+        Args:
+            mode: 'lazy' (models load on first request), 'background' or 'blocking'
+        """
+        self.mode = mode if mode in PRELOAD_MODES else 'background'
+        self._models: Dict[str, dict] = {}
+        self._warmups: Dict[str, Callable[[], dict]] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._warmed = False
+
+    def register(self, name: str, warmup: Callable[[], dict]):
+        """
+        Register a model to load and warm
+
+        Args:
+            name: Model/service name reported by the endpoints
+            warmup: Blocking callable returning the model's state and details
+        """
+        with self._lock:
+            self._warmups[name] = warmup
+            self._models[name] = {"state": NOT_LOADED}
+
+    def mark_unavailable(self, name: str, reason: str):
+        """
+        Record a model that cannot be loaded on this node
+
+        Args:
+            name: Model/service name
+            reason: Why it is unavailable
+        """
+        with self._lock:
+            self._models[name] = {"state": UNAVAILABLE, "detail": reason}
+
+    def warm(self, name: str):
+        """
+        Load and warm one model (blocking)
+
+        Args:
+            name: Registered model name
+        """
+        with self._lock:
+            warmup = self._warmups.get(name)
+            if warmup is None:
+                return
+            self._models[name] = {"state": LOADING, "started_at": time.time()}
+
+        logger.info(f"🔥 Warming up {name}...")
+        start_time = time.time()
+
+        try:
+            info = dict(warmup() or {})
+            info.setdefault("state", READY)
+        except Exception as e:
+            logger.error(f"❌ {name} failed to load: {str(e)}")
+            info = {"state": FAILED, "error": str(e)}
+
+        info["total_time"] = round(time.time() - start_time, 2)
+        with self._lock:
+            self._models[name] = info
+
+        MODEL_LOAD_SECONDS.labels(name).set(info["total_time"])
+        MODEL_READY.labels(name).set(1 if info["state"] in (READY, DEGRADED) else 0)
+
+        logger.info(f"   {name}: {info['state']} in {info['total_time']}s")
+
+    def warm_all(self):
+        """Load and warm every registered model in turn (blocking)"""
+        for name in list(self._warmups):
+            self.warm(name)
+        self._warmed = True
+
+        logger.info("✅ Models warmed up" if self.is_ready() else "⚠️  Some models are not ready")
+
+    def start(self):
+        """Warm models according to the startup mode (background mode returns immediately)"""
+        if self._warmed:
+            # Forked server worker: the parent warmed the models it inherited
+            logger.info("   Models already warmed")
+            return
+
+        if self.mode == 'lazy':
+            logger.info("   Models load on first use (MODEL_PRELOAD=lazy)")
+            return
+
+        if self.mode == 'blocking':
+            self.warm_all()
+            return
+
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self.warm_all, name="model-warmup", daemon=True)
+            self._thread.start()
+
+    def is_ready(self) -> bool:
+        """
+        Whether requests will be served without waiting on model loading
+
+        In lazy mode there is nothing to wait for up front, so this is
+        always true.
+
+        Returns:
+            True if every model is ready, degraded or unavailable
+        """
+        if self.mode == 'lazy':
+            return True
+
+        with self._lock:
+            return all(info["state"] in SERVING_STATES for info in self._models.values())
+
+    def get_state(self, name: str) -> Optional[str]:
+        """Current state of one model (None if unknown)"""
+        with self._lock:
+            info = self._models.get(name)
+            return info["state"] if info else None
+
+    def get_stats(self) -> dict:
+        """
+        Get per-model states and timings
+
+        Returns:
+            Dictionary keyed by model name
+        """
+        with self._lock:
+            return {name: dict(info) for name, info in self._models.items()}
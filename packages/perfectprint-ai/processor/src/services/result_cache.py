@@ -0,0 +1,251 @@
+"""
+Result Cache for the processing pipeline
+
+Content-addressed cache of pipeline results, so re-uploads of the same
+artwork with the same options skip upscale → BRIA → VTracer entirely.
+- Keyed by a hash of the input bytes plus every option that changes the output
+- In-memory LRU tier bounded by a byte budget
+- Optional on-disk tier with TTL eviction
+- Reports hit/miss counts
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from utils.logger import logger
+from utils.config import env_int, env_str
+from utils.metrics import CACHE_LOOKUPS
+
+# Part of every key: bump when a code change alters the output for the
+# same input and options, so the disk tier stops serving older results
+CACHE_KEY_VERSION = 2
+
+
+def make_cache_key(contents: bytes, options: dict) -> str:
+    """
+    Build the cache key for an input and its processing options
+
+    Args:
+        contents: Encoded input image bytes
+        options: Everything that affects the result (flags, vectorizer config)
+
+    Returns:
+        Hex digest identifying the result
+    """
+    digest = hashlib.sha256(contents)
+    digest.update(json.dumps(
+        {"version": CACHE_KEY_VERSION, **options}, sort_keys=True, default=str
+    ).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _result_size(value: dict) -> int:
+    """Approximate memory held by a cached result (its file payloads)"""
+    results = value.get("results", {})
+    return 1024 + sum(len(item) for item in results.values() if isinstance(item, (bytes, str)))
+
+
+class ResultCache:
+    """
+    Two-tier (memory LRU + optional disk) cache of pipeline results
+
+    Values are the dictionaries returned by ProcessingPipeline.process
+    (raw PNG bytes included); the disk tier stores them pickled.
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: Optional[int] = None,
+        disk_dir: Optional[str] = None,
+        ttl_seconds: Optional[int] = None
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            max_memory_bytes: Memory tier budget (default: RESULT_CACHE_MB, 0 disables)
+            disk_dir: Directory for the disk tier (default: RESULT_CACHE_DIR, unset disables)
+            ttl_seconds: Disk entry lifetime (default: RESULT_CACHE_TTL)
+        """
+        if max_memory_bytes is None:
+            max_memory_bytes = env_int('RESULT_CACHE_MB', 256) * 1024 * 1024
+        self.max_memory_bytes = max(0, max_memory_bytes)
+        self.disk_dir = disk_dir if disk_dir is not None else env_str('RESULT_CACHE_DIR', '')
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else env_int('RESULT_CACHE_TTL', 86400)
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+        # Stats
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            logger.info(f"🗄️  Result cache on disk: {self.disk_dir} (TTL {self.ttl_seconds}s)")
+
+    @property
+    def enabled(self) -> bool:
+        """Whether either tier is active"""
+        return self.max_memory_bytes > 0 or bool(self.disk_dir)
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Look up a result (blocking: may read from disk)
+
+        Args:
+            key: Key from make_cache_key()
+
+        Returns:
+            Cached result, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                CACHE_LOOKUPS.labels('hit_memory').inc()
+                return entry[0]
+
+        value = self._disk_get(key)
+
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                CACHE_LOOKUPS.labels('miss').inc()
+                return None
+            self._hits += 1
+            self._disk_hits += 1
+            CACHE_LOOKUPS.labels('hit_disk').inc()
+
+        # Promote to the memory tier
+        self._memory_put(key, value)
+        return value
+
+    def put(self, key: str, value: dict):
+        """
+        Store a result in both tiers (blocking: may write to disk)
+
+        Args:
+            key: Key from make_cache_key()
+            value: Pipeline result
+        """
+        self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def _memory_put(self, key: str, value: dict):
+        """Insert into the LRU, evicting least recently used entries over budget"""
+        if not self.max_memory_bytes:
+            return
+
+        size = _result_size(value)
+        if size > self.max_memory_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= old[1]
+
+            self._entries[key] = (value, size)
+            self._memory_bytes += size
+
+            while self._memory_bytes > self.max_memory_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._memory_bytes -= evicted_size
+                self._evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        """File holding a disk-tier entry"""
+        return os.path.join(self.disk_dir, key[:2], f"{key}.pkl")
+
+    def _disk_get(self, key: str) -> Optional[dict]:
+        """Read a disk-tier entry, dropping it if expired"""
+        if not self.disk_dir:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _disk_put(self, key: str, value: dict):
+        """Write a disk-tier entry atomically"""
+        if not self.disk_dir:
+            return
+
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except (OSError, pickle.PicklingError) as e:
+            logger.warning(f"⚠️  Result cache write failed: {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        self._maybe_sweep_disk()
+
+    def _maybe_sweep_disk(self):
+        """Delete expired disk entries, at most every few minutes"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < min(self.ttl_seconds, 600):
+                return
+            self._last_sweep = now
+
+        removed = 0
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if now - os.path.getmtime(path) > self.ttl_seconds:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    continue
+
+        if removed:
+            logger.info(f"🧹 Result cache removed {removed} expired entries")
+
+    def get_stats(self) -> dict:
+        """
+        Get hit/miss counts and memory usage
+
+        Returns:
+            Dictionary with cache statistics
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+                "memory_budget_bytes": self.max_memory_bytes,
+                "evictions": self._evictions,
+                "disk": bool(self.disk_dir)
+            }
@@ -12,14 +12,23 @@ Source: https://github.com/xinntao/Real-ESRGAN
 
 from PIL import Image
 import numpy as np
+import math
 import time
 import cv2
-from typing import Optional, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 from utils.logger import logger
+from utils.config import env_int, env_float, env_str, get_cpu_count
+from utils.executors import run_in_stage
+from utils.tiling import tile_spans, blend_ramps, blend_weights
+from utils.model_pool import ModelPool
+from utils.fallbacks import record_fallback
 
 # Try to import Real-ESRGAN
 try:
+    import torch
     from realesrgan import RealESRGANer
     from realesrgan.archs.srvgg_arch import SRVGGNetCompact
     REALESRGAN_AVAILABLE = True
@@ -27,6 +36,55 @@ except ImportError:
     REALESRGAN_AVAILABLE = False
     logger.warning("⚠️  Real-ESRGAN not available. Using high-quality Lanczos resampling instead.")
 
+# RRDBNet (used by the x2 model) comes from basicsr, which needs numba
+try:
+    from basicsr.archs.rrdbnet_arch import RRDBNet
+    RRDBNET_AVAILABLE = True
+except ImportError:
+    RRDBNET_AVAILABLE = False
+
+
+# Classical resampling path (no network)
+CLASSICAL_MODEL = 'lanczos'
+
+# Upscale models the selector can choose from
+# - scale: network output scale
+# - features: feature-map width (sizes tiles against the memory budget)
+# - macs_per_pixel: multiply-accumulates per input pixel (relative cost)
+# - input_multiple: tile sides must be a multiple of this (RRDBNet x2
+#   pixel-unshuffles its input), tiles are reflect-padded to fit
+#
+# Network cost does not shrink with the factor: RRDBNet x2 costs ~7x the
+# compact x4 network per input pixel, so while both are enabled the x4
+# network (resampled down) is always chosen. Enable x2plus alone
+# (UPSCALE_MODELS=realesrgan-x2plus) for its quality on photographic input.
+UPSCALE_MODELS = {
+    'realesr-animevideov3-x4': {
+        'scale': 4,
+        'features': 64,
+        'macs_per_pixel': 0.63e6,
+        'input_multiple': 1,
+        'url': 'https://github.com/xinntao/Real-ESRGAN/releases/download/v0.2.5.0/realesr-animevideov3.pth',
+        'available': REALESRGAN_AVAILABLE,
+        'build': lambda: SRVGGNetCompact(
+            num_in_ch=3, num_out_ch=3, num_feat=64, num_conv=16, upscale=4, act_type='prelu'
+        )
+    },
+    'realesrgan-x2plus': {
+        'scale': 2,
+        'features': 192,
+        'macs_per_pixel': 4.5e6,
+        'input_multiple': 2,
+        'url': 'https://github.com/xinntao/Real-ESRGAN/releases/download/v0.2.1/RealESRGAN_x2plus.pth',
+        'available': REALESRGAN_AVAILABLE and RRDBNET_AVAILABLE,
+        'build': lambda: RRDBNet(
+            num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32, scale=2
+        )
+    }
+}
+
+DEFAULT_UPSCALE_MODEL = 'realesr-animevideov3-x4'
+
 
 class UpscalerService:
     """
@@ -42,10 +100,131 @@ class UpscalerService:
         """Initialize the upscaler service"""
         self.target_dpi = 300
         self.use_ai_upscaling = REALESRGAN_AVAILABLE
-        self.upsampler = None
         
-        if REALESRGAN_AVAILABLE:
-            self._load_model()
+        # Models the selector may use (UPSCALE_MODELS, comma-separated)
+        enabled = env_str('UPSCALE_MODELS', ','.join(UPSCALE_MODELS))
+        self.models = [
+            name.strip() for name in enabled.split(',')
+            if name.strip() in UPSCALE_MODELS and UPSCALE_MODELS[name.strip()]['available']
+        ]
+        # Factors this small gain little from a network; resample instead
+        self.ai_min_factor = env_float('UPSCALE_AI_MIN_FACTOR', 1.25)
+        
+        # Loaded networks by model name (loaded by warmup() or on first use)
+        self.upsamplers: Dict[str, object] = {}
+        self._model_lock = threading.Lock()
+        
+        # Large images go through the network in overlapping tiles, sized so
+        # the tiles in flight stay within UPSCALE_MEMORY_MB of activations
+        self.memory_budget_mb = env_int('UPSCALE_MEMORY_MB', 1024)
+        self.tile_workers = max(1, env_int('UPSCALE_TILE_WORKERS', min(4, get_cpu_count())))
+        self.tile_overlap = max(1, env_int('UPSCALE_TILE_OVERLAP', 16))
+        self.tile_pad = max(0, env_int('UPSCALE_TILE_PAD', 10))
+        self.tile_size_override = env_int('UPSCALE_TILE_SIZE', 0)
+        self._tile_pool = None
+        
+        # Tiles check a network replica out, one per tile worker by default
+        self.replicas = max(1, env_int('UPSCALE_REPLICAS', self.tile_workers))
+        self.model_pools: Dict[str, ModelPool] = {}
+    
+    def warmup(self) -> dict:
+        """
+        Load the preferred model and run one dummy tile (blocking)
+        
+        Returns:
+            Dictionary with state ("degraded" when only Lanczos is usable)
+            and load/warmup timings
+        """
+        if not self.use_ai_upscaling or not self.models:
+            return {"state": "degraded", "method": CLASSICAL_MODEL, "detail": "Real-ESRGAN not available"}
+        
+        name = DEFAULT_UPSCALE_MODEL if DEFAULT_UPSCALE_MODEL in self.models else self.models[0]
+        
+        start_time = time.time()
+        upsampler = self._load_model(name)
+        load_time = time.time() - start_time
+        
+        if not upsampler:
+            return {
+                "state": "degraded",
+                "method": CLASSICAL_MODEL if not self.models else self.models[0],
+                "detail": f"{name} failed to load",
+                "load_time": round(load_time, 2)
+            }
+        
+        start_time = time.time()
+        self._tiled_upscale(np.zeros((64, 64, 3), dtype=np.uint8), 128, 128, name)
+        warmup_time = time.time() - start_time
+        
+        return {
+            "state": "ready",
+            "method": name,
+            "load_time": round(load_time, 2),
+            "warmup_time": round(warmup_time, 2)
+        }
+    
+    def preload(self) -> List[str]:
+        """
+        Load every enabled model now instead of on first use (blocking)
+        
+        Used before forking server workers, so they all share the weights.
+        
+        Returns:
+            Names of the models that loaded
+        """
+        return [name for name in self.models if self._load_model(name)]
+    
+    def after_fork(self, threads: int):
+        """
+        Size the tile threads and model replicas for a forked server worker
+        
+        Args:
+            threads: Cores this worker may use
+        """
+        self.tile_workers = max(1, env_int('UPSCALE_TILE_WORKERS', min(4, threads)))
+        self.replicas = max(1, env_int('UPSCALE_REPLICAS', self.tile_workers))
+        for pool in self.model_pools.values():
+            pool.resize(self.replicas)
+    
+    def get_pool_stats(self) -> dict:
+        """Replica pool statistics by loaded model"""
+        return {name: pool.get_stats() for name, pool in self.model_pools.items()}
+    
+    def shutdown(self):
+        """Stop the tile threads (they start again on next use)"""
+        if self._tile_pool is not None:
+            self._tile_pool.shutdown(wait=True)
+            self._tile_pool = None
+    
+    @property
+    def upsampler(self):
+        """The default model's upsampler (None if not loaded)"""
+        return self.upsamplers.get(DEFAULT_UPSCALE_MODEL)
+    
+    def select_model(self, scale_factor: float) -> str:
+        """
+        Pick the cheapest model that reaches the needed scale
+        
+        Cost is the model's per-input-pixel compute; every model runs on
+        the same input, so this is also the per-request cost. If no model
+        reaches the factor, the largest-scale one is used and its output
+        resampled up.
+        
+        Args:
+            scale_factor: Upscale factor needed to reach the target DPI
+            
+        Returns:
+            Model name, or CLASSICAL_MODEL for plain resampling
+        """
+        if not self.use_ai_upscaling or not self.models or scale_factor <= self.ai_min_factor:
+            return CLASSICAL_MODEL
+        
+        candidates = [name for name in self.models if UPSCALE_MODELS[name]['scale'] >= scale_factor]
+        if not candidates:
+            largest = max(UPSCALE_MODELS[name]['scale'] for name in self.models)
+            candidates = [name for name in self.models if UPSCALE_MODELS[name]['scale'] == largest]
+        
+        return min(candidates, key=lambda name: UPSCALE_MODELS[name]['macs_per_pixel'])
         
     async def upscale(
         self, 
@@ -56,6 +235,27 @@ class UpscalerService:
         """
         Upscale an image to target DPI
         
+        Runs on the upscale stage executor so the event loop stays free.
+        
+        Args:
+            image: PIL Image object
+            target_dpi: Target DPI (default: 300)
+            max_dimension: Maximum width or height (safety limit)
+            
+        Returns:
+            Upscaled PIL Image object
+        """
+        return await run_in_stage('upscale', self._upscale, image, target_dpi, max_dimension)
+    
+    def _upscale(
+        self, 
+        image: Image.Image,
+        target_dpi: Optional[int] = None,
+        max_dimension: int = 4096
+    ) -> Image.Image:
+        """
+        Upscale an image to target DPI (blocking)
+        
         Args:
             image: PIL Image object
             target_dpi: Target DPI (default: 300)
@@ -83,25 +283,24 @@ class UpscalerService:
                 logger.info(f"   Image already at {current_dpi} DPI, no upscaling needed")
                 return image
             
-            # Calculate new dimensions
-            new_width = int(current_width * scale_factor)
-            new_height = int(current_height * scale_factor)
-            
-            # Apply safety limit
-            if new_width > max_dimension or new_height > max_dimension:
-                scale = min(max_dimension / new_width, max_dimension / new_height)
-                new_width = int(new_width * scale)
-                new_height = int(new_height * scale)
+            new_width, new_height = self.output_size(
+                current_width, current_height, current_dpi, target_dpi, max_dimension
+            )
+            if new_width < int(current_width * scale_factor):
                 logger.warning(f"⚠️  Limiting size to {new_width}x{new_height} (max: {max_dimension})")
             
             logger.info(f"   Upscaling from {current_width}x{current_height} to {new_width}x{new_height}")
             logger.info(f"   Scale factor: {scale_factor:.2f}x ({current_dpi} → {target_dpi} DPI)")
             
-            # Use AI upscaling if available, otherwise high-quality resize
-            if self.use_ai_upscaling:
-                upscaled = await self._ai_upscale(image, new_width, new_height)
-            else:
+            # Cheapest model that reaches the factor actually applied (after the size limit)
+            applied_factor = max(new_width / current_width, new_height / current_height)
+            model_name = self.select_model(applied_factor)
+            logger.info(f"   Model: {model_name} for {applied_factor:.2f}x")
+            
+            if model_name == CLASSICAL_MODEL:
                 upscaled = self._high_quality_resize(image, new_width, new_height)
+            else:
+                upscaled = self._ai_upscale(image, new_width, new_height, model_name)
             
             # Set DPI metadata
             upscaled.info['dpi'] = (target_dpi, target_dpi)
@@ -113,8 +312,45 @@ class UpscalerService:
             
         except Exception as e:
             logger.error(f"❌ Upscaling failed: {str(e)}")
+            record_fallback('upscale')
             return image  # Return original on failure
     
+    def output_size(
+        self,
+        width: int,
+        height: int,
+        dpi: Optional[float] = None,
+        target_dpi: Optional[int] = None,
+        max_dimension: int = 4096
+    ) -> Tuple[int, int]:
+        """
+        Size an image will be upscaled to, without upscaling it
+        
+        Args:
+            width: Input width
+            height: Input height
+            dpi: Input DPI (default: 72, the web standard)
+            target_dpi: Target DPI (default: 300)
+            max_dimension: Maximum width or height (safety limit)
+            
+        Returns:
+            (width, height) after upscaling; the input size if none is needed
+        """
+        scale_factor = (target_dpi or self.target_dpi) / (dpi or 72)
+        if scale_factor <= 1.0:
+            return width, height
+        
+        new_width = int(width * scale_factor)
+        new_height = int(height * scale_factor)
+        
+        # Apply safety limit
+        if new_width > max_dimension or new_height > max_dimension:
+            scale = min(max_dimension / new_width, max_dimension / new_height)
+            new_width = int(new_width * scale)
+            new_height = int(new_height * scale)
+        
+        return new_width, new_height
+    
     def _high_quality_resize(
         self, 
         image: Image.Image, 
@@ -135,46 +371,54 @@ class UpscalerService:
         # Lanczos is the highest quality resampling filter
         return image.resize((width, height), Image.Resampling.LANCZOS)
     
-    def _load_model(self):
-        """Load Real-ESRGAN model"""
-        try:
-            logger.info("📦 Loading Real-ESRGAN model...")
-            logger.info("   Using RealESRGAN_x4plus_anime_6B (lightweight, works on Python 3.14)")
-            
-            # Use lightweight model that doesn't need numba/basicsr
-            model = SRVGGNetCompact(
-                num_in_ch=3,
-                num_out_ch=3,
-                num_feat=64,
-                num_conv=32,
-                upscale=4,
-                act_type='prelu'
-            )
+    def _load_model(self, name: str):
+        """
+        Load a Real-ESRGAN model from the registry
+        
+        Args:
+            name: Key in UPSCALE_MODELS
             
-            # Initialize upsampler with lightweight model
-            self.upsampler = RealESRGANer(
-                scale=4,
-                model_path='https://github.com/xinntao/Real-ESRGAN/releases/download/v0.2.5.0/realesr-animevideov3.pth',
-                model=model,
-                tile=0,
-                tile_pad=10,
-                pre_pad=0,
-                half=False
-            )
+        Returns:
+            RealESRGANer holding the network, or None if loading failed
+        """
+        with self._model_lock:
+            if name in self.upsamplers:
+                return self.upsamplers[name]
             
-            logger.info("✅ Real-ESRGAN model loaded successfully")
+            spec = UPSCALE_MODELS[name]
+            try:
+                logger.info(f"📦 Loading Real-ESRGAN model {name} (x{spec['scale']})...")
+                
+                self.upsamplers[name] = RealESRGANer(
+                    scale=spec['scale'],
+                    model_path=spec['url'],
+                    model=spec['build'](),
+                    tile=0,  # Tiling is done by _ai_upscale
+                    tile_pad=self.tile_pad,
+                    pre_pad=0,
+                    half=False
+                )
+                self.model_pools[name] = ModelPool(name, self.upsamplers[name].model, self.replicas)
+                
+                logger.info(f"✅ Real-ESRGAN model {name} loaded successfully")
+                
+            except Exception as e:
+                logger.error(f"❌ Failed to load Real-ESRGAN model {name}: {str(e)}")
+                logger.warning("   Selector will no longer use this model")
+                self.upsamplers[name] = None
+                self.models = [model for model in self.models if model != name]
+                if not self.models:
+                    logger.warning("   Falling back to Lanczos resampling")
+                    self.use_ai_upscaling = False
             
-        except Exception as e:
-            logger.error(f"❌ Failed to load Real-ESRGAN: {str(e)}")
-            logger.warning("   Falling back to Lanczos resampling")
-            self.use_ai_upscaling = False
-            self.upsampler = None
+            return self.upsamplers[name]
     
-    async def _ai_upscale(
+    def _ai_upscale(
         self, 
         image: Image.Image, 
         width: int, 
-        height: int
+        height: int,
+        model_name: str = DEFAULT_UPSCALE_MODEL
     ) -> Image.Image:
         """
         AI-powered upscaling using Real-ESRGAN
@@ -185,30 +429,22 @@ class UpscalerService:
             image: PIL Image object
             width: Target width
             height: Target height
+            model_name: Key in UPSCALE_MODELS
             
         Returns:
             Upscaled PIL Image object
         """
-        if not self.upsampler:
+        upsampler = self._load_model(model_name)
+        if not upsampler:
             logger.warning("⚠️  Real-ESRGAN not available, using Lanczos resize")
+            record_fallback('upscale')
             return self._high_quality_resize(image, width, height)
         
         try:
             logger.info("   Using AI upscaling (Real-ESRGAN) - Fixing pixelation...")
             
-            # Convert PIL to OpenCV format
-            img_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            
-            # Run Real-ESRGAN
-            output, _ = self.upsampler.enhance(img_cv, outscale=4)
-            
-            # Convert back to PIL
-            output_rgb = cv2.cvtColor(output, cv2.COLOR_BGR2RGB)
-            upscaled = Image.fromarray(output_rgb)
-            
-            # Resize to exact target dimensions if needed
-            if upscaled.size != (width, height):
-                upscaled = upscaled.resize((width, height), Image.Resampling.LANCZOS)
+            img_rgb = np.asarray(image.convert('RGB'))
+            upscaled = Image.fromarray(self._tiled_upscale(img_rgb, width, height, model_name))
             
             logger.info("   ✨ AI upscaling complete - Pixelation fixed!")
             return upscaled
@@ -216,8 +452,185 @@ class UpscalerService:
         except Exception as e:
             logger.error(f"❌ AI upscaling failed: {str(e)}")
             logger.info("   Falling back to Lanczos resize")
+            record_fallback('upscale')
             return self._high_quality_resize(image, width, height)
     
+    def _tile_size(self, model_name: str) -> int:
+        """
+        Largest tile whose activations fit the memory budget
+        
+        Each tile in flight holds roughly the model's float32 feature maps
+        (a few live at once) plus its scaled output, per input pixel.
+        
+        Args:
+            model_name: Key in UPSCALE_MODELS
+            
+        Returns:
+            Tile side in input pixels
+        """
+        if self.tile_size_override:
+            return self.tile_size_override
+        
+        spec = UPSCALE_MODELS[model_name]
+        bytes_per_pixel = 4 * (3 * spec['features'] + 3 * spec['scale'] ** 2)
+        budget = self.memory_budget_mb * 1024 * 1024 / self.tile_workers
+        side = int(math.sqrt(budget / bytes_per_pixel)) - 2 * self.tile_pad
+        side = max(4 * self.tile_overlap, 64, min(side, 1024))
+        return side - side % 8
+    
+    def _infer_tile(self, model_name: str, tile: np.ndarray) -> np.ndarray:
+        """
+        Run the network on one padded tile, on a checked-out replica
+        
+        Args:
+            model_name: Key in UPSCALE_MODELS (loaded)
+            tile: RGB uint8 array
+            
+        Returns:
+            RGB float32 array (0-255) at the model's scale x the tile size
+        """
+        upsampler = self.upsamplers[model_name]
+        spec = UPSCALE_MODELS[model_name]
+        
+        # Reflect-pad to the model's input multiple (as RealESRGANer does)
+        height, width = tile.shape[:2]
+        multiple = spec['input_multiple']
+        pad_y, pad_x = -height % multiple, -width % multiple
+        if pad_y or pad_x:
+            mode = 'reflect' if min(height, width) > 1 else 'edge'
+            tile = np.pad(tile, ((0, pad_y), (0, pad_x), (0, 0)), mode=mode)
+        
+        tensor = torch.from_numpy(np.ascontiguousarray(tile)).permute(2, 0, 1).unsqueeze(0)
+        tensor = tensor.float().div_(255.0).to(upsampler.device)
+        if upsampler.half:
+            tensor = tensor.half()
+        
+        with self.model_pools[model_name].checkout() as model, torch.no_grad():
+            output = model(tensor)
+        
+        if pad_y or pad_x:
+            output = output[:, :, :height * spec['scale'], :width * spec['scale']]
+        
+        output = output.squeeze(0).float().clamp_(0, 1).permute(1, 2, 0).cpu().numpy()
+        return output * 255.0
+    
+    def _upscale_tile(
+        self,
+        model_name: str,
+        img: np.ndarray,
+        x_span: Tuple[int, int],
+        y_span: Tuple[int, int],
+        scale_x: float,
+        scale_y: float
+    ) -> np.ndarray:
+        """
+        Upscale one tile (with context padding) to its target-size box
+        
+        Args:
+            model_name: Key in UPSCALE_MODELS (loaded)
+            img: Full RGB uint8 input
+            x_span: (start, end) of the tile in input columns
+            y_span: (start, end) of the tile in input rows
+            scale_x: Target pixels per input column
+            scale_y: Target pixels per input row
+            
+        Returns:
+            RGB float32 array covering the tile's box in the output
+        """
+        (x0, x1), (y0, y1) = x_span, y_span
+        height, width = img.shape[:2]
+        
+        # Extra context around the tile so its borders come out clean
+        px0, py0 = max(0, x0 - self.tile_pad), max(0, y0 - self.tile_pad)
+        px1, py1 = min(width, x1 + self.tile_pad), min(height, y1 + self.tile_pad)
+        output = self._infer_tile(model_name, img[py0:py1, px0:px1])
+        
+        # Resize the padded result so the tile itself lands on its exact target box
+        tx0, tx1 = round(x0 * scale_x), round(x1 * scale_x)
+        ty0, ty1 = round(y0 * scale_y), round(y1 * scale_y)
+        left, top = round((x0 - px0) * scale_x), round((y0 - py0) * scale_y)
+        right, bottom = round((px1 - x1) * scale_x), round((py1 - y1) * scale_y)
+        size = (left + tx1 - tx0 + right, top + ty1 - ty0 + bottom)
+        
+        if size != (output.shape[1], output.shape[0]):
+            shrinking = size[0] < output.shape[1]
+            output = cv2.resize(
+                output, size,
+                interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LANCZOS4
+            )
+        
+        return output[top:top + ty1 - ty0, left:left + tx1 - tx0]
+    
+    def _tiled_upscale(
+        self,
+        img: np.ndarray,
+        width: int,
+        height: int,
+        model_name: str = DEFAULT_UPSCALE_MODEL
+    ) -> np.ndarray:
+        """
+        Upscale an image tile by tile, straight to the target size
+        
+        Tiles of one row run in parallel. Overlaps are blended with
+        complementary linear ramps, and rows are accumulated into a band
+        that is flushed to the output as soon as no later row touches it,
+        so only the final image plus one band is held at output resolution.
+        
+        Args:
+            img: RGB uint8 input
+            width: Target width
+            height: Target height
+            model_name: Key in UPSCALE_MODELS
+            
+        Returns:
+            RGB uint8 array of shape (height, width, 3)
+        """
+        tile_size = self._tile_size(model_name)
+        in_height, in_width = img.shape[:2]
+        scale_x, scale_y = width / in_width, height / in_height
+        
+        x_spans = tile_spans(in_width, tile_size, self.tile_overlap)
+        y_spans = tile_spans(in_height, tile_size, self.tile_overlap)
+        x_ramps = blend_ramps(x_spans, scale_x, self.tile_overlap)
+        y_ramps = blend_ramps(y_spans, scale_y, self.tile_overlap)
+        x_weights = [
+            blend_weights(round(x0 * scale_x), round(x1 * scale_x), *ramps)
+            for (x0, x1), ramps in zip(x_spans, x_ramps)
+        ]
+        
+        logger.info(f"   Tiled upscale: {len(x_spans)}x{len(y_spans)} tiles of {tile_size}px on {self.tile_workers} workers")
+        
+        if self._tile_pool is None:
+            self._tile_pool = ThreadPoolExecutor(max_workers=self.tile_workers, thread_name_prefix="upscale-tile")
+        
+        result = np.empty((height, width, 3), dtype=np.uint8)
+        carry = None
+        
+        for row, (y_span, y_ramp) in enumerate(zip(y_spans, y_ramps)):
+            ty0, ty1 = round(y_span[0] * scale_y), round(y_span[1] * scale_y)
+            band = np.zeros((ty1 - ty0, width, 3), dtype=np.float32)
+            if carry is not None:
+                band[:carry.shape[0]] += carry
+            
+            y_weights = blend_weights(ty0, ty1, *y_ramp)
+            tiles = self._tile_pool.map(
+                lambda x_span: self._upscale_tile(model_name, img, x_span, y_span, scale_x, scale_y),
+                x_spans
+            )
+            for (x0, x1), wx, tile in zip(x_spans, x_weights, tiles):
+                tx0 = round(x0 * scale_x)
+                weights = y_weights[:, None, None] * wx[None, :, None]
+                band[:, tx0:tx0 + tile.shape[1]] += tile * weights
+            
+            # Rows above the next tile row are final
+            done = ty1 - ty0
+            if row + 1 < len(y_spans):
+                done = round(y_spans[row + 1][0] * scale_y) - ty0
+            result[ty0:ty0 + done] = np.clip(np.rint(band[:done]), 0, 255).astype(np.uint8)
+            carry = band[done:].copy()
+        
+        return result
+    
     def calculate_print_size(
         self, 
         image: Image.Image, 
@@ -269,7 +682,22 @@ class UpscalerService:
             "target_dpi": self.target_dpi,
             "source": "https://github.com/xinntao/Real-ESRGAN",
             "license": "BSD-3-Clause",
-            "typical_speed": "3-8 seconds (AI) / <1 second (Lanczos)"
+            "typical_speed": "3-8 seconds (AI) / <1 second (Lanczos)",
+            "models": {
+                name: {
+                    "scale": UPSCALE_MODELS[name]['scale'],
+                    "loaded": bool(self.upsamplers.get(name))
+                }
+                for name in self.models
+            },
+            "ai_min_factor": self.ai_min_factor,
+            "tiling": {
+                "tile_size": {name: self._tile_size(name) for name in self.models},
+                "overlap": self.tile_overlap,
+                "pad": self.tile_pad,
+                "workers": self.tile_workers,
+                "memory_budget_mb": self.memory_budget_mb
+            }
         }
 
 
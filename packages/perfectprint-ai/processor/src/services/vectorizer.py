@@ -10,13 +10,53 @@ VTracer is the fastest, highest quality open-source vectorizer.
 Source: https://github.com/visioncortex/vtracer
 """
 
-import vtracer
+import vtracer  # noqa: F401  (availability check; tracing runs in utils.vector_pool)
 import numpy as np
 from PIL import Image
+import re
 import time
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 from utils.logger import logger
+from utils.config import env_bool, env_float, env_int, get_cpu_count
+from utils.executors import run_in_stage
+from utils.image_complexity import probe_complexity
+from utils.metrics import SVG_BYTES
+from utils.fallbacks import record_fallback
+from utils.svg_optimizer import iter_text, optimize_svg_chunks
+from utils.vector_pool import VectorizePool, trace_pixels
+from utils.vector_regions import COMPONENTS, merge_svgs, split_regions
+
+
+# Trace presets picked by the complexity probe (applied over default_config;
+# explicit configs still override them). 'downscale' presets are traced at
+# VECTORIZE_PHOTO_MAX_SIDE and scaled back up through the SVG viewBox.
+VECTORIZE_PRESETS = {
+    'binary': {
+        # Black-and-white line art
+        'config': {'colormode': 'binary', 'filter_speckle': 4},
+        'downscale': False
+    },
+    'posterized': {
+        # Flat art with a small palette: merge anti-aliasing fringes
+        'config': {'color_precision': 5, 'layer_difference': 32},
+        'downscale': False
+    },
+    'color': {
+        # Full colour artwork
+        'config': {},
+        'downscale': False
+    },
+    'photo': {
+        # Photo-like content: coarse palette, no speckle, reduced resolution
+        'config': {'color_precision': 4, 'layer_difference': 48, 'filter_speckle': 10, 'corner_threshold': 90},
+        'downscale': True
+    }
+}
+
+
+class VectorizeBudgetError(Exception):
+    """Raised when a trace produces more paths than VECTORIZE_MAX_PATHS"""
 
 
 class VectorizerService:
@@ -39,6 +79,48 @@ class VectorizerService:
             'path_precision': 3          # Precision for print
         }
         
+        # Traces run in worker processes. VECTORIZE_POOL=0 traces inline on
+        # the stage thread, where VTracer cannot be interrupted: inline
+        # traces have no time limit, only the path budget (checked after)
+        self.pool = None
+        if env_bool('VECTORIZE_POOL', True):
+            self.pool = VectorizePool(
+                workers=env_int('VECTORIZE_WORKERS', get_cpu_count()),
+                timeout=env_float('VECTORIZE_TIMEOUT', 120.0)
+            )
+        
+        # Large designs are split into regions traced in parallel on the pool
+        self.split_regions = env_bool('VECTORIZE_REGIONS', True)
+        self.region_min_pixels = env_int('VECTORIZE_REGION_MIN_PIXELS', 2_000_000)
+        self.region_tile = env_int('VECTORIZE_REGION_TILE', 1024)
+        self.region_margin = env_int('VECTORIZE_REGION_MARGIN', 8)
+        
+        # Preset picked per image from a thumbnail probe
+        self.adaptive = env_bool('VECTORIZE_ADAPTIVE', True)
+        self.photo_colors = env_int('VECTORIZE_PHOTO_COLORS', 2000)
+        self.photo_edge_density = env_float('VECTORIZE_PHOTO_EDGE_DENSITY', 0.25)
+        self.posterize_colors = env_int('VECTORIZE_POSTERIZE_COLORS', 256)
+        self.photo_max_side = env_int('VECTORIZE_PHOTO_MAX_SIDE', 1024)
+        
+        # Budget: past VECTORIZE_TIMEOUT (pooled only) or this many paths
+        # (counted once the trace is done), the raster fallback is
+        # returned instead (0 = no path limit)
+        self.max_paths = env_int('VECTORIZE_MAX_PATHS', 50000)
+        
+        # Output goes through the SVG optimizer (rounding, merging, minifying)
+        self.optimize = env_bool('SVG_OPTIMIZE', True)
+        
+    def warmup(self) -> dict:
+        """
+        Run one small vectorization (blocking)
+        
+        Returns:
+            Dictionary with state and warmup timing
+        """
+        start_time = time.time()
+        self._vectorize(Image.new('RGB', (64, 64), (255, 0, 0)))
+        return {"state": "ready", "warmup_time": round(time.time() - start_time, 2)}
+    
     async def vectorize(
         self, 
         image: Image.Image,
@@ -47,6 +129,8 @@ class VectorizerService:
         """
         Vectorize an image to SVG format
         
+        Runs on the vectorize stage executor so the event loop stays free.
+        
         Args:
             image: PIL Image object
             config: Optional custom configuration (overrides defaults)
@@ -54,14 +138,61 @@ class VectorizerService:
         Returns:
             SVG content as string
         """
+        return await run_in_stage('vectorize', self._vectorize, image, config)
+    
+    def _vectorize(
+        self, 
+        image: Image.Image,
+        config: Optional[dict] = None
+    ) -> str:
+        """
+        Vectorize an image to SVG format (blocking)
+        
+        The trace preset comes from a complexity probe of the image. A trace
+        over the time or path budget returns the raster fallback SVG.
+        
+        Args:
+            image: PIL Image object
+            config: Optional custom configuration (overrides defaults)
+            
+        Returns:
+            SVG content as string
+        """
+        original_image = image
         try:
             start_time = time.time()
             
-            # Use default config or merge with custom
+            # Defaults, then the preset for this image, then custom overrides
+            preset = self.select_preset(image) if self.adaptive else None
             vtracer_config = self.default_config.copy()
+            if preset:
+                vtracer_config.update(VECTORIZE_PRESETS[preset]['config'])
             if config:
                 vtracer_config.update(config)
             
+            # Photo-like content is traced at reduced resolution
+            original_size = image.size
+            if preset and VECTORIZE_PRESETS[preset]['downscale'] and max(image.size) > self.photo_max_side:
+                image = image.copy()
+                image.thumbnail((self.photo_max_side, self.photo_max_side), Image.LANCZOS)
+                logger.info(f"   Downscaled {original_size} → {image.size} for tracing")
+            
+            trace_config = {
+                key: vtracer_config[key]
+                for key in (
+                    'colormode', 'hierarchical', 'mode', 'filter_speckle',
+                    'color_precision', 'layer_difference', 'corner_threshold',
+                    'length_threshold', 'splice_threshold', 'path_precision'
+                )
+            }
+            
+            # Large designs: trace regions in parallel and stitch them
+            if self._use_regions(image):
+                svg_content = self._trace_regions(image, trace_config)
+                if svg_content is not None:
+                    logger.info(f"   Vectorized in {time.time() - start_time:.2f}s")
+                    return self._finish_svg(svg_content, image.size, original_size, preset, trace_config['path_precision'])
+            
             # Convert image to RGB if needed
             if image.mode == 'RGBA':
                 # VTracer works best with RGB
@@ -78,40 +209,217 @@ class VectorizerService:
             # Run VTracer
             logger.info(f"   Vectorizing with VTracer (size: {image.size})...")
             
-            svg_content = vtracer.convert_image_to_svg_py(
-                img_array,
-                colormode=vtracer_config['colormode'],
-                hierarchical=vtracer_config['hierarchical'],
-                mode=vtracer_config['mode'],
-                filter_speckle=vtracer_config['filter_speckle'],
-                color_precision=vtracer_config['color_precision'],
-                layer_difference=vtracer_config['layer_difference'],
-                corner_threshold=vtracer_config['corner_threshold'],
-                length_threshold=vtracer_config['length_threshold'],
-                splice_threshold=vtracer_config['splice_threshold'],
-                path_precision=vtracer_config['path_precision']
-            )
+            # On a worker process when pooled (pixels go through shared memory)
+            if self.pool:
+                svg_content = self.pool.run(img_array, trace_config)
+            else:
+                svg_content = trace_pixels(img_array, trace_config)
             
             process_time = time.time() - start_time
             logger.info(f"   Vectorized in {process_time:.2f}s")
             
-            # Add metadata to SVG
-            svg_with_metadata = self._add_svg_metadata(svg_content, image.size)
-            
-            return svg_with_metadata
+            return self._finish_svg(svg_content, image.size, original_size, preset, trace_config['path_precision'])
             
         except Exception as e:
             logger.error(f"❌ Vectorization failed: {str(e)}")
             # Return a simple SVG as fallback
-            return self._create_fallback_svg(image)
+            return self._create_fallback_svg(original_image)
+    
+    def select_preset(self, image: Image.Image) -> str:
+        """
+        Pick a trace preset from a quick look at the image
+        
+        Args:
+            image: PIL Image object
+            
+        Returns:
+            Key of VECTORIZE_PRESETS
+        """
+        stats = probe_complexity(image)
+        
+        if stats["grayscale"] and stats["midtone_ratio"] < 0.02:
+            preset = 'binary'
+        elif stats["distinct_colors"] >= self.photo_colors or stats["edge_density"] >= self.photo_edge_density:
+            preset = 'photo'
+        elif stats["distinct_colors"] <= self.posterize_colors:
+            preset = 'posterized'
+        else:
+            preset = 'color'
+        
+        logger.info(
+            f"   Preset: {preset} ({stats['distinct_colors']} colors, "
+            f"edge density {stats['edge_density']}, alpha coverage {stats['alpha_coverage']})"
+        )
+        return preset
+    
+    def _finish_svg(
+        self,
+        svg_content: str,
+        traced_size: tuple,
+        original_size: tuple,
+        preset: Optional[str],
+        precision: int
+    ) -> str:
+        """
+        Enforce the path budget, restore the original size, add metadata
+        and optimize the markup
+        
+        The trace is streamed through the optimizer and only its opening
+        tags are rewritten, so the document is copied once, into the
+        result string (which is cached, hashed and sent as is).
+        
+        Args:
+            svg_content: Traced SVG string
+            traced_size: (width, height) the image was traced at
+            original_size: (width, height) of the input image
+            preset: Preset used, if any
+            precision: Decimal places kept in coordinates
+            
+        Returns:
+            Final SVG string
+            
+        Raises:
+            VectorizeBudgetError: If the SVG has more than max_paths paths
+        """
+        paths = svg_content.count('<path')
+        if self.max_paths and paths > self.max_paths:
+            raise VectorizeBudgetError(f"{paths} paths exceeds the budget of {self.max_paths}")
+        
+        SVG_BYTES.labels('raw').observe(len(svg_content))
+        stats = {}
+        chunks = optimize_svg_chunks(svg_content, precision, stats) if self.optimize else iter_text(svg_content)
+        svg_content = ''.join(self._rewrite_header(chunks, traced_size, original_size, preset))
+        
+        if self.optimize:
+            logger.info(
+                f"   SVG optimized: {stats['input_bytes'] // 1024} KB → {stats['output_bytes'] // 1024} KB, "
+                f"{stats['paths_in']} → {stats['paths_out']} paths"
+            )
+            SVG_BYTES.labels('optimized').observe(len(svg_content))
+        
+        return svg_content
+    
+    def _rewrite_header(
+        self,
+        chunks: Iterable[str],
+        traced_size: tuple,
+        original_size: tuple,
+        preset: Optional[str]
+    ) -> Iterator[str]:
+        """
+        Set the size and add metadata in the opening tags of an SVG stream
+        
+        Chunks are held back only until the <svg> tag is complete; the
+        rest of the document passes through untouched.
+        
+        Args:
+            chunks: SVG text chunks
+            traced_size: (width, height) the image was traced at
+            original_size: (width, height) of the input image
+            preset: Preset used, if any
+            
+        Returns:
+            Iterator of SVG text chunks
+        """
+        chunks = iter(chunks)
+        pending = ''
+        end = -1
+        for chunk in chunks:
+            pending += chunk
+            start = pending.find('<svg')
+            end = pending.find('>', start) if start >= 0 else -1
+            if end >= 0:
+                break
+        
+        head, rest = (pending[:end + 1], pending[end + 1:]) if end >= 0 else (pending, '')
+        if end >= 0 and traced_size != original_size:
+            head = self._scale_svg(head, traced_size, original_size)
+        head = self._add_svg_metadata(head, original_size, preset)
+        if self.optimize:
+            # Minify the metadata comment like the rest of the markup
+            head = ''.join(optimize_svg_chunks(head))
+        
+        yield head
+        if rest:
+            yield rest
+        yield from chunks
+    
+    def _scale_svg(self, svg_content: str, traced_size: tuple, size: tuple) -> str:
+        """
+        Display a reduced-resolution trace at the original size
+        
+        Args:
+            svg_content: SVG traced at traced_size
+            traced_size: (width, height) the image was traced at
+            size: (width, height) to display at
+            
+        Returns:
+            SVG string with the original size and a viewBox over the trace
+        """
+        return re.sub(
+            r'(<svg[^>]*?)\swidth="[^"]*"\s+height="[^"]*"',
+            lambda match: (
+                f'{match.group(1)} width="{size[0]}" height="{size[1]}" '
+                f'viewBox="0 0 {traced_size[0]} {traced_size[1]}"'
+            ),
+            svg_content,
+            count=1
+        )
+    
+    def _use_regions(self, image: Image.Image) -> bool:
+        """
+        Whether an image is large enough to split into parallel regions
+        
+        Splitting only pays off with more than one pool worker to trace on.
+        
+        Args:
+            image: PIL Image object
+            
+        Returns:
+            True to trace the image region by region
+        """
+        return (
+            self.split_regions
+            and self.pool is not None
+            and self.pool.workers > 1
+            and image.size[0] * image.size[1] >= self.region_min_pixels
+        )
+    
+    def _trace_regions(self, image: Image.Image, trace_config: dict) -> Optional[str]:
+        """
+        Trace an image as independent regions in parallel (blocking)
+        
+        Transparent designs split along their foreground components; opaque
+        ones into overlapping, clipped tiles. Component regions are traced
+        with their transparency and laid on the same white background the
+        single-call path flattens onto.
+        
+        Args:
+            image: PIL Image object
+            trace_config: VTracer keyword arguments
+            
+        Returns:
+            Stitched SVG content, or None if the image does not split
+        """
+        rgba = np.array(image.convert('RGBA'))
+        mode, regions = split_regions(rgba, self.region_tile, self.region_margin)
+        if len(regions) < 2:
+            return None
+        
+        logger.info(f"   Vectorizing {len(regions)} {mode} in parallel (size: {image.size})...")
+        
+        svgs = self.pool.run_many([region.pixels for region in regions], trace_config)
+        background = '#FFFFFF' if mode == COMPONENTS else None
+        return merge_svgs(regions, svgs, image.size, background=background)
     
-    def _add_svg_metadata(self, svg_content: str, original_size: tuple) -> str:
+    def _add_svg_metadata(self, svg_content: str, original_size: tuple, preset: Optional[str] = None) -> str:
         """
         Add metadata to SVG content
         
         Args:
             svg_content: Original SVG string
             original_size: (width, height) of original image
+            preset: Trace preset used, if any
             
         Returns:
             SVG with added metadata
@@ -121,6 +429,7 @@ class VectorizerService:
     Generated by PerfectPrint AI
     Vectorizer: VTracer
     Original Size: {original_size[0]}x{original_size[1]}
+    Preset: {preset or 'custom'}
     Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}
 -->
 """
@@ -142,6 +451,7 @@ class VectorizerService:
             Simple SVG as string
         """
         logger.warning("⚠️  Using fallback SVG (embedded raster image)")
+        record_fallback('vectorize')
         
         import base64
         import io
@@ -218,7 +528,17 @@ class VectorizerService:
             "license": "MIT",
             "quality": "Matches Adobe Illustrator",
             "typical_speed": "1-3 seconds",
-            "supported_modes": ["logo", "artwork", "custom"]
+            "supported_modes": ["logo", "artwork", "custom"],
+            "pool": self.pool.get_stats() if self.pool else None,
+            "adaptive": self.adaptive,
+            "presets": list(VECTORIZE_PRESETS),
+            "max_paths": self.max_paths,
+            "optimize": self.optimize,
+            "regions": {
+                "enabled": self.split_regions and self.pool is not None and self.pool.workers > 1,
+                "min_pixels": self.region_min_pixels,
+                "tile": self.region_tile
+            }
         }
 
 
@@ -0,0 +1,207 @@
+"""
+Webhook delivery for /process-async
+
+Job results are handed to a dispatcher and sent in the background, so a
+job worker moves on to the next job as soon as its result is ready.
+- One pooled keep-alive session, instead of a new TCP/TLS connection per callback
+- Bounded retries with exponential backoff and jitter (honours Retry-After)
+- Callbacks that still fail are appended to a dead-letter log with their
+  full payload, so no result is lost
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.logger import logger
+from utils.config import env_float, env_int, env_str
+from utils.metrics import WEBHOOK_DELIVERIES, observe_stage
+
+# Worth retrying: the receiver may recover (timeouts, throttling, server errors)
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class WebhookDispatcher:
+    """
+    Sends webhook callbacks on a small thread pool with retries
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        dead_letter_path: Optional[str] = None
+    ):
+        """
+        Initialize the dispatcher
+
+        Args:
+            workers: Callbacks sent at once, and pooled connections per host
+                (default: WEBHOOK_WORKERS or 8)
+            max_attempts: Attempts per callback (default: WEBHOOK_MAX_ATTEMPTS or 5)
+            dead_letter_path: JSON-lines file for undeliverable callbacks
+                (default: WEBHOOK_DEAD_LETTER_PATH)
+        """
+        self.workers = max(1, workers or env_int('WEBHOOK_WORKERS', 8))
+        self.max_attempts = max(1, max_attempts or env_int('WEBHOOK_MAX_ATTEMPTS', 5))
+        self.backoff_base = env_float('WEBHOOK_BACKOFF_BASE', 1.0)
+        self.backoff_max = env_float('WEBHOOK_BACKOFF_MAX', 60.0)
+        self.timeout = (env_float('WEBHOOK_CONNECT_TIMEOUT', 5.0), env_float('WEBHOOK_TIMEOUT', 30.0))
+        self.dead_letter_path = dead_letter_path or env_str(
+            'WEBHOOK_DEAD_LETTER_PATH', '/tmp/perfectprint-webhooks/dead-letter.jsonl'
+        )
+
+        # Retries are ours (with backoff), not urllib3's
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="webhook")
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+        # Stats
+        self._delivered = 0
+        self._retries = 0
+        self._dead_letters = 0
+
+    def submit(self, url: str, payload: dict, job_id: str, labels: Optional[Tuple[str, str, str]] = None) -> Future:
+        """
+        Queue a callback for delivery (returns immediately)
+
+        Args:
+            url: Webhook URL
+            payload: JSON-serializable body
+            job_id: Job ID (for logs and the dead-letter log)
+            labels: Option labels for the webhook latency metric
+
+        Returns:
+            Future resolving to True if delivered, False if dead-lettered
+        """
+        future = self._executor.submit(self._deliver, url, payload, job_id, labels)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def _discard(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        """Seconds to wait before the next attempt"""
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _deliver(self, url: str, payload: dict, job_id: str, labels: Optional[Tuple[str, str, str]]) -> bool:
+        """Send one callback, retrying transient failures (blocking)"""
+        start_time = time.time()
+        body = json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'X-Job-Id': job_id}
+        error = None
+
+        for attempt in range(1, self.max_attempts + 1):
+            retry_after = None
+            try:
+                response = self.session.post(url, data=body, headers=headers, timeout=self.timeout)
+                if response.ok:
+                    if labels:
+                        observe_stage('webhook', time.time() - start_time, labels)
+                    WEBHOOK_DELIVERIES.labels('delivered').inc()
+                    with self._lock:
+                        self._delivered += 1
+                    logger.info(f"✅ Webhook for {job_id} delivered (attempt {attempt})")
+                    return True
+
+                error = f"HTTP {response.status_code}"
+                if response.status_code not in RETRY_STATUSES:
+                    break
+                retry_after = response.headers.get('Retry-After')
+            except requests.RequestException as e:
+                error = str(e)
+
+            # Shutting down: no more waiting, keep the payload instead
+            if attempt == self.max_attempts or self._stopping.is_set():
+                break
+
+            delay = self._backoff(attempt, retry_after)
+            logger.warning(f"⚠️  Webhook for {job_id} failed ({error}), retrying in {delay:.1f}s")
+            WEBHOOK_DELIVERIES.labels('retried').inc()
+            with self._lock:
+                self._retries += 1
+            if self._stopping.wait(delay):
+                break
+
+        self._dead_letter(url, payload, job_id, attempt, error)
+        return False
+
+    def _dead_letter(self, url: str, payload: dict, job_id: str, attempts: int, error: Optional[str]):
+        """Append an undeliverable callback to the dead-letter log"""
+        WEBHOOK_DELIVERIES.labels('dead_letter').inc()
+        logger.error(f"❌ Webhook for {job_id} failed after {attempts} attempt(s): {error}")
+
+        record = {
+            "jobId": job_id,
+            "url": url,
+            "attempts": attempts,
+            "error": error,
+            "failedAt": time.time(),
+            "payload": payload
+        }
+        with self._lock:
+            self._dead_letters += 1
+            try:
+                os.makedirs(os.path.dirname(self.dead_letter_path) or '.', exist_ok=True)
+                with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record) + '\n')
+            except OSError as e:
+                logger.error(f"❌ Could not write webhook dead letter for {job_id}: {str(e)}")
+
+    def shutdown(self, timeout: float = 30.0):
+        """
+        Finish pending callbacks, then stop
+
+        Callbacks still failing after the timeout get no further retries
+        and go to the dead-letter log.
+
+        Args:
+            timeout: Seconds to let pending callbacks finish
+        """
+        with self._lock:
+            pending = list(self._pending)
+        if pending:
+            logger.info(f"⏳ Delivering {len(pending)} pending webhook(s)...")
+            wait(pending, timeout=timeout)
+
+        self._stopping.set()
+        self._executor.shutdown(wait=True)
+        self.session.close()
+        logger.info("🛑 Webhook dispatcher stopped")
+
+    def get_stats(self) -> dict:
+        """
+        Get delivery counts
+
+        Returns:
+            Dictionary with dispatcher statistics
+        """
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_attempts": self.max_attempts,
+                "pending": len(self._pending),
+                "delivered": self._delivered,
+                "retries": self._retries,
+                "dead_letters": self._dead_letters
+            }
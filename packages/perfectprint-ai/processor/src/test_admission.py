@@ -0,0 +1,118 @@
+"""
+Tests for memory admission (MemoryAdmission)
+
+Checks arrival-order admission, 413 for jobs larger than the budget, 503
+after the wait limit, and that no reservation leaks on timeout or
+cancellation.
+
+Run with pytest, or directly: python src/test_admission.py
+"""
+
+import asyncio
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from services.admission import AdmissionError, MemoryAdmission, estimate_job_memory
+from utils.logger import logger
+
+
+def test_waiters_are_admitted_in_arrival_order():
+    """A small job that would fit still waits behind an earlier large one"""
+    async def run():
+        admission = MemoryAdmission(budget_bytes=100, max_wait=5)
+        await admission.acquire(60)
+        order = []
+
+        async def job(name, nbytes):
+            await admission.acquire(nbytes)
+            order.append(name)
+
+        large = asyncio.ensure_future(job('large', 50))
+        await asyncio.sleep(0)
+        small = asyncio.ensure_future(job('small', 10))
+        await asyncio.sleep(0.05)
+        assert order == []
+
+        admission.release(60)
+        await asyncio.wait_for(asyncio.gather(large, small), 5)
+        return order, admission.get_stats()
+
+    order, stats = asyncio.run(run())
+    assert order == ['large', 'small']
+    assert stats["reserved_mb"] == 0 and stats["waiting"] == 0 and stats["admitted"] == 3
+
+
+def test_job_over_the_whole_budget_is_refused():
+    """A job that could never fit gets 413 straight away"""
+    async def run():
+        admission = MemoryAdmission(budget_bytes=100, max_wait=5)
+        try:
+            await admission.acquire(101, 'huge.png')
+        except AdmissionError as e:
+            return e.status_code
+        return None
+
+    assert asyncio.run(run()) == 413
+
+
+def test_wait_limit_gives_503_without_leaking():
+    """A job that waits past max_wait gets 503 and leaves nothing reserved"""
+    async def run():
+        admission = MemoryAdmission(budget_bytes=100, max_wait=0.05)
+        await admission.acquire(100)
+        try:
+            await admission.acquire(50)
+            status = None
+        except AdmissionError as e:
+            status = e.status_code
+        stats = admission.get_stats()
+        admission.release(100)
+        return status, stats, admission._reserved
+
+    status, stats, reserved = asyncio.run(run())
+    assert status == 503
+    assert stats["waiting"] == 0
+    assert reserved == 0
+
+
+def test_cancelled_waiter_does_not_block_the_queue():
+    """Cancelling the head waiter lets the ones behind it in"""
+    async def run():
+        admission = MemoryAdmission(budget_bytes=100, max_wait=5)
+        await admission.acquire(60)
+
+        head = asyncio.ensure_future(admission.acquire(50))
+        await asyncio.sleep(0)
+        behind = asyncio.ensure_future(admission.acquire(30))
+        await asyncio.sleep(0)
+
+        head.cancel()
+        await asyncio.gather(head, return_exceptions=True)
+        await asyncio.wait_for(behind, 1)
+        return admission._reserved
+
+    assert asyncio.run(run()) == 90
+
+
+def test_estimate_grows_with_output_and_options():
+    """Upscaling and vectorizing raise the estimate"""
+    base = estimate_job_memory(1000, 1000, (1000, 1000), False, False, factor=1.0)
+    upscaled = estimate_job_memory(1000, 1000, (4000, 4000), False, False, factor=1.0)
+    everything = estimate_job_memory(1000, 1000, (4000, 4000), True, True, factor=1.0)
+    assert base < upscaled < everything
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ PASS {test.__name__}")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ FAIL {test.__name__}: {e!r}")
+    sys.exit(1 if failed else 0)
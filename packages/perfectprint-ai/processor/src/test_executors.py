@@ -0,0 +1,146 @@
+"""
+Tests for the stage hand-off primitives (StageGate, StageLane)
+
+Checks that waiters are served in arrival order (also across event
+loops), that cancelled waiters do not leak slots, and that jobs moving
+through full steps never deadlock.
+
+Run with pytest, or directly: python src/test_executors.py
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+# Add src to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from utils.executors import StageExecutor, StageGate, StageLane
+from utils.logger import logger
+
+
+def test_gate_serves_waiters_in_order():
+    """Slots go to waiters in the order they arrived"""
+    async def run():
+        gate = StageGate('test-order', 1)
+        await gate.acquire()
+        order = []
+
+        async def waiter(name):
+            await gate.acquire()
+            order.append(name)
+            gate.release()
+
+        tasks = []
+        for name in ('a', 'b', 'c'):
+            tasks.append(asyncio.ensure_future(waiter(name)))
+            await asyncio.sleep(0)
+
+        gate.release()
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+        return order, gate.get_stats()
+
+    order, stats = asyncio.run(run())
+    assert order == ['a', 'b', 'c']
+    assert stats == {"capacity": 1, "held": 0, "waiting": 0}
+
+
+def test_gate_hands_over_across_loops():
+    """A release on one event loop wakes a waiter on another"""
+    gate = StageGate('test-loops', 1)
+    waiting = threading.Event()
+    admitted = threading.Event()
+
+    async def hold_then_release():
+        await gate.acquire()
+        worker.start()
+        await asyncio.get_running_loop().run_in_executor(None, waiting.wait, 5)
+        await asyncio.sleep(0.05)
+        gate.release()
+
+    async def wait_for_slot():
+        task = asyncio.ensure_future(gate.acquire())
+        await asyncio.sleep(0)
+        waiting.set()
+        await asyncio.wait_for(task, 5)
+        admitted.set()
+        gate.release()
+
+    worker = threading.Thread(target=lambda: asyncio.run(wait_for_slot()))
+    asyncio.run(hold_then_release())
+    worker.join(5)
+
+    assert admitted.is_set()
+    assert gate.get_stats()["held"] == 0
+
+
+def test_cancelled_waiter_releases_its_slot():
+    """Cancelling a waiter (even one just handed the slot) leaks nothing"""
+    async def run():
+        gate = StageGate('test-cancel', 1)
+        await gate.acquire()
+
+        cancelled = asyncio.ensure_future(gate.acquire())
+        await asyncio.sleep(0)
+        # Hand the slot over and cancel before the waiter runs
+        gate.release()
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+
+        await asyncio.wait_for(gate.acquire(), 1)
+        gate.release()
+        return gate.get_stats()
+
+    assert asyncio.run(run()) == {"capacity": 1, "held": 0, "waiting": 0}
+
+
+def test_lanes_through_full_steps_do_not_deadlock():
+    """Many jobs through single-slot steps all finish, within each step's capacity"""
+    steps = ['decode', 'upscale', 'encode']
+    executor = StageExecutor(
+        limits={step: 1 for step in steps},
+        queue_limits={step: 0 for step in steps}
+    )
+    inside = {step: 0 for step in steps}
+    peak = {step: 0 for step in steps}
+
+    def work(step):
+        inside[step] += 1
+        peak[step] = max(peak[step], inside[step])
+        inside[step] -= 1
+        return step
+
+    async def job():
+        lane = StageLane(executor)
+        try:
+            for step in steps:
+                await lane.run(step, step, work, step)
+                await asyncio.sleep(0)
+        finally:
+            lane.leave()
+
+    async def run():
+        await asyncio.wait_for(asyncio.gather(*(job() for _ in range(20))), 10)
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+    assert peak == {step: 1 for step in steps}
+    stats = executor.get_stats()["steps"]
+    assert all(stats[step]["held"] == 0 and stats[step]["waiting"] == 0 for step in steps)
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ PASS {test.__name__}")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ FAIL {test.__name__}: {e!r}")
+    sys.exit(1 if failed else 0)
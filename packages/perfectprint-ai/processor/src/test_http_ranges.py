@@ -0,0 +1,99 @@
+"""
+Tests for the HTTP Range and conditional-request helpers
+
+Checks single ranges, suffix ranges, unsatisfiable ranges (416),
+malformed ranges (ignored), If-Range and 304 revalidation.
+
+Run with pytest, or directly: python src/test_http_ranges.py
+"""
+
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from utils.http_ranges import RangeNotSatisfiable, http_date, is_not_modified, parse_range
+from utils.logger import logger
+
+SIZE = 1000
+ETAG = '"abc123"'
+MODIFIED = 1700000000.0
+
+
+def _range(value, **headers):
+    headers['range'] = value
+    return parse_range(headers, SIZE, ETAG, MODIFIED)
+
+
+def _unsatisfiable(value, size=SIZE):
+    try:
+        parse_range({'range': value}, size, ETAG, MODIFIED)
+    except RangeNotSatisfiable:
+        return True
+    return False
+
+
+def test_single_ranges():
+    """Closed, open-ended and overlong ranges are clamped to the resource"""
+    assert _range('bytes=0-99') == (0, 100)
+    assert _range('bytes=900-') == (900, SIZE)
+    assert _range('bytes=990-5000') == (990, SIZE)
+    assert _range('bytes=999-999') == (999, SIZE)
+
+
+def test_suffix_ranges():
+    """bytes=-N serves the last N bytes, or everything if N is larger"""
+    assert _range('bytes=-100') == (900, SIZE)
+    assert _range('bytes=-5000') == (0, SIZE)
+
+
+def test_unsatisfiable_ranges():
+    """Ranges that select no bytes raise instead of serving the whole file"""
+    assert _unsatisfiable('bytes=-0')
+    assert _unsatisfiable('bytes=1000-')
+    assert _unsatisfiable('bytes=5000-6000')
+    assert _unsatisfiable('bytes=-10', size=0)
+
+
+def test_malformed_ranges_are_ignored():
+    """Anything that is not one well-formed byte range gets the whole resource"""
+    for value in ('bytes=abc-def', 'bytes=5-2', 'bytes=-', 'bytes=10', 'items=0-10',
+                  'bytes=0-10,20-30', 'bytes=--5', 'bytes=1.5-3'):
+        assert _range(value) is None, value
+    assert parse_range({}, SIZE, ETAG, MODIFIED) is None
+
+
+def test_if_range():
+    """A stale or weak If-Range validator turns the request into a full GET"""
+    assert _range('bytes=0-9', **{'if-range': ETAG}) == (0, 10)
+    assert _range('bytes=0-9', **{'if-range': '"other"'}) is None
+    assert _range('bytes=0-9', **{'if-range': 'W/"abc123"'}) is None
+    assert _range('bytes=0-9', **{'if-range': http_date(MODIFIED)}) == (0, 10)
+    assert _range('bytes=0-9', **{'if-range': http_date(MODIFIED - 60)}) is None
+    assert _range('bytes=0-9', **{'if-range': 'not a date'}) is None
+
+
+def test_not_modified():
+    """If-None-Match (weak comparison) wins over If-Modified-Since"""
+    assert is_not_modified({'if-none-match': ETAG}, ETAG, MODIFIED)
+    assert is_not_modified({'if-none-match': 'W/"abc123", "x"'}, ETAG, MODIFIED)
+    assert is_not_modified({'if-none-match': '*'}, ETAG, MODIFIED)
+    assert not is_not_modified({'if-none-match': '"x"', 'if-modified-since': http_date(MODIFIED)},
+                               ETAG, MODIFIED)
+    assert is_not_modified({'if-modified-since': http_date(MODIFIED)}, ETAG, MODIFIED)
+    assert not is_not_modified({'if-modified-since': http_date(MODIFIED - 60)}, ETAG, MODIFIED)
+    assert not is_not_modified({}, ETAG, MODIFIED)
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ PASS {test.__name__}")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ FAIL {test.__name__}: {e!r}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,123 @@
+"""
+Tests for the SVG optimizer
+
+Checks same-fill path merging (and when it must not happen), dropping of
+degenerate and covered paths, translate() baking and pass-through of
+markup the optimizer does not understand.
+
+Run with pytest, or directly: python src/test_svg_optimizer.py
+"""
+
+import os
+import re
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from utils.logger import logger
+from utils.svg_optimizer import gzip_chunks, optimize_svg, optimize_svg_chunks
+
+HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n<svg version="1.1" xmlns="http://www.w3.org/2000/svg" width="100" height="100">\n'
+
+
+def _svg(*paths):
+    return HEADER + ''.join(f'  {path}\n' for path in paths) + '</svg>\n'
+
+
+def _square(x, y, fill, size=10):
+    return f'<path d="M{x} {y} L{x + size} {y} L{x + size} {y + size} L{x} {y + size} Z " fill="{fill}"/>'
+
+
+def _paths(svg):
+    return re.findall(r'<path[^>]*>', svg)
+
+
+def test_same_fill_paths_are_merged():
+    """Disjoint same-fill paths become one path with every subpath"""
+    optimized, stats = optimize_svg(_svg(_square(0, 0, '#FF0000'), _square(20, 0, '#FF0000'),
+                                         _square(40, 0, '#FF0000')))
+    assert stats["paths_in"] == 3
+    assert stats["paths_out"] == 1 and stats["merged"] == 2
+    paths = _paths(optimized)
+    assert len(paths) == 1
+    assert paths[0].count('M') == 3
+
+
+def test_merging_keeps_paint_order():
+    """A path is not merged past a different fill drawn over the same area"""
+    optimized, stats = optimize_svg(_svg(_square(0, 0, '#FF0000', 20), _square(5, 5, '#00FF00'),
+                                         _square(10, 10, '#FF0000', 20)))
+    assert stats["merged"] == 0 and stats["paths_out"] == 3
+    fills = [re.search(r'fill="([^"]+)"', path).group(1) for path in _paths(optimized)]
+    assert fills == ['#FF0000', '#00FF00', '#FF0000']
+
+
+def test_degenerate_and_covered_paths_are_dropped():
+    """Zero-area paths and paths under a later opaque rectangle disappear"""
+    optimized, stats = optimize_svg(_svg(
+        '<path d="M5 5 L50 5 Z" fill="#0000FF"/>',
+        _square(10, 10, '#00FF00'),
+        _square(0, 0, '#FF0000', 50)
+    ))
+    assert stats["degenerate"] == 1
+    assert stats["covered"] == 1
+    assert stats["paths_out"] == 1
+    assert '#00FF00' not in optimized and '#0000FF' not in optimized
+
+
+def test_translate_is_baked_and_numbers_rounded():
+    """Coordinates are rounded; merged paths carry their own offsets"""
+    optimized, _ = optimize_svg(_svg(
+        '<path d="M0.123456 0 L10 0 L10 10 L0 10 Z" fill="#FF0000" transform="translate(50,50)"/>',
+        '<path d="M0 0 L10 0 L10 10 L0 10 Z" fill="#FF0000" transform="translate(0,0)"/>'
+    ), precision=2)
+    paths = _paths(optimized)
+    assert len(paths) == 1
+    assert '0.123456' not in paths[0]
+    assert '0.12' in paths[0] or '.12' in paths[0]
+
+
+def test_unknown_markup_passes_through():
+    """Paths with unsupported commands or attributes are left alone"""
+    arc = '<path d="M0 0 A5 5 0 0 1 10 10" fill="#FF0000"/>'
+    styled = '<path d="M20 20 L30 20 L30 30 Z" fill="#FF0000" opacity="0.5"/>'
+    optimized, stats = optimize_svg(_svg(arc, styled))
+    assert arc in optimized and styled in optimized
+    assert stats["paths_in"] == stats["paths_out"] == 2
+
+
+def test_chunks_match_whole_output():
+    """Streaming in chunks produces the same document as optimize_svg"""
+    # Runs of paths are optimized whole, so split them with groups to get
+    # several chunks
+    svg = _svg(*(
+        f'<g>{_square(x * 12 % 96, x * 7 % 90, f"#{x % 7:02X}0000")}</g>' if x % 50 == 0
+        else _square(x * 12 % 96, x * 7 % 90, f'#{x % 7:02X}0000')
+        for x in range(5000)
+    ))
+    optimized, stats = optimize_svg(svg)
+    chunks = list(optimize_svg_chunks(svg))
+    assert len(chunks) > 1
+    assert ''.join(chunks) == optimized
+    assert stats["output_bytes"] == len(optimized) < stats["input_bytes"]
+
+
+def test_gzip_chunks_round_trip():
+    """svgz output decompresses back to the optimized SVG"""
+    import gzip
+    optimized, _ = optimize_svg(_svg(_square(0, 0, '#FF0000')))
+    assert gzip.decompress(b''.join(gzip_chunks([optimized]))).decode('utf-8') == optimized
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ PASS {test.__name__}")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ FAIL {test.__name__}: {e!r}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,153 @@
+"""
+Tests for the VTracer process pool (VectorizePool)
+
+Checks that traces come back from the workers, that a trace past its
+time limit is killed and its worker replaced, that workers which died
+(while idle or mid-trace) are replaced instead of failing every later
+job, and that shutdown waits for the traces in flight.
+
+Needs vtracer. The pool spawns its workers, so run with pytest or
+directly: python src/test_vector_pool.py
+"""
+
+import os
+import signal
+import sys
+import threading
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from utils.logger import logger
+from utils.vector_pool import VectorizePool, VectorizeTimeoutError, VectorizeWorkerError
+
+CONFIG = {'colormode': 'color', 'filter_speckle': 4}
+
+
+def _design(side=64):
+    """A few flat colour blocks: traces in milliseconds"""
+    img = np.full((side, side, 3), 255, dtype=np.uint8)
+    img[:side // 2, :side // 2] = (255, 0, 0)
+    img[side // 2:, side // 2:] = (0, 0, 255)
+    return img
+
+
+def _noise(side=1024):
+    """Colour noise: one of the slowest inputs VTracer gets"""
+    return np.random.default_rng(0).integers(0, 256, (side, side, 3), dtype=np.uint8)
+
+
+def test_traces_on_workers():
+    """Traces run in the workers and come back as SVG"""
+    pool = VectorizePool(workers=2, timeout=60)
+    try:
+        results = [pool.run(_design(side), CONFIG) for side in (64, 32, 48)]
+        assert all(svg.lstrip().startswith('<?xml') and '<path' in svg for svg in results)
+        stats = pool.get_stats()
+        assert stats["completed"] == 3 and stats["failures"] == 0
+    finally:
+        pool.shutdown()
+
+
+def test_timeout_kills_and_replaces_worker():
+    """A trace past its limit raises, and the pool keeps working"""
+    pool = VectorizePool(workers=1, timeout=60)
+    try:
+        pool.run(_design(), CONFIG)
+        worker = pool._all[0].process
+        try:
+            pool.run(_noise(), CONFIG, timeout=0.01)
+            raise AssertionError("trace did not time out")
+        except VectorizeTimeoutError:
+            pass
+        assert not worker.is_alive()
+        assert pool._all[0].process is not worker
+
+        assert '<path' in pool.run(_design(), CONFIG)
+        stats = pool.get_stats()
+        assert stats["timeouts"] == 1 and stats["completed"] == 2 and stats["idle"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_dead_workers_are_replaced():
+    """Workers killed while idle do not fail the jobs that pick them up"""
+    pool = VectorizePool(workers=2, timeout=60)
+    try:
+        pool.start()
+        for worker in list(pool._all):
+            os.kill(worker.process.pid, signal.SIGKILL)
+            worker.process.join(5)
+
+        results = [pool.run(_design(side), CONFIG) for side in (64, 32)]
+        assert all('<path' in svg for svg in results)
+        stats = pool.get_stats()
+        assert stats["failures"] == 2 and stats["completed"] == 2
+        assert all(worker.process.is_alive() for worker in pool._all)
+    finally:
+        pool.shutdown()
+
+
+def test_trace_error_keeps_worker():
+    """A VTracer error is reported and the worker stays in the pool"""
+    pool = VectorizePool(workers=1, timeout=60)
+    try:
+        pool.start()
+        worker = pool._all[0].process
+        try:
+            pool.run(_design(), {'not_a_vtracer_option': 1})
+            raise AssertionError("bad config was accepted")
+        except VectorizeWorkerError:
+            pass
+        assert '<path' in pool.run(_design(), CONFIG)
+        assert pool._all[0].process is worker
+        assert pool.get_stats()["failures"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_shutdown_waits_for_traces_in_flight():
+    """Shutdown waits for a running trace, even one that replaces its worker"""
+    pool = VectorizePool(workers=1, timeout=60)
+    outcome = []
+
+    def trace():
+        try:
+            pool.run(_noise(), CONFIG, timeout=0.5)
+            outcome.append('traced')
+        except VectorizeTimeoutError:
+            outcome.append('timeout')
+        except Exception as e:
+            outcome.append(repr(e))
+
+    try:
+        pool.start()
+        tracer = threading.Thread(target=trace)
+        tracer.start()
+        while pool.get_stats()["idle"]:
+            pass
+        pool.shutdown()
+        tracer.join(60)
+
+        assert outcome == ['timeout']
+        assert pool._all == [] and pool.get_stats()["idle"] == 0
+
+        assert '<path' in pool.run(_design(), CONFIG)
+        assert len(pool._all) == 1
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ PASS {test.__name__}")
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ FAIL {test.__name__}: {e!r}")
+    sys.exit(1 if failed else 0)
@@ -3,11 +3,18 @@ PerfectPrint AI Utilities
 """
 
 from .logger import logger
-from .image_utils import encode_image_to_base64, decode_base64_to_image
+from .image_utils import (
+    encode_image_to_base64,
+    encode_image_to_bytes,
+    bytes_to_data_url,
+    decode_base64_to_image
+)
 
 __all__ = [
     'logger',
     'encode_image_to_base64',
+    'encode_image_to_bytes',
+    'bytes_to_data_url',
     'decode_base64_to_image'
 ]
 
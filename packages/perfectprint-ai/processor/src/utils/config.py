@@ -0,0 +1,161 @@
+"""
+Runtime configuration for PerfectPrint AI
+
+Settings are read from environment variables so each deployment
+(Cloud Run, Docker, local) can be tuned without code changes.
+
+Pool sizes default from the cores and memory this process may use; a
+forked server worker narrows those to its share (set_worker_share).
+"""
+
+import os
+from typing import Optional
+
+# (cores, memory divisor) for a forked server worker, None in a lone process
+_worker_share: Optional[tuple] = None
+
+
+def env_str(name: str, default: str) -> str:
+    """
+    Read a string setting from the environment
+
+    Args:
+        name: Environment variable name
+        default: Value used when the variable is unset or empty
+
+    Returns:
+        Setting value
+    """
+    value = os.environ.get(name)
+    return value if value else default
+
+
+def env_int(name: str, default: int) -> int:
+    """
+    Read an integer setting from the environment
+
+    Args:
+        name: Environment variable name
+        default: Value used when the variable is unset or invalid
+
+    Returns:
+        Setting value
+    """
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """
+    Read a float setting from the environment
+
+    Args:
+        name: Environment variable name
+        default: Value used when the variable is unset or invalid
+
+    Returns:
+        Setting value
+    """
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """
+    Read a boolean setting from the environment
+
+    Accepts 1/0, true/false, yes/no, on/off (case-insensitive).
+
+    Args:
+        name: Environment variable name
+        default: Value used when the variable is unset or invalid
+
+    Returns:
+        Setting value
+    """
+    value = os.environ.get(name)
+    if not value:
+        return default
+    value = value.strip().lower()
+    if value in ('1', 'true', 'yes', 'on'):
+        return True
+    if value in ('0', 'false', 'no', 'off'):
+        return False
+    return default
+
+
+def set_worker_share(workers: int, cores: int):
+    """
+    Size defaults for one of several server workers on the node
+
+    After this, get_cpu_count() reports the worker's cores and
+    get_total_memory_bytes() its even share of the node's memory.
+
+    Args:
+        workers: Number of server workers on the node
+        cores: Cores this worker may use
+    """
+    global _worker_share
+    _worker_share = (max(1, cores), max(1, workers))
+
+
+def get_cpu_count() -> int:
+    """
+    Number of CPU cores this process is allowed to run on
+
+    Returns:
+        Core count (at least 1)
+    """
+    if _worker_share:
+        return _worker_share[0]
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+def get_total_memory_bytes() -> Optional[int]:
+    """
+    Memory available to this process
+
+    Honours cgroup limits (Docker, Cloud Run) before falling back to
+    physical memory; a server worker gets its share (set_worker_share).
+
+    Returns:
+        Memory in bytes, or None if it cannot be determined
+    """
+    total = _get_node_memory_bytes()
+    if total and _worker_share:
+        return total // _worker_share[1]
+    return total
+
+
+def _get_node_memory_bytes() -> Optional[int]:
+    """Memory limit of the container, else physical memory"""
+    # cgroup v2, then v1
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                raw = f.read().strip()
+            if raw.isdigit():
+                limit = int(raw)
+                # v1 reports a huge sentinel value when unlimited
+                if limit < (1 << 60):
+                    return limit
+        except OSError:
+            continue
+
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
@@ -0,0 +1,368 @@
+"""
+Stage executors for CPU-heavy pipeline work
+
+Each pipeline stage (decode, upscale, background removal, vectorize,
+encode) gets its own thread pool, sized to that stage's concurrency
+limit. Async callers await the work without blocking the event loop,
+so /health and other requests stay responsive while images process.
+
+Jobs move between stages through bounded hand-offs (StageLane): a job
+keeps its place in one stage until the next stage has room for it, so a
+slow stage pushes back on the stages before it instead of letting work
+pile up in memory, and every stage stays busy with a different job.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from utils.logger import logger
+from utils.config import env_int, get_cpu_count
+from utils.metrics import STAGE_IN_FLIGHT, STAGE_WAITING
+
+
+def default_stage_limits() -> Dict[str, int]:
+    """
+    Default concurrency limit for each stage
+
+    Torch stages already use every core through intra-op threads, so they
+    get few slots; background removal gets enough slots to fill a BRIA
+    micro-batch; vectorize threads only wait on the VTracer process pool,
+    so they match its size. Override any stage with STAGE_LIMIT_<STAGE>, e.g.
+    STAGE_LIMIT_VECTORIZE=2.
+
+    Returns:
+        Dictionary of stage name to max concurrent calls
+    """
+    cores = get_cpu_count()
+    defaults = {
+        'decode': cores,
+        'upscale': 1,
+        'background_removal': max(1, env_int('BRIA_MAX_BATCH_SIZE', 4)),
+        'vectorize': max(1, env_int('VECTORIZE_WORKERS', cores)),
+        'encode': cores
+    }
+    return {
+        stage: max(1, env_int(f"STAGE_LIMIT_{stage.upper()}", limit))
+        for stage, limit in defaults.items()
+    }
+
+
+def default_queue_limits(stages) -> Dict[str, int]:
+    """
+    Default hand-off queue size for each stage
+
+    Jobs that finished the previous stage wait in this queue for a free
+    slot; once it is full, finished jobs stay put and the previous stage
+    stops taking new ones (backpressure). Override with
+    STAGE_QUEUE_<STAGE>, e.g. STAGE_QUEUE_UPSCALE=4.
+
+    Args:
+        stages: Stage names
+
+    Returns:
+        Dictionary of stage name to jobs allowed to wait
+    """
+    return {stage: max(0, env_int(f"STAGE_QUEUE_{stage.upper()}", 2)) for stage in stages}
+
+
+class StageGate:
+    """
+    Admission slots for one pipeline step, usable from any event loop
+
+    Job queue workers each run their own event loop, so this cannot be an
+    asyncio.Semaphore. Slots are handed to waiters in arrival order.
+    """
+
+    def __init__(self, name: str, capacity: int):
+        """
+        Initialize the gate
+
+        Args:
+            name: Step name (for stats and metrics)
+            capacity: Jobs allowed in the step at once (running or queued)
+        """
+        self.name = name
+        self.capacity = max(1, capacity)
+        self._held = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+        STAGE_WAITING.labels(name).set_function(lambda: len(self._waiters))
+
+    async def acquire(self):
+        """Wait for a slot"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._held < self.capacity and not self._waiters:
+                self._held += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # The slot was handed over as we were cancelled: pass it on
+            if waiter[1].done() and not waiter[1].cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        """Give a slot back, handing it straight to the next waiter if any"""
+        with self._lock:
+            if self._waiters:
+                loop, future = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self._hand_over, future)
+                    return
+                except RuntimeError:
+                    # Waiter's loop is closed; its slot goes to the pool below
+                    pass
+            self._held -= 1
+
+    def _hand_over(self, future: asyncio.Future):
+        """Runs on the waiter's loop"""
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"capacity": self.capacity, "held": self._held, "waiting": len(self._waiters)}
+
+
+class StageLane:
+    """
+    A job's place in the stage pipeline
+
+    enter() takes a slot in the next step before giving up the current
+    one, so a job never leaves a stage until the next has room for it.
+    Steps must be entered in one fixed order across all jobs (the
+    pipeline's step order), which rules out circular waits.
+    """
+
+    def __init__(self, executor: 'StageExecutor'):
+        """
+        Args:
+            executor: StageExecutor owning the gates
+        """
+        self.executor = executor
+        self._gate: Optional[StageGate] = None
+
+    async def enter(self, step: str, stage: Optional[str] = None):
+        """
+        Move into a step (waits while the step is full)
+
+        Args:
+            step: Pipeline step name
+            stage: Executor stage whose limit sizes the step (default: step)
+        """
+        gate = self.executor.gate(step, stage or step)
+        if gate is self._gate:
+            return
+        await gate.acquire()
+        self.leave()
+        self._gate = gate
+
+    async def run(self, step: str, stage: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Enter a step and run a blocking call on its stage pool
+
+        Args:
+            step: Pipeline step name
+            stage: Executor stage to run on
+            fn: Blocking callable
+            *args, **kwargs: Passed to fn
+
+        Returns:
+            fn's return value
+        """
+        await self.enter(step, stage)
+        return await self.executor.run(stage, fn, *args, **kwargs)
+
+    def leave(self):
+        """Give up the current step's slot (call when the job is done)"""
+        if self._gate is not None:
+            self._gate.release()
+            self._gate = None
+
+
+class StageExecutor:
+    """
+    Per-stage thread pools with independent concurrency limits
+    """
+
+    def __init__(self, limits: Dict[str, int] = None, queue_limits: Dict[str, int] = None):
+        """
+        Initialize the stage executor
+
+        Pools are created on first use, so nothing is started at import time.
+
+        Args:
+            limits: Stage name to max concurrent calls (default: default_stage_limits())
+            queue_limits: Stage name to hand-off queue size (default: default_queue_limits())
+        """
+        self._lock = threading.Lock()
+        self.configure(limits, queue_limits)
+
+    def configure(self, limits: Dict[str, int] = None, queue_limits: Dict[str, int] = None):
+        """
+        Set the limits again, dropping any pools and gates
+
+        Only for an idle executor, e.g. in a freshly forked server worker
+        (pool threads do not survive fork, and the defaults change with
+        the worker's share of the cores).
+
+        Args:
+            limits: Stage name to max concurrent calls (default: default_stage_limits())
+            queue_limits: Stage name to hand-off queue size (default: default_queue_limits())
+        """
+        self.limits = limits or default_stage_limits()
+        self.queue_limits = queue_limits or default_queue_limits(self.limits)
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._gates: Dict[str, StageGate] = {}
+        self._in_flight = {stage: 0 for stage in self.limits}
+
+        for stage in self.limits:
+            STAGE_IN_FLIGHT.labels(stage).set_function(lambda stage=stage: self._in_flight[stage])
+
+    def _get_pool(self, stage: str) -> ThreadPoolExecutor:
+        """Get (or create) the pool for a stage"""
+        pool = self._pools.get(stage)
+        if pool is not None:
+            return pool
+
+        with self._lock:
+            pool = self._pools.get(stage)
+            if pool is None:
+                if stage not in self.limits:
+                    raise ValueError(f"Unknown pipeline stage: {stage}")
+                pool = ThreadPoolExecutor(
+                    max_workers=self.limits[stage],
+                    thread_name_prefix=f"stage-{stage}"
+                )
+                self._pools[stage] = pool
+            return pool
+
+    def gate(self, step: str, stage: str) -> StageGate:
+        """
+        Get (or create) the admission gate for a pipeline step
+
+        A step holds as many jobs as its stage runs at once plus the
+        stage's hand-off queue.
+
+        Args:
+            step: Pipeline step name
+            stage: Executor stage the step runs on
+
+        Returns:
+            The step's StageGate
+        """
+        gate = self._gates.get(step)
+        if gate is not None:
+            return gate
+
+        with self._lock:
+            gate = self._gates.get(step)
+            if gate is None:
+                if stage not in self.limits:
+                    raise ValueError(f"Unknown pipeline stage: {stage}")
+                gate = StageGate(step, self.limits[stage] + self.queue_limits.get(stage, 0))
+                self._gates[step] = gate
+            return gate
+
+    def pipeline_depth(self) -> int:
+        """
+        Jobs the stages can hold at once (running plus queued)
+
+        Returns:
+            Sum of every stage's limit and hand-off queue size
+        """
+        return sum(limit + self.queue_limits.get(stage, 0) for stage, limit in self.limits.items())
+
+    def _tracked(self, stage: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn on a stage thread, keeping the in-flight count"""
+        with self._lock:
+            self._in_flight[stage] += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._in_flight[stage] -= 1
+
+    async def run(self, stage: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking function on a stage's pool and await the result
+
+        Args:
+            stage: Stage name (decode, upscale, background_removal, vectorize, encode)
+            fn: Blocking callable
+            *args, **kwargs: Passed to fn
+
+        Returns:
+            fn's return value
+        """
+        pool = self._get_pool(stage)
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self._tracked, stage, fn, *args, **kwargs)
+        # In the caller's context, so context variables (fallback tracking) carry over
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(pool, context.run, call)
+
+    def shutdown(self, wait: bool = True):
+        """Shut down all stage pools"""
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+        for pool in pools:
+            pool.shutdown(wait=wait)
+        logger.info("🛑 Stage executors stopped")
+
+    def get_stats(self) -> dict:
+        """
+        Get per-stage limits and in-flight counts, and per-step admission
+
+        Returns:
+            Dictionary keyed by stage name, plus "steps" keyed by step name
+        """
+        with self._lock:
+            stats = {
+                stage: {
+                    "limit": limit,
+                    "queue_limit": self.queue_limits.get(stage, 0),
+                    "in_flight": self._in_flight[stage]
+                }
+                for stage, limit in self.limits.items()
+            }
+            gates = list(self._gates.values())
+        stats["steps"] = {gate.name: gate.get_stats() for gate in gates}
+        return stats
+
+
+# Shared by every service and the pipeline
+stage_executor = StageExecutor()
+
+
+async def run_in_stage(stage: str, fn: Callable, *args, **kwargs) -> Any:
+    """
+    Await a blocking call on the shared stage executor
+
+    Args:
+        stage: Stage name
+        fn: Blocking callable
+        *args, **kwargs: Passed to fn
+
+    Returns:
+        fn's return value
+    """
+    return await stage_executor.run(stage, fn, *args, **kwargs)
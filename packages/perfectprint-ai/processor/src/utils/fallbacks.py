@@ -0,0 +1,47 @@
+"""
+Fallback tracking
+
+Services degrade rather than fail: a BRIA error falls back to white
+removal, a Real-ESRGAN error to Lanczos, a VTracer error to a raster SVG.
+They report each fallback here, and a caller that wants to know (the
+pipeline, which must not cache degraded results) collects the reports for
+the work it awaits.
+
+Reports travel in a context variable holding a list, so they reach the
+caller from stage executor threads too (StageExecutor runs calls in a
+copy of the caller's context; the list is shared, not copied).
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+_fallbacks: ContextVar[Optional[List[str]]] = ContextVar('fallbacks', default=None)
+
+
+@contextmanager
+def track_fallbacks() -> Iterator[List[str]]:
+    """
+    Collect the fallbacks used inside a with block
+
+    Yields:
+        List that receives the name of each fallback used
+    """
+    used: List[str] = []
+    token = _fallbacks.set(used)
+    try:
+        yield used
+    finally:
+        _fallbacks.reset(token)
+
+
+def record_fallback(name: str):
+    """
+    Report that a degraded result was produced
+
+    Args:
+        name: What fell back (e.g. 'background_removal')
+    """
+    used = _fallbacks.get()
+    if used is not None:
+        used.append(name)
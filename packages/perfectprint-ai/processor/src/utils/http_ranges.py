@@ -0,0 +1,130 @@
+"""
+HTTP Range and conditional-request helpers
+
+Lets clients resume large downloads (Range / If-Range) and revalidate
+cached copies (If-None-Match / If-Modified-Since) without resending bytes.
+"""
+
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Mapping, Optional, Tuple
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header selects no bytes of the resource"""
+
+
+def http_date(timestamp: float) -> str:
+    """Format a Unix timestamp as an HTTP date"""
+    return formatdate(timestamp, usegmt=True)
+
+
+def _parse_http_date(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match list against our ETag"""
+    if header.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, modified: float) -> bool:
+    """
+    Check whether a conditional GET can be answered with 304
+
+    If-None-Match wins over If-Modified-Since when both are sent.
+
+    Args:
+        headers: Request headers (case-insensitive mapping)
+        etag: The resource's ETag (quoted)
+        modified: The resource's last-modified Unix timestamp
+
+    Returns:
+        True if the client's copy is current
+    """
+    if_none_match = headers.get('if-none-match')
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since:
+        since = _parse_http_date(if_modified_since)
+        return since is not None and int(modified) <= since
+    return False
+
+
+def parse_range(headers: Mapping[str, str], size: int, etag: str, modified: float) -> Optional[Tuple[int, int]]:
+    """
+    Work out the byte range a request asks for
+
+    Only single ranges are served; multi-range requests, unknown units and
+    a failed If-Range get the whole resource.
+
+    Args:
+        headers: Request headers (case-insensitive mapping)
+        size: Resource size in bytes
+        etag: The resource's ETag (quoted)
+        modified: The resource's last-modified Unix timestamp
+
+    Returns:
+        (start, end) with end exclusive, or None for the whole resource
+
+    Raises:
+        RangeNotSatisfiable: If the range starts past the end of the resource
+            or asks for an empty suffix (bytes=-0)
+    """
+    header = headers.get('range')
+    if not header:
+        return None
+
+    if_range = headers.get('if-range')
+    if if_range:
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            # Ranges need a strong validator match
+            if if_range != etag:
+                return None
+        else:
+            since = _parse_http_date(if_range)
+            if since is None or int(modified) > since:
+                return None
+
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+
+    first, sep, last = spec.strip().partition('-')
+    first, last = first.strip(), last.strip()
+    if not sep:
+        return None
+
+    if first == '':
+        # Suffix range: the last N bytes (none of an empty resource)
+        if not last.isdigit():
+            return None
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - length), size
+
+    # Malformed ranges are ignored (whole resource), per RFC 9110
+    if not first.isdigit() or (last and not last.isdigit()):
+        return None
+    start = int(first)
+    end = int(last) + 1 if last else size
+
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if end <= start:
+        return None
+    return start, min(end, size)
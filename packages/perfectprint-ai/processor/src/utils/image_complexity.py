@@ -0,0 +1,78 @@
+"""
+Fast image-complexity probe
+
+Measures a small thumbnail so the vectorizer can pick a trace preset
+before committing to a full-resolution trace:
+- Distinct colours (flat art has few, photos thousands)
+- Edge density (share of pixels on a strong luminance edge)
+- Alpha coverage (share of the canvas that is not transparent)
+- Whether the visible pixels are black-and-white line art
+"""
+
+import numpy as np
+from PIL import Image
+
+# Colour levels kept per channel when counting distinct colours
+COLOR_LEVELS = 32
+
+# Luminance step between neighbours that counts as an edge
+EDGE_THRESHOLD = 32
+
+
+def probe_complexity(image: Image.Image, sample_side: int = 256) -> dict:
+    """
+    Measure how hard an image is to trace
+
+    Args:
+        image: PIL Image object
+        sample_side: Longest side of the thumbnail that is measured
+
+    Returns:
+        Dictionary with distinct_colors, edge_density, alpha_coverage,
+        grayscale and midtone_ratio (statistics cover visible pixels only)
+    """
+    # Sample down first, so only the thumbnail is converted (never a
+    # full-resolution RGBA copy)
+    scale = sample_side / max(image.size)
+    if scale < 1:
+        size = (max(1, round(image.size[0] * scale)), max(1, round(image.size[1] * scale)))
+        image = image.resize(size, Image.NEAREST)
+    pixels = np.asarray(image.convert('RGBA'))
+
+    visible = pixels[..., 3] > 127
+    alpha_coverage = float(visible.mean())
+    if not visible.any():
+        return {
+            "distinct_colors": 0,
+            "edge_density": 0.0,
+            "alpha_coverage": 0.0,
+            "grayscale": True,
+            "midtone_ratio": 0.0
+        }
+
+    rgb = pixels[..., :3].astype(np.int32)
+    shift = 8 - int(np.log2(COLOR_LEVELS))
+    packed = (
+        (rgb[..., 0] >> shift) * COLOR_LEVELS * COLOR_LEVELS
+        + (rgb[..., 1] >> shift) * COLOR_LEVELS
+        + (rgb[..., 2] >> shift)
+    )
+    distinct_colors = int(np.unique(packed[visible]).size)
+
+    luma = (rgb[..., 0] * 299 + rgb[..., 1] * 587 + rgb[..., 2] * 114) // 1000
+    edges = np.zeros_like(visible)
+    edges[:, 1:] |= np.abs(np.diff(luma, axis=1)) > EDGE_THRESHOLD
+    edges[1:, :] |= np.abs(np.diff(luma, axis=0)) > EDGE_THRESHOLD
+    edge_density = float((edges & visible).sum() / visible.sum())
+
+    visible_rgb = rgb[visible]
+    chroma = visible_rgb.max(axis=1) - visible_rgb.min(axis=1)
+    visible_luma = luma[visible]
+
+    return {
+        "distinct_colors": distinct_colors,
+        "edge_density": round(edge_density, 4),
+        "alpha_coverage": round(alpha_coverage, 4),
+        "grayscale": bool((chroma < 24).mean() > 0.99),
+        "midtone_ratio": round(float(((visible_luma > 64) & (visible_luma < 192)).mean()), 4)
+    }
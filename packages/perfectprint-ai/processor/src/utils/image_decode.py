@@ -0,0 +1,54 @@
+"""
+Image decoding and cheap reduced-resolution views
+
+Stages that only look at a small view of the input (BRIA sees 1024x1024)
+should not Lanczos-resample the full-resolution image: an integer box
+reduce first brings it down to a few megapixels at a fraction of the
+cost. Views are never smaller than the requested size, so the stage's
+own final resize still only ever shrinks.
+"""
+
+import io
+from typing import Tuple
+
+from PIL import Image
+
+
+def decode_image(contents: bytes, mode: str = 'RGB') -> Image.Image:
+    """
+    Decode image bytes (blocking)
+
+    Pixels are decoded here rather than lazily on first access, so the
+    work stays on the calling stage's executor.
+
+    Args:
+        contents: Encoded image bytes
+        mode: Mode to convert to
+
+    Returns:
+        Decoded PIL Image in the requested mode
+    """
+    image = Image.open(io.BytesIO(contents))
+
+    if image.mode != mode:
+        return image.convert(mode)
+
+    image.load()
+    return image
+
+
+def reduce_to(image: Image.Image, min_size: Tuple[int, int]) -> Image.Image:
+    """
+    Shrink an image by the largest integer factor that keeps it >= min_size
+
+    Args:
+        image: Decoded image
+        min_size: (width, height) the result must still cover
+
+    Returns:
+        Box-reduced image (the same image if it cannot shrink by 2x or more)
+    """
+    factor = min(image.size[0] // max(1, min_size[0]), image.size[1] // max(1, min_size[1]))
+    if factor < 2:
+        return image
+    return image.reduce(factor)
@@ -5,25 +5,50 @@ Image utility functions
 import base64
 import io
 from PIL import Image
-from typing import Union
+from typing import BinaryIO, Union
 
-def encode_image_to_base64(image: Image.Image, format: str = "PNG") -> str:
+def encode_image_to_bytes(image: Image.Image, format: str = "PNG") -> bytes:
     """
-    Convert PIL Image to base64 string
+    Encode PIL Image to raw file bytes
     
     Args:
         image: PIL Image object
         format: Image format (PNG, JPEG, etc.)
         
     Returns:
-        Base64 encoded string
+        Encoded image bytes
     """
     buffered = io.BytesIO()
     image.save(buffered, format=format)
-    img_bytes = buffered.getvalue()
-    img_base64 = base64.b64encode(img_bytes).decode('utf-8')
+    return buffered.getvalue()
+
+def bytes_to_data_url(img_bytes: bytes, format: str = "PNG") -> str:
+    """
+    Wrap encoded image bytes in a base64 data URL
+    
+    Args:
+        img_bytes: Encoded image bytes
+        format: Image format (PNG, JPEG, etc.)
+        
+    Returns:
+        Data URL string
+    """
+    img_base64 = base64.b64encode(img_bytes).decode('ascii')
     return f"data:image/{format.lower()};base64,{img_base64}"
 
+def encode_image_to_base64(image: Image.Image, format: str = "PNG") -> str:
+    """
+    Convert PIL Image to base64 string
+    
+    Args:
+        image: PIL Image object
+        format: Image format (PNG, JPEG, etc.)
+        
+    Returns:
+        Base64 encoded string
+    """
+    return bytes_to_data_url(encode_image_to_bytes(image, format), format)
+
 def decode_base64_to_image(base64_string: str) -> Image.Image:
     """
     Convert base64 string to PIL Image
@@ -90,3 +115,36 @@ def get_image_info(image: Image.Image) -> dict:
         "has_transparency": image.mode in ('RGBA', 'LA', 'P')
     }
 
+
+def read_image_header(source: Union[bytes, BinaryIO]) -> dict:
+    """
+    Read an encoded image's format, size and mode without decoding pixels
+    
+    Args:
+        source: Encoded image bytes, or a seekable binary file (its
+            position is restored afterwards)
+        
+    Returns:
+        Dictionary with format, width, height, mode and dpi (None if not set)
+        
+    Raises:
+        ValueError: If the data is not an image PIL can read
+    """
+    fp = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    position = fp.tell()
+    try:
+        # Image.open only parses the header; pixels load on first access
+        with Image.open(fp) as image:
+            return {
+                "format": image.format,
+                "width": image.size[0],
+                "height": image.size[1],
+                "mode": image.mode,
+                "dpi": image.info.get('dpi', (None,))[0]
+            }
+    except Image.UnidentifiedImageError:
+        raise ValueError("Not a readable image (unknown format)")
+    except (Image.DecompressionBombError, OSError) as e:
+        raise ValueError(f"Not a readable image: {str(e)}")
+    finally:
+        fp.seek(position)
@@ -0,0 +1,181 @@
+"""
+Prometheus metrics for PerfectPrint AI
+
+Stage latencies, image sizes, queue depth/wait, memory admission, cache
+lookups, webhook deliveries, model replica waits and model load times,
+exposed on /metrics. Stage and size metrics are labelled with the
+request options so fleet dashboards can see which stage eats the latency
+budget for which kind of job.
+"""
+
+from typing import Tuple
+
+from utils.logger import logger
+
+# prometheus-client is optional (not in requirements-minimal.txt)
+try:
+    from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    logger.warning("⚠️  prometheus-client not available. /metrics disabled.")
+
+    class _NoopMetric:
+        """Stands in for a metric when prometheus-client is missing"""
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def labels(self, *args, **kwargs):
+            return self
+
+        def observe(self, *args, **kwargs):
+            pass
+
+        def inc(self, *args, **kwargs):
+            pass
+
+        def set(self, *args, **kwargs):
+            pass
+
+        def set_function(self, *args, **kwargs):
+            pass
+
+    Counter = Gauge = Histogram = _NoopMetric
+
+    def generate_latest(*args, **kwargs) -> bytes:
+        return b""
+
+
+# Request options every stage/size metric is labelled with
+OPTION_LABELS = ('upscale', 'remove_background', 'vectorize')
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+BYTE_BUCKETS = (1024, 16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2)
+PIXEL_BUCKETS = (64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2)
+
+STAGE_SECONDS = Histogram(
+    'perfectprint_stage_seconds',
+    'Time spent in each pipeline stage',
+    ('stage',) + OPTION_LABELS,
+    buckets=SECONDS_BUCKETS
+)
+PIPELINE_SECONDS = Histogram(
+    'perfectprint_pipeline_seconds',
+    'End-to-end pipeline time per image',
+    ('cache',) + OPTION_LABELS,
+    buckets=SECONDS_BUCKETS
+)
+INPUT_PIXELS = Histogram(
+    'perfectprint_input_pixels',
+    'Pixels in decoded input images',
+    OPTION_LABELS,
+    buckets=PIXEL_BUCKETS
+)
+OUTPUT_PIXELS = Histogram(
+    'perfectprint_output_pixels',
+    'Pixels in processed output images',
+    OPTION_LABELS,
+    buckets=PIXEL_BUCKETS
+)
+SVG_BYTES = Histogram(
+    'perfectprint_svg_bytes',
+    'Size of vectorizer output before (raw) and after (optimized) the SVG optimizer',
+    ('stage',),
+    buckets=BYTE_BUCKETS
+)
+
+QUEUE_DEPTH = Gauge('perfectprint_queue_depth', 'Jobs waiting in the queue', ('queue',))
+QUEUE_ACTIVE = Gauge('perfectprint_queue_active', 'Jobs being processed', ('queue',))
+QUEUE_WAIT_SECONDS = Histogram(
+    'perfectprint_queue_wait_seconds',
+    'Time jobs wait in the queue before a worker picks them up',
+    ('queue',),
+    buckets=SECONDS_BUCKETS
+)
+QUEUE_REJECTED = Counter('perfectprint_queue_rejected_total', 'Jobs rejected because the queue was full', ('queue',))
+
+STAGE_IN_FLIGHT = Gauge('perfectprint_stage_in_flight', 'Calls running on each stage executor', ('stage',))
+STAGE_WAITING = Gauge(
+    'perfectprint_stage_waiting',
+    'Jobs waiting to enter each pipeline step (backpressure)',
+    ('step',)
+)
+
+ADMISSION_RESERVED = Gauge('perfectprint_admission_reserved_bytes', 'Memory reserved by admitted jobs')
+ADMISSION_WAITING = Gauge('perfectprint_admission_waiting', 'Jobs waiting for memory to be admitted')
+ADMISSION_WAIT_SECONDS = Histogram(
+    'perfectprint_admission_wait_seconds',
+    'Time jobs wait for memory before starting',
+    buckets=SECONDS_BUCKETS
+)
+ADMISSION_REJECTED = Counter(
+    'perfectprint_admission_rejected_total',
+    'Jobs refused admission (too_large, timeout)',
+    ('reason',)
+)
+JOB_MEMORY_ESTIMATE = Histogram(
+    'perfectprint_job_memory_estimate_bytes',
+    'Estimated peak memory of admitted jobs',
+    OPTION_LABELS,
+    buckets=tuple(mb * 1024 ** 2 for mb in (64, 128, 256, 512, 1024, 2048, 4096, 8192))
+)
+
+CACHE_LOOKUPS = Counter(
+    'perfectprint_cache_lookups_total',
+    'Result cache lookups by outcome (hit_memory, hit_disk, miss)',
+    ('result',)
+)
+
+WEBHOOK_DELIVERIES = Counter(
+    'perfectprint_webhook_deliveries_total',
+    'Webhook delivery outcomes (delivered, retried, dead_letter)',
+    ('outcome',)
+)
+MODEL_POOL_WAIT_SECONDS = Histogram(
+    'perfectprint_model_pool_wait_seconds',
+    'Time inference callers wait to check out a model replica',
+    ('model',),
+    buckets=SECONDS_BUCKETS
+)
+MODEL_POOL_IN_USE = Gauge('perfectprint_model_pool_in_use', 'Model replicas checked out', ('model',))
+MODEL_LOAD_SECONDS = Gauge('perfectprint_model_load_seconds', 'Time to load and warm each model', ('model',))
+MODEL_READY = Gauge('perfectprint_model_ready', '1 if the model is serving (ready or degraded)', ('model',))
+
+
+def option_labels(upscale: bool, remove_background: bool, vectorize: bool) -> Tuple[str, str, str]:
+    """
+    Label values for the request options
+
+    Args:
+        upscale: Whether to upscale the image
+        remove_background: Whether to remove background
+        vectorize: Whether to vectorize the image
+
+    Returns:
+        Values in OPTION_LABELS order
+    """
+    return tuple('true' if flag else 'false' for flag in (upscale, remove_background, vectorize))
+
+
+def observe_stage(stage: str, seconds: float, options: Tuple[str, str, str]):
+    """
+    Record one stage's duration
+
+    Args:
+        stage: Stage name (decode, upscale, background_removal, vectorize, encode, webhook)
+        seconds: Duration
+        options: Values from option_labels()
+    """
+    STAGE_SECONDS.labels(stage, *options).observe(seconds)
+
+
+def render_metrics() -> bytes:
+    """
+    Current metrics in the Prometheus text format
+
+    Returns:
+        Exposition payload
+    """
+    return generate_latest()
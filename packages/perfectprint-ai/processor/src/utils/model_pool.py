@@ -0,0 +1,151 @@
+"""
+Model replica pools
+
+Inference callers check a replica out, run it alone and hand it back, so
+no two threads ever run through the same module object and the number of
+forward passes in flight per model is fixed by configuration rather than
+by however many threads happen to call in.
+
+Replicas are separate module objects sharing the loaded weight tensors,
+which inference only reads (under no_grad). Extra replicas therefore cost
+no weight memory, and forked server workers still share one copy of the
+weights (see serve.py).
+"""
+
+import copy
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from utils.logger import logger
+from utils.metrics import MODEL_POOL_WAIT_SECONDS, MODEL_POOL_IN_USE
+
+
+def make_replica(model):
+    """
+    Copy a torch module, sharing its parameters and buffers
+
+    Args:
+        model: torch.nn.Module
+
+    Returns:
+        New module object whose tensors are the original's
+    """
+    memo = {id(tensor): tensor for tensor in list(model.parameters()) + list(model.buffers())}
+    return copy.deepcopy(model, memo)
+
+
+class ModelPool:
+    """
+    Fixed set of replicas of one model, checked out one caller at a time
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model: Any,
+        replicas: int = 1,
+        replicate: Callable[[Any], Any] = make_replica
+    ):
+        """
+        Initialize the pool
+
+        Args:
+            name: Model name (for stats and metrics)
+            model: The loaded model (the first replica)
+            replicas: Number of replicas, i.e. inferences allowed at once
+            replicate: Makes one more replica from the loaded model
+        """
+        self.name = name
+        self._model = model
+        self._replicate = replicate
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._fill(replicas)
+
+        MODEL_POOL_IN_USE.labels(name).set_function(lambda: self._in_use)
+        logger.info(f"   {name}: {self.size} replica(s)")
+
+    def _fill(self, replicas: int):
+        """Make the replicas and put them all on a fresh idle queue"""
+        members = [self._model]
+        for _ in range(max(1, replicas) - 1):
+            try:
+                members.append(self._replicate(self._model))
+            except Exception as e:
+                logger.warning(f"⚠️  Cannot replicate {self.name} ({str(e)}), using {len(members)} replica(s)")
+                break
+        self._idle: queue.Queue = queue.Queue()
+        for member in members:
+            self._idle.put(member)
+        self.size = len(members)
+
+    def resize(self, replicas: int):
+        """
+        Rebuild the pool with a different number of replicas
+
+        Only while no replica is checked out (e.g. in a freshly forked
+        server worker).
+
+        Args:
+            replicas: Number of replicas, i.e. inferences allowed at once
+
+        Raises:
+            RuntimeError: If a replica is checked out
+        """
+        with self._lock:
+            if self._in_use:
+                raise RuntimeError(f"Cannot resize {self.name} while {self._in_use} replica(s) are in use")
+            if max(1, replicas) == self.size:
+                return
+            self._fill(replicas)
+        logger.info(f"   {self.name}: resized to {self.size} replica(s)")
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Borrow a replica for the duration of a with block
+
+        Args:
+            timeout: Seconds to wait for a free replica (default: no limit)
+
+        Yields:
+            A replica no other caller is using
+
+        Raises:
+            queue.Empty: If no replica was free within timeout
+        """
+        start = time.time()
+        replica = self._idle.get(timeout=timeout)
+        waited = time.time() - start
+        MODEL_POOL_WAIT_SECONDS.labels(self.name).observe(waited)
+
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total += waited
+        try:
+            yield replica
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._idle.put(replica)
+
+    def get_stats(self) -> dict:
+        """
+        Get pool size, use and wait times
+
+        Returns:
+            Dictionary with pool statistics
+        """
+        with self._lock:
+            return {
+                "replicas": self.size,
+                "in_use": self._in_use,
+                "checkouts": self._checkouts,
+                "avg_wait_ms": round(1000 * self._wait_total / self._checkouts, 2) if self._checkouts else 0.0
+            }
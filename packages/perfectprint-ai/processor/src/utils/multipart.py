@@ -0,0 +1,91 @@
+"""
+Multipart responses for binary result delivery
+
+Streams processed files as raw binary parts of a multipart/mixed body,
+so large PNGs are never base64-encoded or copied into one big string.
+"""
+
+import json
+import uuid
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from fastapi.responses import StreamingResponse
+
+# Bytes handed to the server per chunk
+CHUNK_SIZE = 64 * 1024
+
+# (name, content type, body); an iterable body is streamed as it is produced
+Part = Tuple[str, str, Union[bytes, str, Iterable[bytes]]]
+
+
+def iter_multipart(parts: List[Part], boundary: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield a multipart/mixed body part by part
+
+    Part bodies are sliced through a memoryview, so only one chunk of a
+    large body is copied at a time. Iterable bodies (e.g. a compressor's
+    output) are streamed chunk by chunk, without a Content-Length.
+
+    Args:
+        parts: (name, content type, body) tuples; str bodies are sent as UTF-8
+        boundary: Multipart boundary
+        chunk_size: Largest slice of a body yielded at once
+
+    Returns:
+        Iterator of body chunks
+    """
+    for name, content_type, body in parts:
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+
+        headers = (
+            f"--{boundary}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Disposition: attachment; name=\"{name}\"; filename=\"{name}\"\r\n"
+        )
+        if isinstance(body, bytes):
+            headers += f"Content-Length: {len(body)}\r\n"
+        yield (headers + "\r\n").encode('utf-8')
+
+        if isinstance(body, bytes):
+            view = memoryview(body)
+            for offset in range(0, len(view), chunk_size):
+                yield bytes(view[offset:offset + chunk_size])
+        else:
+            for chunk in body:
+                if chunk:
+                    yield chunk
+
+        yield b"\r\n"
+
+    yield f"--{boundary}--\r\n".encode('utf-8')
+
+
+def multipart_response(
+    parts: List[Part],
+    metadata: Optional[dict] = None,
+    status_code: int = 200
+) -> StreamingResponse:
+    """
+    Build a streaming multipart/mixed response
+
+    Args:
+        parts: (name, content type, body) tuples; parts with a None body are skipped
+        metadata: Optional JSON sent first as a "metadata.json" part
+        status_code: HTTP status code
+
+    Returns:
+        StreamingResponse
+    """
+    boundary = f"perfectprint-{uuid.uuid4().hex}"
+
+    all_parts = []
+    if metadata is not None:
+        all_parts.append(("metadata.json", "application/json", json.dumps(metadata)))
+    all_parts.extend(part for part in parts if part[2] is not None)
+
+    return StreamingResponse(
+        iter_multipart(all_parts, boundary),
+        status_code=status_code,
+        media_type=f"multipart/mixed; boundary={boundary}"
+    )
@@ -0,0 +1,60 @@
+"""
+Request body size limits
+
+ASGI middleware that refuses request bodies over a byte limit with 413:
+up front from Content-Length when the client declares it, and while the
+body streams in otherwise, so an oversized upload is cut off instead of
+being spooled to disk in full.
+"""
+
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Caps the request body size, per path or globally
+    """
+
+    def __init__(self, app, max_bytes: int, path_limits: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            app: ASGI application
+            max_bytes: Default body limit in bytes
+            path_limits: Limits for specific paths (e.g. batch uploads)
+        """
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+
+    def _too_large(self, limit: int) -> str:
+        return f"Request body exceeds the {limit} byte limit"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.path_limits.get(scope["path"], self.max_bytes)
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                response = JSONResponse({"detail": self._too_large(limit)}, status_code=413)
+                await response(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside body parsing, so FastAPI turns it into the response
+                    raise HTTPException(status_code=413, detail=self._too_large(limit))
+            return message
+
+        await self.app(scope, limited_receive, send)
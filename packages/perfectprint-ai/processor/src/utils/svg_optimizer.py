@@ -0,0 +1,414 @@
+"""
+SVG optimizer for vectorizer output
+
+Shrinks VTracer SVGs before they go over the wire:
+- Rounds coordinates to the requested precision and writes them compactly
+- Bakes translate() offsets into the path data
+- Drops degenerate (zero-area) paths and paths fully covered by a later
+  opaque rectangle
+- Merges same-fill paths when no other shape can be drawn between them
+- Minifies the markup and optionally gzips it (svgz)
+
+The input is scanned in place and the output is produced as a stream of
+chunks, so a large SVG is never copied whole more than once. Anything
+the optimizer does not understand (other path commands, attributes or
+transforms) is passed through untouched.
+"""
+
+import re
+import zlib
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Characters handed out per output chunk
+CHUNK_SIZE = 64 * 1024
+
+# Same-fill merging looks this many shapes back, into groups of at most
+# this many paths (bounds the overlap checks per path)
+MERGE_WINDOW = 64
+MERGE_GROUP_LIMIT = 256
+
+_TOKEN = re.compile(r'<!--.*?-->|<\?.*?\?>|<[^>]+>|[^<]+', re.DOTALL)
+_ATTR = re.compile(r'([\w:-]+)\s*=\s*"([^"]*)"')
+_PATH_TOKEN = re.compile(r'[A-Za-z]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_OPAQUE_FILL = re.compile(r'^#(?:[0-9a-fA-F]{3}){1,2}$')
+_TRANSLATE = re.compile(r'^\s*translate\(\s*([-+\d.eE]+)(?:[\s,]+([-+\d.eE]+))?\s*\)\s*$')
+
+# Numbers each supported (absolute) command takes
+_COMMAND_ARGS = {'M': 2, 'L': 2, 'C': 6, 'Z': 0}
+
+# Bounding box (x0, y0, x1, y1)
+Box = Tuple[float, float, float, float]
+
+
+class _Path:
+    """
+    One parsed <path>
+
+    Subpaths hold (command, coordinates) pairs relative to the path's own
+    translate() offset; boxes are in canvas space.
+    """
+
+    __slots__ = ('fill', 'dx', 'dy', 'subpaths', 'boxes', 'box', 'is_rect')
+
+    def __init__(self, fill: str, dx: float, dy: float, subpaths: List[list]):
+        self.fill = fill
+        self.dx = dx
+        self.dy = dy
+        self.subpaths = subpaths
+        local_boxes = [_subpath_box(subpath) for subpath in subpaths]
+        self.boxes = [(x0 + dx, y0 + dy, x1 + dx, y1 + dy) for x0, y0, x1, y1 in local_boxes]
+        self.box = _union(self.boxes) if subpaths else None
+        self.is_rect = (
+            len(subpaths) == 1
+            and bool(_OPAQUE_FILL.match(fill))
+            and _is_rectangle(subpaths[0], local_boxes[0])
+        )
+
+
+def _subpath_box(subpath: list) -> Box:
+    """Box of every point and control point (contains the curves)"""
+    xs = [value for _, coords in subpath for value in coords[0::2]]
+    ys = [value for _, coords in subpath for value in coords[1::2]]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def _union(boxes: List[Box]) -> Box:
+    return (
+        min(box[0] for box in boxes), min(box[1] for box in boxes),
+        max(box[2] for box in boxes), max(box[3] for box in boxes)
+    )
+
+
+def _intersects(a: Box, b: Box) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _contains(outer: Box, inner: Box) -> bool:
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+
+def _is_rectangle(subpath: list, box: Box) -> bool:
+    """Whether every segment runs along one edge of the box (an axis-aligned rectangle)"""
+    x0, y0, x1, y1 = box
+    if x0 == x1 or y0 == y1:
+        return False
+
+    def edges(x, y):
+        return {edge for edge, on in (('l', x == x0), ('r', x == x1), ('t', y == y0), ('b', y == y1)) if on}
+
+    previous = None
+    for command, coords in subpath:
+        if command == 'Z':
+            continue
+        points = list(zip(coords[0::2], coords[1::2]))
+        if command != 'M':
+            shared = edges(*previous)
+            for point in points:
+                shared &= edges(*point)
+            if not shared:
+                return False
+        previous = points[-1]
+    return True
+
+
+def _format_number(value: float, precision: int) -> str:
+    """Shortest fixed-point form: no trailing zeros, no leading zero"""
+    text = f"{value:.{precision}f}".rstrip('0').rstrip('.') if precision > 0 else str(round(value))
+    if text in ('-0', ''):
+        return '0'
+    if text.startswith('0.'):
+        return text[1:]
+    if text.startswith('-0.'):
+        return '-' + text[2:]
+    return text
+
+
+def _parse_path(attrs: dict, precision: int) -> Optional[_Path]:
+    """
+    Parse a VTracer <path>, rounding its coordinates
+
+    Returns:
+        The path, or None if it uses anything the optimizer leaves alone
+    """
+    if set(attrs) - {'d', 'fill', 'transform'} or attrs.get('fill', '').lower() == 'none':
+        return None
+
+    dx = dy = 0.0
+    if 'transform' in attrs:
+        match = _TRANSLATE.match(attrs['transform'])
+        if not match:
+            return None
+        dx = round(float(match.group(1)), precision)
+        dy = round(float(match.group(2) or 0), precision)
+
+    # Split into (command, numbers) pairs
+    commands = []
+    for token in _PATH_TOKEN.findall(attrs.get('d', '')):
+        if token.isalpha():
+            if token not in _COMMAND_ARGS:
+                return None
+            commands.append((token, []))
+        elif commands:
+            commands[-1][1].append(float(token))
+        else:
+            return None
+
+    subpaths = []
+    for command, numbers in commands:
+        expected = _COMMAND_ARGS[command]
+        if expected == 0:
+            if numbers or not subpaths:
+                return None
+            subpaths[-1].append(('Z', []))
+            continue
+        if not numbers or len(numbers) % expected:
+            return None
+
+        coords = [round(value, precision) for value in numbers]
+        for start in range(0, len(coords), expected):
+            segment = coords[start:start + expected]
+            if command == 'M' and start == 0:
+                subpaths.append([('M', segment)])
+            elif not subpaths:
+                return None
+            else:
+                # Extra pairs after a moveto are linetos
+                subpaths[-1].append(('L' if command == 'M' else command, segment))
+
+    # Zero-area subpaths draw nothing
+    kept = []
+    for subpath in subpaths:
+        x0, y0, x1, y1 = _subpath_box(subpath)
+        if x0 < x1 and y0 < y1:
+            kept.append(subpath)
+    return _Path(attrs.get('fill', ''), dx, dy, kept)
+
+
+def _path_data(subpaths: List[list], precision: int, shift_x: float = 0.0, shift_y: float = 0.0) -> str:
+    """
+    Compact path data
+
+    Movetos stay absolute (shifted into the group's frame); every other
+    segment is written relative to the current point, from the already
+    rounded coordinates so rounding never accumulates. Repeated commands
+    and redundant separators are left out.
+    """
+    out = []
+    previous_text = None
+    previous_command = None
+
+    def write(text: str):
+        nonlocal previous_text
+        if previous_text is not None and text[0] != '-' and not (text[0] == '.' and '.' in previous_text):
+            out.append(' ')
+        out.append(text)
+        previous_text = text
+
+    for subpath in subpaths:
+        start_x = start_y = x = y = 0.0
+        for command, coords in subpath:
+            if command == 'M':
+                out.append('M')
+                previous_text = None
+                write(_format_number(round(coords[0] + shift_x, precision), precision))
+                write(_format_number(round(coords[1] + shift_y, precision), precision))
+                start_x, start_y = x, y = coords
+            elif command == 'Z':
+                out.append('Z')
+                previous_text = None
+                x, y = start_x, start_y
+            else:
+                letter = command.lower()
+                if letter != previous_command:
+                    out.append(letter)
+                    previous_text = None
+                for i, value in enumerate(coords):
+                    write(_format_number(round(value - (y if i % 2 else x), precision), precision))
+                x, y = coords[-2], coords[-1]
+            previous_command = command.lower()
+    return ''.join(out)
+
+
+def _group_markup(members: List[_Path], precision: int) -> str:
+    """One <path> for a merged group, in the first member's frame"""
+    origin = members[0]
+    data = ''.join(
+        _path_data(member.subpaths, precision, member.dx - origin.dx, member.dy - origin.dy)
+        for member in members
+    )
+    fill = f' fill="{origin.fill}"' if origin.fill else ''
+    transform = ''
+    if origin.dx or origin.dy:
+        transform = f' transform="translate({_format_number(origin.dx, precision)},{_format_number(origin.dy, precision)})"'
+    return f'<path d="{data}"{fill}{transform}/>'
+
+
+def _optimize_run(paths: List[_Path], precision: int, stats: dict) -> Iterator[str]:
+    """Drop covered paths, merge same-fill paths and write the run out"""
+    # Covered: a later opaque rectangle contains the whole path (control
+    # point boxes contain the curves, so this never drops a visible path)
+    kept = []
+    covers = []
+    for path in reversed(paths):
+        if any(_contains(cover, path.box) for cover in covers):
+            stats["covered"] += 1
+            continue
+        kept.append(path)
+        if path.is_rect:
+            covers.append(path.box)
+    kept.reverse()
+
+    # Merge into the latest same-fill group when nothing drawn in between
+    # overlaps, and the path does not overlap the group's own shapes
+    groups = []
+    latest = {}
+    for path in kept:
+        index = latest.get(path.fill)
+        if (
+            index is not None
+            and len(groups) - index <= MERGE_WINDOW
+            and len(groups[index]["boxes"]) < MERGE_GROUP_LIMIT
+            and not any(_intersects(path.box, box) for box in groups[index]["boxes"])
+            and not any(_intersects(path.box, group["box"]) for group in groups[index + 1:])
+        ):
+            group = groups[index]
+            group["members"].append(path)
+            group["boxes"].append(path.box)
+            group["box"] = _union([group["box"], path.box])
+            stats["merged"] += 1
+            continue
+        latest[path.fill] = len(groups)
+        groups.append({"members": [path], "boxes": [path.box], "box": path.box})
+
+    for group in groups:
+        stats["paths_out"] += 1
+        yield _group_markup(group["members"], precision)
+
+
+def _minify_tag(tag: str) -> str:
+    return re.sub(r'\s*(/?>)$', r'\1', re.sub(r'\s+', ' ', tag))
+
+
+def optimize_svg_chunks(svg: str, precision: int = 3, stats: Optional[dict] = None) -> Iterator[str]:
+    """
+    Optimize an SVG, yielding the result in chunks
+
+    Args:
+        svg: SVG content
+        precision: Decimal places kept in coordinates
+        stats: Optional dictionary filled with input/output sizes and counts
+
+    Returns:
+        Iterator of SVG text chunks
+    """
+    if stats is None:
+        stats = {}
+    stats.update({"input_bytes": len(svg), "output_bytes": 0, "paths_in": 0, "paths_out": 0,
+                  "merged": 0, "degenerate": 0, "covered": 0})
+
+    buffer = []
+    size = 0
+    run = []
+
+    def flush_run():
+        for text in _optimize_run(run, precision, stats):
+            yield text
+        run.clear()
+
+    def emit(pieces):
+        nonlocal size
+        for text in pieces:
+            buffer.append(text)
+            size += len(text)
+
+    for match in _TOKEN.finditer(svg):
+        token = match.group()
+
+        if token.startswith('<path'):
+            stats["paths_in"] += 1
+            path = _parse_path(dict(_ATTR.findall(token)), precision)
+            if path is not None:
+                if path.subpaths:
+                    run.append(path)
+                else:
+                    stats["degenerate"] += 1
+                continue
+            emit(flush_run())
+            stats["paths_out"] += 1
+            emit([_minify_tag(token)])
+        elif not token.startswith('<'):
+            # Text between tags: whitespace goes, anything else stays
+            if token.strip():
+                emit(flush_run())
+                emit([token.strip()])
+        elif token.startswith('<!--'):
+            # Only our own metadata comment is kept
+            if 'PerfectPrint' in token:
+                emit(flush_run())
+                emit([re.sub(r'\s+', ' ', token)])
+        else:
+            emit(flush_run())
+            emit([_minify_tag(token)])
+
+        if size >= CHUNK_SIZE:
+            chunk = ''.join(buffer)
+            buffer.clear()
+            size = 0
+            stats["output_bytes"] += len(chunk)
+            yield chunk
+
+    emit(flush_run())
+    if buffer:
+        chunk = ''.join(buffer)
+        stats["output_bytes"] += len(chunk)
+        yield chunk
+
+
+def optimize_svg(svg: str, precision: int = 3) -> Tuple[str, dict]:
+    """
+    Optimize an SVG in one go
+
+    Args:
+        svg: SVG content
+        precision: Decimal places kept in coordinates
+
+    Returns:
+        (optimized SVG, stats dictionary)
+    """
+    stats = {}
+    optimized = ''.join(optimize_svg_chunks(svg, precision, stats))
+    return optimized, stats
+
+
+def gzip_chunks(chunks: Iterable[str], level: int = 6) -> Iterator[bytes]:
+    """
+    Gzip a stream of text chunks (svgz)
+
+    Args:
+        chunks: Text chunks (e.g. from optimize_svg_chunks)
+        level: zlib compression level
+
+    Returns:
+        Iterator of gzip-compressed byte chunks
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_text(text: str, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """
+    Slice a string into chunks without copying it whole
+
+    Args:
+        text: Text to slice
+        chunk_size: Characters per chunk
+
+    Returns:
+        Iterator of text chunks
+    """
+    for offset in range(0, len(text), chunk_size):
+        yield text[offset:offset + chunk_size]
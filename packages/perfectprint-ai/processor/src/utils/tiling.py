@@ -0,0 +1,97 @@
+"""
+Tiling helpers for processing large images in pieces
+
+Splits an axis into evenly spaced overlapping tiles and builds blending
+weights for the overlaps. Neighbouring tiles get complementary linear
+ramps, so the weights of every output pixel sum to exactly 1 and tiles
+can be added straight into the result without seams.
+"""
+
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# (start, end) along one axis, end exclusive
+Span = Tuple[int, int]
+
+
+def tile_spans(length: int, tile: int, overlap: int) -> List[Span]:
+    """
+    Split an axis into overlapping tiles
+
+    Tiles are spread evenly, so every neighbouring pair overlaps by at
+    least `overlap` pixels and the last tile ends exactly at `length`.
+
+    Args:
+        length: Axis length in pixels
+        tile: Tile length in pixels
+        overlap: Minimum overlap between neighbours in pixels
+
+    Returns:
+        List of (start, end) spans covering the axis
+    """
+    if length <= tile:
+        return [(0, length)]
+
+    overlap = min(overlap, tile // 2)
+    count = math.ceil((length - overlap) / (tile - overlap))
+    spacing = (length - tile) / (count - 1)
+    return [(round(i * spacing), round(i * spacing) + tile) for i in range(count)]
+
+
+def blend_ramps(spans: List[Span], scale: float, overlap: int) -> List[Tuple[Optional[tuple], Optional[tuple]]]:
+    """
+    Work out where each tile fades in and out, in output coordinates
+
+    The ramp between two neighbours is centred in their overlap and is at
+    most `overlap` input pixels wide.
+
+    Args:
+        spans: Tiles from tile_spans()
+        scale: Output pixels per input pixel along this axis
+        overlap: Ramp width in input pixels
+
+    Returns:
+        (fade_in, fade_out) per tile; each is an (start, end) range in
+        output pixels, or None at the image border
+    """
+    boundaries = []
+    for (start, _), (_, prev_end) in zip(spans[1:], spans[:-1]):
+        width = max(1, min(overlap, prev_end - start))
+        centre = (start + prev_end) / 2
+        boundaries.append(((centre - width / 2) * scale, (centre + width / 2) * scale))
+
+    ramps = []
+    for i in range(len(spans)):
+        fade_in = boundaries[i - 1] if i > 0 else None
+        fade_out = boundaries[i] if i < len(boundaries) else None
+        ramps.append((fade_in, fade_out))
+    return ramps
+
+
+def blend_weights(
+    out_start: int,
+    out_end: int,
+    fade_in: Optional[tuple],
+    fade_out: Optional[tuple]
+) -> np.ndarray:
+    """
+    1D blending weights for one tile along one axis
+
+    Args:
+        out_start: First output pixel covered by the tile
+        out_end: Output pixel after the last one covered
+        fade_in: (start, end) of the ramp up from the previous tile, or None
+        fade_out: (start, end) of the ramp down to the next tile, or None
+
+    Returns:
+        float32 weights, one per output pixel
+    """
+    centres = np.arange(out_start, out_end, dtype=np.float32) + 0.5
+    weights = np.ones_like(centres)
+    if fade_in is not None:
+        weights *= np.clip((centres - fade_in[0]) / (fade_in[1] - fade_in[0]), 0.0, 1.0)
+    if fade_out is not None:
+        weights *= np.clip((fade_out[1] - centres) / (fade_out[1] - fade_out[0]), 0.0, 1.0)
+    return weights
@@ -0,0 +1,324 @@
+"""
+Process pool for VTracer
+
+VTracer holds the thread it runs on for the whole trace, so large designs
+are traced in worker processes instead:
+- Pixels reach the workers through shared memory, not pickled copies
+- Pool size is configurable (VECTORIZE_WORKERS)
+- A trace that runs past its time limit is killed and its worker replaced
+
+Lives in utils (not services) so spawned workers only import numpy and
+vtracer, not the torch models.
+"""
+
+import io
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+import numpy as np
+
+from utils.logger import logger
+
+
+class VectorizeTimeoutError(Exception):
+    """Raised when a trace exceeds its time limit (its worker is killed)"""
+
+
+class VectorizeWorkerError(Exception):
+    """Raised when a worker fails or dies during a trace"""
+
+
+def trace_pixels(img_array: np.ndarray, config: dict) -> str:
+    """
+    Trace RGB pixels with VTracer
+
+    VTracer's in-memory entry point takes an encoded image, so RGB pixels
+    are wrapped in an uncompressed BMP (no compression work). RGBA pixels
+    go through an uncompressed PNG, which keeps the alpha VTracer uses to
+    leave transparent areas out of the SVG.
+
+    Args:
+        img_array: HxWx3 uint8 RGB or HxWx4 uint8 RGBA pixels
+        config: VTracer keyword arguments (colormode, mode, ...)
+
+    Returns:
+        SVG content as string
+    """
+    import vtracer
+    from PIL import Image
+
+    buffered = io.BytesIO()
+    if img_array.ndim == 3 and img_array.shape[2] == 4:
+        Image.fromarray(img_array).save(buffered, format='PNG', compress_level=0)
+        img_format = 'png'
+    else:
+        Image.fromarray(img_array).save(buffered, format='BMP')
+        img_format = 'bmp'
+    return vtracer.convert_raw_image_to_svg(buffered.getvalue(), img_format=img_format, **config)
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to a block the parent created (and will unlink)
+
+    Spawned workers share the parent's resource tracker, so on Python
+    < 3.13 attaching re-registers an entry the tracker already has.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track flag
+        return shared_memory.SharedMemory(name=name)
+
+
+def _worker_main(conn):
+    """Worker process: trace images from shared memory until told to stop"""
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        shm_name, shape, dtype, config = job
+        shm = _attach_shared_memory(shm_name)
+        try:
+            img_array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+            svg_content = trace_pixels(img_array, config)
+            del img_array
+            conn.send(('ok', svg_content))
+        except Exception as e:
+            conn.send(('error', str(e)))
+        finally:
+            shm.close()
+
+
+class _Worker:
+    """One worker process and the parent's end of its pipe"""
+
+    def __init__(self, context, index: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn,),
+            name=f"vectorize-worker-{index}",
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def stop(self, timeout: float = 5.0):
+        """Ask the worker to exit, killing it if it does not"""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        self.kill()
+
+    def kill(self):
+        """Terminate the worker immediately"""
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class VectorizePool:
+    """
+    Fixed pool of VTracer worker processes
+
+    run() blocks the calling thread until a worker is free and the trace
+    is done, so callers should sit on the vectorize stage executor.
+    """
+
+    def __init__(self, workers: int, timeout: float):
+        """
+        Initialize the pool (processes start on first use)
+
+        Args:
+            workers: Number of worker processes
+            timeout: Seconds a single trace may take before it is killed
+        """
+        self.workers = max(1, workers)
+        self.timeout = timeout
+
+        # spawn: the parent holds torch thread pools that must not be forked
+        self._context = multiprocessing.get_context('spawn')
+        self._idle: queue.Queue = queue.Queue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._started = False
+        self._next_index = 0
+
+        # Stats
+        self._completed = 0
+        self._timeouts = 0
+        self._failures = 0
+
+    def start(self):
+        """Start the worker processes"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for _ in range(self.workers):
+                self._idle.put(self._spawn())
+
+        logger.info(f"🧵 Vectorize pool started: {self.workers} processes, {self.timeout}s limit")
+
+    def _spawn(self) -> _Worker:
+        """Start one worker (caller holds _lock)"""
+        worker = _Worker(self._context, self._next_index)
+        self._next_index += 1
+        self._all.append(worker)
+        return worker
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        """Kill a worker and start a fresh one in its place"""
+        worker.kill()
+        with self._lock:
+            self._all.remove(worker)
+            return self._spawn()
+
+    def run(self, img_array: np.ndarray, config: dict, timeout: Optional[float] = None) -> str:
+        """
+        Trace an image on a worker process
+
+        Args:
+            img_array: Image pixels (copied once into shared memory)
+            config: VTracer keyword arguments
+            timeout: Time limit in seconds (default: the pool's)
+
+        Returns:
+            SVG content as string
+
+        Raises:
+            VectorizeTimeoutError: If the trace ran too long (the worker is killed)
+            VectorizeWorkerError: If VTracer failed or the worker died
+        """
+        self.start()
+        timeout = timeout or self.timeout
+
+        img_array = np.ascontiguousarray(img_array)
+        # Check a worker out before copying the pixels, so traces queued
+        # for a worker do not each hold a copy in shared memory
+        worker = self._idle.get()
+        shm = None
+
+        try:
+            if not worker.process.is_alive():
+                # Died while idle (OOM killer, SIGKILL): trace on a fresh one
+                logger.warning(f"⚠️  {worker.process.name} died while idle, replacing it")
+                worker = self._replace(worker)
+                with self._lock:
+                    self._failures += 1
+
+            shm = shared_memory.SharedMemory(create=True, size=max(1, img_array.nbytes))
+            np.ndarray(img_array.shape, dtype=img_array.dtype, buffer=shm.buf)[...] = img_array
+
+            start_time = time.time()
+            try:
+                worker.conn.send((shm.name, img_array.shape, img_array.dtype.str, config))
+            except (EOFError, OSError):
+                worker = self._replace(worker)
+                with self._lock:
+                    self._failures += 1
+                raise VectorizeWorkerError("Vectorize worker died")
+
+            if not worker.conn.poll(timeout):
+                logger.warning(f"⚠️  Vectorization exceeded {timeout}s, killing {worker.process.name}")
+                worker = self._replace(worker)
+                with self._lock:
+                    self._timeouts += 1
+                raise VectorizeTimeoutError(f"Vectorization exceeded {timeout}s")
+
+            try:
+                status, payload = worker.conn.recv()
+            except (EOFError, OSError):
+                worker = self._replace(worker)
+                with self._lock:
+                    self._failures += 1
+                raise VectorizeWorkerError("Vectorize worker died")
+
+            if status != 'ok':
+                with self._lock:
+                    self._failures += 1
+                raise VectorizeWorkerError(payload)
+
+            with self._lock:
+                self._completed += 1
+            logger.info(f"   Traced on {worker.process.name} in {time.time() - start_time:.2f}s")
+            return payload
+
+        finally:
+            self._idle.put(worker)
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    def run_many(self, arrays: List[np.ndarray], config: dict, timeout: Optional[float] = None) -> List[str]:
+        """
+        Trace several images at once, spread over the workers
+
+        Args:
+            arrays: Image pixels, one entry per trace
+            config: VTracer keyword arguments (shared by every trace)
+            timeout: Time limit per trace in seconds (default: the pool's)
+
+        Returns:
+            SVG content for each image, in order
+
+        Raises:
+            VectorizeTimeoutError: If any trace ran too long
+            VectorizeWorkerError: If any trace failed
+        """
+        if len(arrays) <= 1:
+            return [self.run(img_array, config, timeout) for img_array in arrays]
+
+        # One feeder thread per worker; each blocks in run() until a worker is free
+        with ThreadPoolExecutor(
+            max_workers=min(len(arrays), self.workers),
+            thread_name_prefix="vectorize-feed"
+        ) as feeders:
+            return list(feeders.map(lambda img_array: self.run(img_array, config, timeout), arrays))
+
+    def shutdown(self):
+        """Stop every worker process, after the traces in flight finish"""
+        with self._lock:
+            count = len(self._all)
+            self._started = False
+
+        # Each run puts its worker (or the one that replaced it) back on the
+        # idle queue when it is done, so taking them all waits for the runs
+        stopped = []
+        for _ in range(count):
+            worker = self._idle.get()
+            worker.stop()
+            stopped.append(worker)
+        with self._lock:
+            self._all = [worker for worker in self._all if worker not in stopped]
+
+    def get_stats(self) -> dict:
+        """
+        Get pool size and outcome counts
+
+        Returns:
+            Dictionary with pool statistics
+        """
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "started": self._started,
+                "idle": self._idle.qsize(),
+                "completed": self._completed,
+                "timeouts": self._timeouts,
+                "failures": self._failures,
+                "timeout_seconds": self.timeout
+            }
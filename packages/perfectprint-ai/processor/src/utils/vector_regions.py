@@ -0,0 +1,212 @@
+"""
+Split-and-merge helpers for vectorizing large designs
+
+One VTracer call is serial, so large designs are cut into independent
+regions that trace in parallel and are stitched back into one SVG:
+- Transparent designs (gang sheets, stickers) split along their
+  connected foreground components, grouped per tile so text and small
+  pieces do not become hundreds of jobs
+- Opaque designs split into overlapping tiles, each clipped to its own
+  share of the canvas so the overlaps never draw twice
+"""
+
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from utils.tiling import tile_spans
+
+# Split modes
+COMPONENTS = "components"
+TILES = "tiles"
+
+# A component whose bounding box covers more than this share of the
+# canvas is not worth isolating; the design is split into tiles instead
+MAX_COMPONENT_SHARE = 0.5
+
+_SVG_BODY = re.compile(r'<svg[^>]*>(.*)</svg>', re.DOTALL)
+
+
+class Region(NamedTuple):
+    """One piece of the design, traced on its own"""
+    x: int                      # Offset of the piece in the full canvas
+    y: int
+    pixels: np.ndarray          # HxWx3 RGB (tiles) or HxWx4 RGBA (components)
+    clip: Optional[tuple]       # (x0, y0, x1, y1) canvas area the piece owns, or None
+
+
+def flatten_on_white(rgba: np.ndarray) -> np.ndarray:
+    """
+    Composite RGBA pixels onto white (what the single-call path traces)
+
+    Args:
+        rgba: HxWx4 uint8 pixels
+
+    Returns:
+        HxWx3 uint8 RGB pixels
+    """
+    alpha = rgba[..., 3:4].astype(np.uint16)
+    rgb = rgba[..., :3].astype(np.uint16)
+    return ((rgb * alpha + 255 * (255 - alpha) + 127) // 255).astype(np.uint8)
+
+
+def _cuts(spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Non-overlapping share of each tile: neighbours meet mid-overlap"""
+    bounds = [spans[0][0]]
+    for (start, _), (_, prev_end) in zip(spans[1:], spans[:-1]):
+        bounds.append((start + prev_end) // 2)
+    bounds.append(spans[-1][1])
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def split_tiles(rgb: np.ndarray, tile: int, overlap: int) -> List[Region]:
+    """
+    Cut an opaque image into overlapping tiles
+
+    Each tile is traced with `overlap` pixels of context on every side and
+    clipped back to its own share, so shapes meet at the cut lines.
+
+    Args:
+        rgb: HxWx3 uint8 pixels
+        tile: Tile size in pixels
+        overlap: Context shared by neighbouring tiles in pixels
+
+    Returns:
+        Tile regions in row-major order
+    """
+    height, width = rgb.shape[:2]
+    rows = tile_spans(height, tile, overlap)
+    cols = tile_spans(width, tile, overlap)
+
+    regions = []
+    for (y0, y1), (cy0, cy1) in zip(rows, _cuts(rows)):
+        for (x0, x1), (cx0, cx1) in zip(cols, _cuts(cols)):
+            regions.append(Region(x0, y0, rgb[y0:y1, x0:x1], (cx0, cy0, cx1, cy1)))
+    return regions
+
+
+def split_components(rgba: np.ndarray, tile: int, margin: int) -> Optional[List[Region]]:
+    """
+    Cut a transparent design along its connected foreground components
+
+    Pieces closer than `margin` pixels are kept together. Components are
+    grouped by the tile their centre falls in; each group becomes one
+    region holding only its own pixels (everything else transparent white), so
+    overlapping bounding boxes never trace the same pixels twice.
+
+    Args:
+        rgba: HxWx4 uint8 pixels
+        tile: Grouping cell size in pixels
+        margin: Grouping distance and padding around each region in pixels
+
+    Returns:
+        Component regions, or None when the design is one large piece
+    """
+    height, width = rgba.shape[:2]
+    foreground = (rgba[..., 3] > 0).astype(np.uint8)
+
+    grouping = foreground
+    if margin > 0:
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2 * margin + 1, 2 * margin + 1))
+        grouping = cv2.dilate(foreground, kernel)
+
+    count, labels, stats, centroids = cv2.connectedComponentsWithStats(grouping, connectivity=8)
+    if count <= 1:
+        return []
+
+    boxes = stats[1:, :4]
+    if (boxes[:, 2] * boxes[:, 3]).max() > MAX_COMPONENT_SHARE * width * height:
+        return None
+
+    groups = {}
+    for label, (cx, cy) in enumerate(centroids[1:], start=1):
+        groups.setdefault((int(cy) // tile, int(cx) // tile), []).append(label)
+
+    rgb = flatten_on_white(rgba)
+    regions = []
+    for members in groups.values():
+        member_boxes = stats[members, :4]
+        x0 = max(0, int(member_boxes[:, 0].min()) - margin)
+        y0 = max(0, int(member_boxes[:, 1].min()) - margin)
+        x1 = min(width, int((member_boxes[:, 0] + member_boxes[:, 2]).max()) + margin)
+        y1 = min(height, int((member_boxes[:, 1] + member_boxes[:, 3]).max()) + margin)
+
+        owned = np.isin(labels[y0:y1, x0:x1], members) & (foreground[y0:y1, x0:x1] > 0)
+        pixels = np.empty((y1 - y0, x1 - x0, 4), dtype=np.uint8)
+        pixels[..., :3] = np.where(owned[..., None], rgb[y0:y1, x0:x1], np.uint8(255))
+        pixels[..., 3] = owned * np.uint8(255)
+        regions.append(Region(x0, y0, pixels, None))
+
+    return regions
+
+
+def split_regions(rgba: np.ndarray, tile: int, margin: int) -> Tuple[str, List[Region]]:
+    """
+    Cut a design into independently traceable regions
+
+    Args:
+        rgba: HxWx4 uint8 pixels
+        tile: Tile/grouping size in pixels
+        margin: Component grouping distance, and half the tile overlap
+
+    Returns:
+        (mode, regions); mode is COMPONENTS or TILES
+    """
+    regions = split_components(rgba, tile, margin)
+    if regions is not None:
+        return COMPONENTS, regions
+    return TILES, split_tiles(flatten_on_white(rgba), tile, 2 * margin)
+
+
+def merge_svgs(
+    regions: List[Region],
+    svgs: List[str],
+    size: Tuple[int, int],
+    background: Optional[str] = None
+) -> str:
+    """
+    Stitch per-region SVGs into one document
+
+    Args:
+        regions: Regions in the order they were traced
+        svgs: VTracer output for each region
+        size: (width, height) of the full canvas
+        background: Optional fill painted under every region
+
+    Returns:
+        SVG content as string
+    """
+    width, height = size
+    defs = []
+    body = []
+
+    if background:
+        body.append(f'<rect width="{width}" height="{height}" fill="{background}"/>')
+
+    for index, (region, svg) in enumerate(zip(regions, svgs)):
+        match = _SVG_BODY.search(svg)
+        paths = match.group(1).strip() if match else ''
+        if not paths:
+            continue
+
+        group = f'<g transform="translate({region.x},{region.y})">\n{paths}\n</g>'
+        if region.clip is not None:
+            x0, y0, x1, y1 = region.clip
+            defs.append(
+                f'<clipPath id="region-{index}" clipPathUnits="userSpaceOnUse">'
+                f'<rect x="{x0}" y="{y0}" width="{x1 - x0}" height="{y1 - y0}"/></clipPath>'
+            )
+            group = f'<g clip-path="url(#region-{index})">\n{group}\n</g>'
+        body.append(group)
+
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<svg version="1.1" xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">'
+    ]
+    if defs:
+        parts.append('<defs>\n' + '\n'.join(defs) + '\n</defs>')
+    parts.extend(body)
+    parts.append('</svg>')
+    return '\n'.join(parts) + '\n'